@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Alert Correlation Benchmark
+Author: 13city
+
+Compares the per-alert cost of correlating against a large set of active
+alerts using the original linear scan and the keyed ActiveAlertIndex.
+
+Usage:
+    python benchmarks/bench_alert_correlation.py --active 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.alert_index import ActiveAlertIndex
+from modules.alert_manager import Alert, AlertSeverity, AlertStatus
+
+METRICS = ['latency', 'packet_loss', 'jitter', 'bandwidth_utilization', 'temperature']
+CORRELATION_WINDOW = 3600
+
+def generate_alerts(count: int, now: float):
+    """Build active alerts spread over the last two correlation windows."""
+    rng = random.Random(42)
+    alerts = []
+    for i in range(count):
+        device_ip = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"
+        timestamp = now - 2 * CORRELATION_WINDOW + i * (2 * CORRELATION_WINDOW / count)
+        alerts.append(Alert(
+            id=f"{device_ip}_{i}", severity=AlertSeverity.WARNING,
+            status=AlertStatus.NEW, device_ip=device_ip, device_name=device_ip,
+            metric_name=rng.choice(METRICS), metric_value=0.0, threshold=0.0,
+            timestamp=timestamp, description=''
+        ))
+    return alerts
+
+def linear_correlate(active_alerts, device_ip: str, metric_name: str, now: float):
+    """The original AlertManager._check_correlation scan."""
+    for alert in active_alerts.values():
+        if (alert.device_ip == device_ip and
+                alert.metric_name == metric_name and
+                now - alert.timestamp < CORRELATION_WINDOW):
+            return alert.correlation_id or alert.id
+    return None
+
+def measure(label: str, correlate, lookups):
+    """Time correlate() over every lookup and print the per-call cost."""
+    started = time.perf_counter()
+    matched = sum(1 for device_ip, metric_name, now in lookups
+                  if correlate(device_ip, metric_name, now) is not None)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<16} {elapsed / len(lookups) * 1e6:10.2f} us/alert  "
+          f"{elapsed:7.3f}s total  {matched} correlated")
+
+def main():
+    parser = argparse.ArgumentParser(description='Alert correlation benchmark')
+    parser.add_argument('--active', type=int, default=100_000,
+                        help='Number of active alerts')
+    parser.add_argument('--lookups', type=int, default=1000,
+                        help='Number of new alerts to correlate')
+    args = parser.parse_args()
+
+    now = time.time()
+    alerts = generate_alerts(args.active, now)
+    rng = random.Random(7)
+    lookups = [
+        (alert.device_ip, alert.metric_name, now + i * 0.01)
+        for i, alert in enumerate(rng.sample(alerts, min(args.lookups, len(alerts))))
+    ]
+    print(f"Correlating {len(lookups)} new alerts against {len(alerts)} active alerts\n")
+
+    plain = {alert.id: alert for alert in alerts}
+    index = ActiveAlertIndex(CORRELATION_WINDOW)
+    for alert in alerts:
+        index[alert.id] = alert
+
+    measure('linear scan', lambda ip, name, t: linear_correlate(plain, ip, name, t), lookups)
+    measure('keyed index', index.correlate, lookups)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Metric Batch Benchmark
+Author: 13city
+
+Compares allocations and memory per collected sample for one polling cycle
+of 48-port switches: the original one-dataclass-per-value layout, a list of
+slotted Metric objects and a columnar MetricBatch per device.
+
+Usage:
+    python benchmarks/bench_metric_batch.py --devices 100
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.counter_cache import InterfaceRates
+from modules.device_manager import Device, DeviceType
+from modules.icmp_prober import ProbeResult
+from modules.metrics_manager import (
+    INTERFACE_METRICS, METRIC_DESCRIPTORS, Metric, MetricsManager, MetricType
+)
+
+@dataclass
+class DictMetric:
+    """Metric as it was before __slots__: one instance __dict__ per sample."""
+    name: str
+    value: Any
+    type: MetricType
+    timestamp: float
+    device_ip: str
+    threshold_warning: Optional[float] = None
+    threshold_critical: Optional[float] = None
+    unit: str = ""
+    description: str = ""
+    interface: Optional[str] = None
+
+def make_rates(device_ip: str, ports: int, rng: np.random.Generator) -> InterfaceRates:
+    """Interface rates for one switch with every port reporting."""
+    in_bps = rng.uniform(0, 1e9, ports)
+    out_bps = rng.uniform(0, 1e9, ports)
+    return InterfaceRates(
+        device_ip=device_ip,
+        interfaces=[str(i) for i in range(1, ports + 1)],
+        names=[f"Gi1/0/{i}" for i in range(1, ports + 1)],
+        elapsed=300.0,
+        in_bps=in_bps,
+        out_bps=out_bps,
+        utilization=np.fmax(in_bps, out_bps) / 1e7,
+        in_errors=rng.integers(0, 5, ports).astype(float),
+        out_errors=np.zeros(ports)
+    )
+
+def device_values(rates: InterfaceRates):
+    """(name, interface, value) for every sample a device yields in one cycle."""
+    columns = {
+        'utilization': rates.utilization,
+        'in_bps': rates.in_bps,
+        'out_bps': rates.out_bps,
+        'errors': rates.in_errors + rates.out_errors,
+    }
+    device_level = {
+        'packet_loss': 0.0, 'latency': 1.2, 'latency_p50': 1.2,
+        'latency_p95': 1.2, 'latency_stddev': 0.0, 'jitter': 0.0,
+        'auth_failures': 0, 'acl_violations': 0,
+        'port_security_violations': 0, 'temperature': 44.0, 'fan_status': 'normal',
+        'poe_usage': 40.0,
+    }
+    for name, value in device_level.items():
+        yield name, None, value
+    for name, column in INTERFACE_METRICS:
+        for interface, value in zip(rates.names, columns[column].tolist()):
+            yield name, interface, round(value, 2)
+
+def measure(label: str, build, samples: int):
+    """Run build() under tracemalloc and print live allocations and bytes per sample."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snapshot.statistics('filename')
+    blocks = sum(stat.count for stat in stats)
+    nbytes = sum(stat.size for stat in stats)
+    print(f"{label:<24} {blocks / samples:6.2f} allocs/sample  {nbytes / samples:8.1f} B/sample  "
+          f"{elapsed / samples * 1e6:6.2f} us/sample")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Metric batch benchmark')
+    parser.add_argument('--devices', type=int, default=100, help='Switches polled per cycle')
+    parser.add_argument('--ports', type=int, default=48, help='Interfaces per switch')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    devices = [
+        Device(ip=f"10.0.{d // 256}.{d % 256}", hostname=f"sw{d}",
+               device_type=DeviceType.SWITCH, vendor='cisco')
+        for d in range(args.devices)
+    ]
+    rates = {device.ip: make_rates(device.ip, args.ports, rng) for device in devices}
+    manager = MetricsManager({'storage': {'backend': 'memory'}})
+    descriptors = {name: (metric_type, unit, *manager.thresholds.default(name))
+                   for name, metric_type, unit in METRIC_DESCRIPTORS}
+    samples = sum(1 for device in devices for _ in device_values(rates[device.ip]))
+    print(f"Collecting {samples} samples from {args.devices} devices "
+          f"({samples // args.devices} per device)\n")
+
+    def build_objects(metric_class):
+        def build():
+            cycle = {}
+            for device in devices:
+                metrics = cycle[device.ip] = []
+                for name, interface, value in device_values(rates[device.ip]):
+                    metric_type, unit, warning, critical = descriptors[name]
+                    metrics.append(metric_class(
+                        name=name, value=value, type=metric_type, timestamp=time.time(),
+                        device_ip=device.ip, threshold_warning=warning,
+                        threshold_critical=critical, unit=unit, interface=interface
+                    ))
+            return cycle
+        return build
+
+    def build_batches():
+        cycle = {}
+        ids = manager.descriptor_ids
+        for device in devices:
+            batch = cycle[device.ip] = manager.new_batch(device)
+            device_rates = rates[device.ip]
+            manager._build_network_performance_metrics(
+                batch, ProbeResult(ip=device.ip, sent=10, rtts=[1.2] * 10)
+            )
+            for name, value in (('auth_failures', 0), ('acl_violations', 0),
+                                ('port_security_violations', 0), ('temperature', 44.0),
+                                ('fan_status', 'normal'), ('poe_usage', 40.0)):
+                batch.add(ids[name], value)
+            manager._build_interface_metrics(batch, device_rates)
+        return cycle
+
+    # Intern every series first so the registry isn't charged to the batches
+    build_batches()
+    measure('dataclass per value', build_objects(DictMetric), samples)
+    measure('slotted Metric', build_objects(Metric), samples)
+    measure('MetricBatch', build_batches, samples)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Series Compression Benchmark
+Author: 13city
+
+Compares memory per million stored samples for the original list-of-Metric
+layout, the columnar in-memory backend and the Gorilla-compressed backend.
+
+Usage:
+    python benchmarks/bench_series_compression.py --points 1000000
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.metrics_manager import Metric, MetricType
+from modules.metrics_storage import ColumnarMetricsStorage, CompressedMetricsStorage
+
+# Series shapes typical of a polling cycle: slow drift, noisy, constant status
+SERIES = [
+    ('temperature', MetricType.PHYSICAL, 'celsius'),
+    ('poe_usage', MetricType.PHYSICAL, 'percent'),
+    ('bandwidth_utilization', MetricType.NETWORK_PERFORMANCE, 'percent'),
+    ('fan_status', MetricType.PHYSICAL, 'status'),
+]
+
+def generate_samples(points: int, interval: int = 300):
+    """Yield (device_ip, name, type, unit, timestamp, value) tuples."""
+    rng = random.Random(42)
+    devices = max(1, points // (len(SERIES) * 8640))  # ~30 days per series
+    per_series = points // (devices * len(SERIES))
+    start = time.time() - per_series * interval
+    for d in range(devices):
+        device_ip = f"10.{d // 65536 % 256}.{d // 256 % 256}.{d % 256}"
+        for name, metric_type, unit in SERIES:
+            value = 40.0
+            for i in range(per_series):
+                timestamp = start + i * interval
+                if name == 'fan_status':
+                    sample = 'normal'
+                elif name == 'temperature':
+                    value += rng.choice((-0.5, 0.0, 0.0, 0.5))
+                    sample = value
+                elif name == 'poe_usage':
+                    sample = 35.0
+                else:
+                    sample = round(rng.uniform(0, 100), 2)
+                yield device_ip, name, metric_type, unit, timestamp, sample
+
+def measure(label: str, build, points: int):
+    """Run build() under tracemalloc and print memory per million samples."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_million = current / points * 1_000_000 / (1024 * 1024)
+    print(f"{label:<24} {current / points:8.2f} B/sample  "
+          f"{per_million:9.1f} MiB/1M samples  {elapsed:6.2f}s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Series compression benchmark')
+    parser.add_argument('--points', type=int, default=1_000_000,
+                        help='Number of samples to store')
+    args = parser.parse_args()
+
+    samples = list(generate_samples(args.points))
+    points = len(samples)
+    series = len({(sample[0], sample[1]) for sample in samples})
+    print(f"Storing {points} samples across {series} series\n")
+
+    def build_list():
+        history = {}
+        for device_ip, name, metric_type, unit, timestamp, value in samples:
+            history.setdefault(f"{device_ip}_{name}", []).append(Metric(
+                name=name, value=value, type=metric_type, timestamp=timestamp,
+                device_ip=device_ip, unit=unit
+            ))
+        return history
+
+    def build_storage(storage_class):
+        def build():
+            storage = storage_class({}, retention_seconds=10 ** 9)
+            for device_ip, name, metric_type, unit, timestamp, value in samples:
+                storage.append(Metric(
+                    name=name, value=value, type=metric_type, timestamp=timestamp,
+                    device_ip=device_ip, unit=unit
+                ))
+            return storage
+        return build
+
+    measure('list of Metric', build_list, points)
+    measure('columnar arrays', build_storage(ColumnarMetricsStorage), points)
+    compressed = measure('gorilla compressed', build_storage(CompressedMetricsStorage), points)
+
+    stats = compressed.compression_stats()
+    print(f"\nCompressed payload: {stats['bytes_per_sample']:.2f} B/sample, "
+          f"ratio {stats['compression_ratio']:.1f}x vs 16-byte raw samples")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Template Render Benchmark
+Author: 13city
+
+Measures renders/sec of the Slack and email notification templates with
+and without the fragment cache, and cold template load time with and
+without the bytecode cache.
+
+Usage:
+    python benchmarks/bench_template_render.py --renders 20000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from modules.alert_manager import Alert, AlertSeverity, AlertStatus, BusinessService
+from modules.template_renderer import TemplateRenderer
+
+TEMPLATES = ['slack_critical', 'slack_warning', 'email_critical', 'email_warning']
+
+SERVICES = [
+    BusinessService(name='Core Network', description='Primary network infrastructure',
+                    priority=1, dependencies=['192.168.1.1'], contacts=[]),
+    BusinessService(name='Internet Access', description='External connectivity',
+                    priority=1, dependencies=['192.168.1.1'], contacts=[]),
+]
+
+def generate_alerts(count: int):
+    """Alerts that share service lists, resolution steps and escalation paths."""
+    rng = random.Random(42)
+    steps = ["1. Verify alert conditions", "2. Check device status",
+             "3. Review logs", "4. Contact system administrator if issue persists"]
+    paths = [["Network Operations", "Network Engineering"],
+             ["Network Operations", "Network Engineering", "IT Management", "CTO Office"]]
+    alerts = []
+    for i in range(count):
+        alerts.append(Alert(
+            id=f"10.0.{i // 256 % 256}.{i % 256}_latency_{i}",
+            severity=AlertSeverity.CRITICAL, status=AlertStatus.NEW,
+            device_ip=f"10.0.{i // 256 % 256}.{i % 256}", device_name=f"sw{i}",
+            metric_name='latency', metric_value=round(rng.uniform(100, 400), 1),
+            threshold=200.0, timestamp=time.time(), description='Latency above threshold',
+            affected_services=SERVICES[:rng.randint(1, 2)],
+            resolution_steps=steps, escalation_path=rng.choice(paths)
+        ))
+    return alerts
+
+def measure(label: str, renderer: TemplateRenderer, name: str, alerts):
+    template = renderer[name]
+    started = time.perf_counter()
+    for alert in alerts:
+        template.render(alert=alert, business_services={})
+    elapsed = time.perf_counter() - started
+    print(f"{name:<16} {label:<18} {len(alerts) / elapsed:10.0f} renders/s")
+
+def measure_load(label: str, cache_dir):
+    started = time.perf_counter()
+    renderer = TemplateRenderer(str(ROOT / 'templates'), cache_dir=cache_dir)
+    for name in TEMPLATES:
+        renderer[name]
+    print(f"{'cold load':<16} {label:<18} {(time.perf_counter() - started) * 1000:10.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Notification template render benchmark')
+    parser.add_argument('--renders', type=int, default=20000,
+                        help='Number of alerts to render per template')
+    args = parser.parse_args()
+
+    alerts = generate_alerts(args.renders)
+    uncached = TemplateRenderer(str(ROOT / 'templates'), fragment_cache_size=0)
+    cached = TemplateRenderer(str(ROOT / 'templates'))
+    for name in TEMPLATES:
+        measure('no fragment cache', uncached, name, alerts)
+        measure('fragment cache', cached, name, alerts)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        measure_load('no bytecode cache', None)
+        measure_load('bytecode (cold)', cache_dir)
+        measure_load('bytecode (warm)', cache_dir)
+
+if __name__ == '__main__':
+    main()
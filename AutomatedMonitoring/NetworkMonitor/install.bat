@@ -29,9 +29,9 @@ if errorlevel 1 (
     exit /b 1
 )
 
-python -c "import sys; exit(0 if sys.version_info >= (3,8) else 1)"
+python -c "import sys; exit(0 if sys.version_info >= (3,10) else 1)"
 if errorlevel 1 (
-    echo %RED%Python 3.8 or higher is required%NC%
+    echo %RED%Python 3.10 or higher is required%NC%
     exit /b 1
 )
 echo %GREEN%Python version check passed%NC%
@@ -44,13 +44,13 @@ function Test-PythonVersion {
     try {
         $pythonVersion = python -c "import sys; print('.'.join(map(str, sys.version_info[:2])))"
         $version = [version]$pythonVersion
-        $minVersion = [version]"3.8"
+        $minVersion = [version]"3.10"
         
         if ($version -ge $minVersion) {
-            Write-ColorOutput "✓ Python $pythonVersion meets minimum requirement (3.8)" "Green"
+            Write-ColorOutput "✓ Python $pythonVersion meets minimum requirement (3.10)" "Green"
             return $true
         } else {
-            Write-ColorOutput "✗ Python $pythonVersion is below minimum requirement (3.8)" "Red"
+            Write-ColorOutput "✗ Python $pythonVersion is below minimum requirement (3.10)" "Red"
             return $false
         }
     } catch {
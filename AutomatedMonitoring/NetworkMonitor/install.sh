@@ -27,7 +27,7 @@ check_status() {
 # Function to check Python version
 check_python_version() {
     print_header "Checking Python Version"
-    required_version="3.8"
+    required_version="3.10"
     python_version=$(python3 -c 'import sys; print(".".join(map(str, sys.version_info[:2])))')
     
     if [ "$(printf '%s\n' "$required_version" "$python_version" | sort -V | head -n1)" = "$required_version" ]; then 
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Alert Archive Module
+Author: 13city
+
+Bounded alert history: the most recent alerts stay in an in-memory ring and
+every alert is also appended to a JSON-lines archive with one file per day.
+Each archive file gets a sparse timestamp -> offset index, so range queries
+seek to the first matching record instead of filtering the whole history.
+Later changes to an alert (status, repeat occurrences, escalation) are
+appended to a companion updates file for the day it was raised, and the
+latest update replaces the original record when that day is read back. The
+updates file is indexed by alert id and compacted down to the latest record
+per alert once superseded records make up most of it.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+from array import array
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger('NetworkMonitor.AlertArchive')
+
+class AlertArchive:
+    def __init__(self, config: Dict[str, Any],
+                 encode: Callable[['Alert'], Dict[str, Any]],
+                 decode: Callable[[Dict[str, Any]], 'Alert']):
+        """Initialize the ring buffer and on-disk archive."""
+        self.config = config
+        self.encode = encode
+        self.decode = decode
+        self.max_alerts = config.get('max_alerts', 10000)
+        self.archive_dir = Path(config.get('archive_dir', 'data/alerts'))
+        self.file_duration = int(config.get('file_duration', 86400))
+        self.retention_seconds = config.get('retention_days', 365) * 86400
+        self.index_interval = config.get('index_interval', 64)
+        self.compact_min_updates = config.get('compact_min_updates', 1024)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._recent: deque = deque(maxlen=self.max_alerts)
+        self._recent_times: deque = deque(maxlen=self.max_alerts)
+        self._writer = None
+        self._writer_block = None
+        self._update_writers: Dict[int, Any] = {}
+        # Offset of the latest update record per alert id, and line count, per updates file
+        self._update_index: Dict[int, Dict[str, int]] = {}
+        self._update_lines: Dict[int, int] = {}
+        # Sparse (timestamps, offsets) index per archive file, built lazily
+        self._file_index: Dict[int, Tuple[array, array]] = {}
+        self._record_counts: Dict[int, int] = {}
+
+    def _archive_path(self, block: int) -> Path:
+        return self.archive_dir / f"alerts_{block}.jsonl"
+
+    def _updates_path(self, block: int) -> Path:
+        return self.archive_dir / f"updates_{block}.jsonl"
+
+    def _list_blocks(self) -> List[int]:
+        blocks = []
+        for path in self.archive_dir.glob('alerts_*.jsonl'):
+            try:
+                blocks.append(int(path.stem.split('_', 1)[1]))
+            except ValueError:
+                continue
+        return sorted(blocks)
+
+    def append(self, alert: 'Alert'):
+        """Record a new alert in the ring and the archive."""
+        with self._lock:
+            self._recent.append(alert)
+            self._recent_times.append(alert.timestamp)
+            try:
+                self._write(alert)
+            except Exception as e:
+                logger.error(f"Error archiving alert {alert.id}: {e}")
+
+    def update(self, alert: 'Alert'):
+        """Record a change to an archived alert; the ring already holds the live object."""
+        block = int(alert.timestamp // self.file_duration) * self.file_duration
+        with self._lock:
+            try:
+                index = self._index_updates(block)
+                writer = self._update_writers.get(block)
+                if writer is None:
+                    writer = self._update_writers[block] = open(self._updates_path(block), 'ab')
+                offset = writer.tell()
+                writer.write((json.dumps(self.encode(alert), default=str) + '\n').encode())
+                writer.flush()
+                index[alert.id] = offset
+                self._update_lines[block] += 1
+                # A long incident rewrites the same ids; keep only their latest records
+                if self._update_lines[block] >= max(self.compact_min_updates, 2 * len(index)):
+                    self._compact_updates(block)
+            except Exception as e:
+                logger.error(f"Error archiving update for alert {alert.id}: {e}")
+
+    def _index_updates(self, block: int) -> Dict[str, int]:
+        """Map each alert id to the offset of its latest record in an updates file."""
+        index = self._update_index.get(block)
+        if index is None:
+            index = {}
+            count = 0
+            path = self._updates_path(block)
+            if path.exists():
+                self._trim_partial_line(path)
+                with open(path, 'rb') as f:
+                    offset = 0
+                    for line in iter(f.readline, b''):
+                        try:
+                            index[json.loads(line)['id']] = offset
+                        except (ValueError, KeyError):
+                            logger.warning(f"Ignoring corrupt entry in {path}")
+                        count += 1
+                        offset = f.tell()
+            self._update_index[block] = index
+            self._update_lines[block] = count
+        return index
+
+    def _compact_updates(self, block: int):
+        """Rewrite an updates file with only the latest record per alert id."""
+        path = self._updates_path(block)
+        writer = self._update_writers.pop(block, None)
+        if writer is not None:
+            writer.close()
+        index = self._update_index[block]
+        compacted = {}
+        tmp_path = path.with_suffix('.tmp')
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for alert_id, offset in sorted(index.items(), key=lambda item: item[1]):
+                src.seek(offset)
+                compacted[alert_id] = dst.tell()
+                dst.write(src.readline())
+        os.replace(tmp_path, path)
+        self._update_index[block] = compacted
+        self._update_lines[block] = len(compacted)
+        logger.debug(f"Compacted {path} to {len(compacted)} records")
+
+    def _read_updates(self, block: int, alert_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Latest update record for each of the given alert ids that has one."""
+        index = self._index_updates(block)
+        wanted = [(index[alert_id], alert_id) for alert_id in alert_ids if alert_id in index]
+        if not wanted:
+            return {}
+        writer = self._update_writers.get(block)
+        if writer is not None:
+            writer.flush()
+        updates = {}
+        with open(self._updates_path(block), 'rb') as f:
+            for offset, alert_id in sorted(wanted):
+                f.seek(offset)
+                updates[alert_id] = json.loads(f.readline())
+        return updates
+
+    def _write(self, alert: 'Alert'):
+        block = int(alert.timestamp // self.file_duration) * self.file_duration
+        if block != self._writer_block:
+            self._open_writer(block)
+
+        offset = self._writer.tell()
+        self._writer.write((json.dumps(self.encode(alert), default=str) + '\n').encode())
+        self._writer.flush()
+
+        if self._record_counts[block] % self.index_interval == 0:
+            timestamps, offsets = self._file_index[block]
+            timestamps.append(alert.timestamp)
+            offsets.append(offset)
+        self._record_counts[block] += 1
+
+    def _open_writer(self, block: int):
+        if self._writer is not None:
+            self._writer.close()
+        path = self._archive_path(block)
+        if path.exists():
+            self._trim_partial_line(path)
+        self._writer = open(path, 'ab')
+        self._writer_block = block
+        self._index_file(block)
+        self.apply_retention(block - self.retention_seconds)
+
+    def _trim_partial_line(self, path: Path):
+        """Drop a torn final record left behind by a crash."""
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                logger.warning(f"Truncating partial record in {path}")
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def _index_file(self, block: int) -> Tuple[array, array]:
+        """Sample every index_interval-th record's timestamp and offset."""
+        index = self._file_index.get(block)
+        if index is None:
+            timestamps, offsets = array('d'), array('Q')
+            count = 0
+            path = self._archive_path(block)
+            if path.exists():
+                with open(path, 'rb') as f:
+                    offset = 0
+                    for line in iter(f.readline, b''):
+                        if count % self.index_interval == 0:
+                            try:
+                                timestamps.append(json.loads(line)['timestamp'])
+                                offsets.append(offset)
+                            except (ValueError, KeyError):
+                                logger.warning(f"Ignoring corrupt entry in {path}")
+                        count += 1
+                        offset = f.tell()
+            index = self._file_index[block] = (timestamps, offsets)
+            self._record_counts[block] = count
+        return index
+
+    def _read_file(self, block: int, start_time: float, end_time: float) -> List['Alert']:
+        timestamps, offsets = self._index_file(block)
+        pos = bisect.bisect_left(timestamps, start_time)
+        records = []
+        with open(self._archive_path(block), 'rb') as f:
+            f.seek(offsets[pos - 1] if pos else 0)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line from a crash
+                if record['timestamp'] > end_time:
+                    break
+                if record['timestamp'] >= start_time:
+                    records.append(record)
+        updates = self._read_updates(block, (record['id'] for record in records))
+        return [self.decode(updates.get(record['id'], record)) for record in records]
+
+    def query(self, start_time: float, end_time: float) -> List['Alert']:
+        """Get alerts raised within [start_time, end_time], oldest first."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+
+            # The ring holds live objects for its span; older alerts come from disk
+            ring_start = self._recent_times[0] if self._recent_times else float('inf')
+            alerts = []
+            if start_time < ring_start:
+                disk_end = min(end_time, ring_start)
+                first_block = int(start_time // self.file_duration) * self.file_duration
+                for block in self._list_blocks():
+                    if block < first_block or block > disk_end:
+                        continue
+                    alerts.extend(
+                        alert for alert in self._read_file(block, start_time, disk_end)
+                        if alert.timestamp < ring_start
+                    )
+
+            lo = bisect.bisect_left(self._recent_times, max(start_time, ring_start))
+            hi = bisect.bisect_right(self._recent_times, end_time)
+            alerts.extend(islice(self._recent, lo, hi))
+            return alerts
+
+    def apply_retention(self, cutoff_time: float):
+        """Delete archive files that lie entirely before cutoff_time."""
+        for block in self._list_blocks():
+            if block + self.file_duration > cutoff_time:
+                break
+            self._file_index.pop(block, None)
+            self._record_counts.pop(block, None)
+            self._archive_path(block).unlink()
+            writer = self._update_writers.pop(block, None)
+            if writer is not None:
+                writer.close()
+            self._update_index.pop(block, None)
+            self._update_lines.pop(block, None)
+            self._updates_path(block).unlink(missing_ok=True)
+            logger.info(f"Removed expired alert archive {self._archive_path(block)}")
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def close(self):
+        """Close the open archive and updates files."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                self._writer_block = None
+            for writer in self._update_writers.values():
+                writer.close()
+            self._update_writers.clear()
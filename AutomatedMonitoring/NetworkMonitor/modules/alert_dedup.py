@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Alert Deduplication Module
+Author: 13city
+
+Folds repeat breaches of the same device (or interface) metric into the
+alert that is already open for it. While a breach keeps recurring within the
+deduplication window (plus one polling interval of slack, since a sustained
+breach is only re-seen once per cycle), the existing alert's occurrence count
+and previous_occurrences are updated and no new alert or notification is made.
+Only the most recent occurrence times are kept, so a flapping metric can't
+grow an alert without bound.
+"""
+
+import logging
+from typing import Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger('NetworkMonitor.AlertDedup')
+
+AlertKey = Tuple[str, str, Optional[str]]  # (device_ip, metric_name, interface)
+
+# Rank used to decide whether a repeat breach is an escalation
+_SEVERITY_RANK = {'info': 0, 'warning': 1, 'critical': 2}
+
+class AlertDeduplicator:
+    def __init__(self, window: float, max_occurrences: int = 100, slack: float = 0.0):
+        """Initialize with the deduplication window and polling slack in seconds."""
+        self.window = window
+        self.slack = slack  # Gap between cycles that still counts as the same breach
+        self.max_occurrences = max_occurrences  # previous_occurrences entries kept
+        self._open: Dict[AlertKey, Tuple[str, float]] = {}  # key -> (alert id, last seen)
+        self.suppressed = 0
+
+    def find(self, active_alerts: Mapping[str, 'Alert'], device_ip: str,
+             metric_name: str, now: float,
+             interface: Optional[str] = None) -> Optional['Alert']:
+        """Return the open alert a breach at `now` should be folded into."""
+        key = (device_ip, metric_name, interface)
+        entry = self._open.get(key)
+        if entry is None:
+            return None
+
+        alert_id, last_seen = entry
+        alert = active_alerts.get(alert_id)
+        if alert is None or now - last_seen > self.window + self.slack:
+            del self._open[key]
+            return None
+        return alert
+
+    def register(self, alert: 'Alert'):
+        """Track a newly created alert as the open alert for its key."""
+        self._open[(alert.device_ip, alert.metric_name, alert.interface)] = (alert.id, alert.timestamp)
+
+    def forget(self, alert: 'Alert'):
+        """Stop folding breaches into an alert once it is resolved."""
+        key = (alert.device_ip, alert.metric_name, alert.interface)
+        entry = self._open.get(key)
+        if entry is not None and entry[0] == alert.id:
+            del self._open[key]
+
+    def record_occurrence(self, alert: 'Alert', metric: 'Metric', severity,
+                          now: float) -> bool:
+        """Fold a repeat breach into an alert; return True if it escalated."""
+        alert.occurrence_count += 1
+        if alert.previous_occurrences is None:
+            alert.previous_occurrences = []
+        alert.previous_occurrences.append(now)
+        if len(alert.previous_occurrences) > self.max_occurrences:
+            del alert.previous_occurrences[:-self.max_occurrences]
+        alert.metric_value = metric.value
+        self._open[(alert.device_ip, alert.metric_name, alert.interface)] = (alert.id, now)
+
+        if _SEVERITY_RANK[severity.value] > _SEVERITY_RANK[alert.severity.value]:
+            logger.info(f"Alert {alert.id} escalated from {alert.severity.value} to {severity.value}")
+            alert.severity = severity
+            return True
+
+        self.suppressed += 1
+        return False
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Alert Index Module
+Author: 13city
+
+Keeps active alerts keyed by id, with a secondary index on
+(device_ip, metric_name) and a time-ordered heap for the correlation window.
+Correlation lookups and window expiry cost O(log N) instead of a scan over
+every active alert.
+"""
+
+import heapq
+import logging
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger('NetworkMonitor.AlertIndex')
+
+AlertKey = Tuple[str, str]
+
+class ActiveAlertIndex(MutableMapping):
+    """Mapping of alert id to Alert with a correlation index on the side."""
+
+    def __init__(self, correlation_window: float):
+        """Initialize the index for the given correlation window in seconds."""
+        self.correlation_window = correlation_window
+        self._alerts: Dict[str, 'Alert'] = {}
+        self._by_key: Dict[AlertKey, Dict[str, 'Alert']] = {}
+        # Alerts still inside the correlation window, oldest first per key
+        self._in_window: Dict[AlertKey, Dict[str, 'Alert']] = {}
+        self._window_heap: List[Tuple[float, str]] = []
+
+    def __getitem__(self, alert_id: str) -> 'Alert':
+        return self._alerts[alert_id]
+
+    def __setitem__(self, alert_id: str, alert: 'Alert'):
+        if alert_id in self._alerts:
+            self._unlink(alert_id)
+        key = (alert.device_ip, alert.metric_name)
+        self._alerts[alert_id] = alert
+        self._by_key.setdefault(key, {})[alert_id] = alert
+        self._in_window.setdefault(key, {})[alert_id] = alert
+        heapq.heappush(self._window_heap, (alert.timestamp, alert_id))
+
+    def __delitem__(self, alert_id: str):
+        self._unlink(alert_id)
+        del self._alerts[alert_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._alerts)
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def _unlink(self, alert_id: str):
+        """Remove an alert from the secondary indexes; its heap entry goes stale."""
+        alert = self._alerts[alert_id]
+        key = (alert.device_ip, alert.metric_name)
+        for index in (self._by_key, self._in_window):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(alert_id, None)
+                if not bucket:
+                    del index[key]
+
+    def expire(self, now: float):
+        """Drop alerts older than the correlation window from the window index."""
+        cutoff = now - self.correlation_window
+        heap = self._window_heap
+        while heap and heap[0][0] <= cutoff:
+            timestamp, alert_id = heapq.heappop(heap)
+            alert = self._alerts.get(alert_id)
+            if alert is None or alert.timestamp != timestamp:
+                continue  # Resolved or re-indexed since this entry was pushed
+            key = (alert.device_ip, alert.metric_name)
+            bucket = self._in_window.get(key)
+            if bucket is not None:
+                bucket.pop(alert_id, None)
+                if not bucket:
+                    del self._in_window[key]
+
+    def correlate(self, device_ip: str, metric_name: str, now: float) -> Optional[str]:
+        """Return the correlation id for a new alert on this key, if any."""
+        self.expire(now)
+        bucket = self._in_window.get((device_ip, metric_name))
+        if not bucket:
+            return None
+        alert = next(iter(bucket.values()))
+        return alert.correlation_id or alert.id
+
+    def get_by_key(self, device_ip: str, metric_name: str) -> List['Alert']:
+        """Get active alerts for a device metric, oldest first."""
+        return list(self._by_key.get((device_ip, metric_name), {}).values())
@@ -1,17 +1,25 @@
 #!/usr/bin/env python3
 
 import logging
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple, Union
+from dataclasses import dataclass, asdict
 from datetime import datetime
 import time
 from enum import Enum
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import json
-import requests
-from jinja2 import Template
+import math
+import numpy as np
+
+from modules.alert_archive import AlertArchive
+from modules.alert_dedup import AlertDeduplicator
+from modules.alert_index import ActiveAlertIndex
+from modules.dns_cache import ReverseDnsCache
+from modules.metric_batch import MetricBatch
+from modules.service_index import ServiceIndex
+from modules.smtp_pool import EmailDigest, SmtpConnectionPool
+from modules.template_renderer import TemplateRenderer
+from modules.threshold_registry import ThresholdRegistry
+from modules.webhook_dispatcher import WebhookDispatcher
 
 logger = logging.getLogger('NetworkMonitor.AlertManager')
 
@@ -20,6 +28,32 @@ class AlertSeverity(Enum):
     WARNING = "warning"
     INFO = "info"
 
+# Severity codes produced by vectorized threshold evaluation
+SEVERITY_NONE = 0
+SEVERITY_WARNING = 1
+SEVERITY_CRITICAL = 2
+
+_SEVERITY_BY_CODE = {
+    SEVERITY_WARNING: AlertSeverity.WARNING,
+    SEVERITY_CRITICAL: AlertSeverity.CRITICAL,
+}
+
+def _as_float(value: Any) -> float:
+    """Numeric metric value as float; non-numeric values never breach."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return math.nan
+    return float(value)
+
+def evaluate_thresholds(values: np.ndarray, warnings: np.ndarray,
+                        criticals: np.ndarray) -> np.ndarray:
+    """Return a severity code per row in one vectorized pass."""
+    codes = np.zeros(len(values), dtype=np.int8)
+    # NaN (missing threshold or non-numeric value) compares False
+    with np.errstate(invalid='ignore'):
+        codes[values >= warnings] = SEVERITY_WARNING
+        codes[values >= criticals] = SEVERITY_CRITICAL
+    return codes
+
 class AlertStatus(Enum):
     NEW = "new"
     ACKNOWLEDGED = "acknowledged"
@@ -51,81 +85,209 @@ class Alert:
     previous_occurrences: List[float] = None
     resolution_steps: List[str] = None
     escalation_path: List[str] = None
+    occurrence_count: int = 1
+    interface: Optional[str] = None
+
+    def to_record(self) -> Dict[str, Any]:
+        """Convert the alert to a JSON-serializable archive record."""
+        record = asdict(self)
+        record['severity'] = self.severity.value
+        record['status'] = self.status.value
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> 'Alert':
+        """Rebuild an alert from an archive record."""
+        record = dict(record)
+        record['severity'] = AlertSeverity(record['severity'])
+        record['status'] = AlertStatus(record['status'])
+        if record.get('affected_services') is not None:
+            record['affected_services'] = [
+                BusinessService(**service) for service in record['affected_services']
+            ]
+        return cls(**record)
 
 class AlertManager:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], dns_cache: Optional[ReverseDnsCache] = None,
+                 thresholds: Optional[ThresholdRegistry] = None,
+                 polling_interval: float = 300):
         """Initialize the Alert Manager."""
         self.config = config
-        self.active_alerts: Dict[str, Alert] = {}
-        self.alert_history: List[Alert] = []
+        self.dns_cache = dns_cache or ReverseDnsCache({})
+        # Compiled metrics.thresholds; without one, each Metric's own thresholds apply
+        self.thresholds = thresholds
+        self.correlation_window = config.get('correlation_window', 3600)  # 1 hour default
+        self.deduplication_window = config.get('deduplication_window', 300)
+        self.active_alerts = ActiveAlertIndex(self.correlation_window)
+        # A sustained breach is re-seen once per polling cycle, so allow one interval of slack
+        self.deduplicator = AlertDeduplicator(
+            self.deduplication_window, config.get('max_occurrence_history', 100),
+            slack=polling_interval
+        )
+        self.alert_history = AlertArchive(
+            config.get('history', {}), Alert.to_record, Alert.from_record
+        )
+        self.service_index = ServiceIndex(config.get('service_cache_size', 4096))
         self.business_services = self._load_business_services()
         self.notification_config = config.get('notifications', {})
         self.templates = self._load_alert_templates()
-        self.correlation_window = config.get('correlation_window', 3600)  # 1 hour default
+        self._smtp_pool: Optional[SmtpConnectionPool] = None
+        self._email_digest: Optional[EmailDigest] = None
+        self._slack_dispatcher: Optional[WebhookDispatcher] = None
 
-    def _load_business_services(self) -> Dict[str, BusinessService]:
+    def _load_business_services(self, service_configs: Optional[List[Dict[str, Any]]] = None
+                                ) -> Dict[str, BusinessService]:
         """Load business service definitions."""
         services = {}
-        for service_config in self.config.get('business_services', []):
+        if service_configs is None:
+            service_configs = self.config.get('business_services', [])
+        for service_config in service_configs:
             service = BusinessService(
                 name=service_config['name'],
                 description=service_config['description'],
                 priority=service_config['priority'],
-                dependencies=service_config.get('dependencies', []),
+                dependencies=list(service_config.get('dependencies', [])),
                 contacts=service_config.get('contacts', [])
             )
             services[service.name] = service
+        self.service_index.update(services)
         return services
 
-    def _load_alert_templates(self) -> Dict[str, Template]:
+    def reload_business_services(self, service_configs: List[Dict[str, Any]]):
+        """Replace business service definitions, re-indexing only what changed."""
+        self.business_services = self._load_business_services(service_configs)
+
+    def _load_alert_templates(self) -> TemplateRenderer:
         """Load Jinja2 templates for alert notifications."""
-        templates = {}
-        template_dir = self.config.get('template_dir', 'templates')
-        
-        # Load email templates
-        with open(f"{template_dir}/email_critical.j2") as f:
-            templates['email_critical'] = Template(f.read())
-        with open(f"{template_dir}/email_warning.j2") as f:
-            templates['email_warning'] = Template(f.read())
-        with open(f"{template_dir}/email_info.j2") as f:
-            templates['email_info'] = Template(f.read())
-            
-        # Load Slack templates
-        with open(f"{template_dir}/slack_critical.j2") as f:
-            templates['slack_critical'] = Template(f.read())
-        with open(f"{template_dir}/slack_warning.j2") as f:
-            templates['slack_warning'] = Template(f.read())
-        with open(f"{template_dir}/slack_info.j2") as f:
-            templates['slack_info'] = Template(f.read())
-            
-        return templates
+        return TemplateRenderer(
+            self.config.get('template_dir', 'templates'),
+            cache_dir=self.config.get('template_cache_dir'),
+            fragment_cache_size=self.config.get('template_fragment_cache_size', 256)
+        )
 
-    def process_metrics(self, device: 'Device', metrics: List['Metric']) -> List[Alert]:
+    def process_metrics(self, device: 'Device',
+                        metrics: Union[MetricBatch, List['Metric']]) -> List[Alert]:
         """Process metrics and generate alerts based on thresholds."""
+        return self.process_metrics_batch([(device, metrics)])
+
+    def process_metrics_batch(self, batch: List[Tuple['Device', Union[MetricBatch, List['Metric']]]]
+                              ) -> List[Alert]:
+        """Evaluate a whole cycle's metrics at once and alert on breaching rows."""
+        entries = [(device, metrics) for device, metrics in batch if len(metrics)]
+        if not entries:
+            return []
+
+        columns = [self._threshold_columns(device, metrics) for device, metrics in entries]
+        values, warnings, criticals = (np.concatenate(parts) for parts in zip(*columns))
+        codes = evaluate_thresholds(values, warnings, criticals)
+        ends = np.cumsum([len(metrics) for _, metrics in entries])
+        if self.thresholds is not None:
+            self._apply_status_thresholds(codes, entries, ends)
+
+        alerts = []
+        now = time.time()
+        for i in np.flatnonzero(codes):
+            entry = int(np.searchsorted(ends, i, side='right'))
+            device, metrics = entries[entry]
+            metric = metrics[int(i - ends[entry] + len(metrics))]
+            severity = _SEVERITY_BY_CODE[int(codes[i])]
+            threshold = criticals[i] if not math.isnan(criticals[i]) else warnings[i]
+            threshold = metric.value if math.isnan(threshold) else float(threshold)
+            self._raise_alert(alerts, device, metric, severity, threshold, now)
+        return alerts
+
+    def process_security_events(self, events: List['SecurityEvent']) -> List[Alert]:
+        """Alert on security counters whose sliding-window totals breached a threshold."""
         alerts = []
-        for metric in metrics:
-            if self._should_alert(metric):
-                alert = self._create_alert(device, metric)
-                if alert:
-                    alerts.append(alert)
+        now = time.time()
+        for event in events:
+            self._raise_alert(alerts, event.device, event.metric,
+                              _SEVERITY_BY_CODE[event.severity], event.threshold, now)
         return alerts
 
-    def _should_alert(self, metric: 'Metric') -> bool:
-        """Determine if a metric should trigger an alert."""
-        if metric.threshold_critical is not None and metric.value >= metric.threshold_critical:
-            return True
-        if metric.threshold_warning is not None and metric.value >= metric.threshold_warning:
-            return True
-        return False
+    def _raise_alert(self, alerts: List[Alert], device: 'Device', metric: 'Metric',
+                     severity: AlertSeverity, threshold: Any, now: float):
+        """Create an alert for a breach, or update the open one for a repeat breach."""
+        # Repeat breaches update the open alert instead of raising a new one
+        existing = self.deduplicator.find(self.active_alerts, device.ip, metric.name, now,
+                                          metric.interface)
+        if existing is not None:
+            if self.deduplicator.record_occurrence(existing, metric, severity, now):
+                existing.escalation_path = self._get_escalation_path(severity)
+                alerts.append(existing)
+            self.alert_history.update(existing)
+            return
 
-    def _create_alert(self, device: 'Device', metric: 'Metric') -> Optional[Alert]:
+        alert = self._create_alert(device, metric, severity, threshold)
+        if alert:
+            self.deduplicator.register(alert)
+            alerts.append(alert)
+
+    def _threshold_columns(self, device: 'Device', metrics: Union[MetricBatch, List['Metric']]
+                           ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Values, warning and critical thresholds of a device's metrics as arrays."""
+        values, warnings, criticals = self._metric_columns(metrics)
+        if self.thresholds is None:
+            return values, warnings, criticals
+
+        # Configured thresholds, resolved for this device, replace the per-metric ones
+        profile = self.thresholds.profile(device)
+        if isinstance(metrics, MetricBatch):
+            indices = self.thresholds.descriptor_indices(metrics.table)[
+                np.frombuffer(metrics.descriptor_ids, dtype=np.uint32)
+            ]
+        else:
+            indices = np.fromiter((self.thresholds.sample_index(m.name) for m in metrics),
+                                  dtype=np.intp, count=len(metrics))
+        configured = indices >= 0
+        return (values,
+                np.where(configured, profile.warnings[indices], warnings),
+                np.where(configured, profile.criticals[indices], criticals))
+
+    def _apply_status_thresholds(self, codes: np.ndarray, entries, ends: np.ndarray):
+        """Set severity codes for status values named by thresholds, e.g. fan "failed"."""
+        for (device, metrics), end in zip(entries, ends):
+            profile = self.thresholds.profile(device)
+            if not profile.status:
+                continue
+            start = int(end) - len(metrics)
+            if isinstance(metrics, MetricBatch):
+                descriptors = metrics.table.descriptors
+                rows = ((row, descriptors[metrics.descriptor_ids[row]].name, value)
+                        for row, value in metrics.text.items())
+            else:
+                rows = ((row, m.name, m.value) for row, m in enumerate(metrics)
+                        if isinstance(m.value, str))
+            for row, name, value in rows:
+                code = self.thresholds.status_code(profile, self.thresholds.index(name), value)
+                if code:
+                    codes[start + row] = code
+
+    @staticmethod
+    def _metric_columns(metrics: Union[MetricBatch, List['Metric']]
+                        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Values and each metric's own warning and critical thresholds as arrays."""
+        if isinstance(metrics, MetricBatch):
+            return (metrics.numeric_values(), *metrics.thresholds())
+        count = len(metrics)
+        values = np.fromiter((_as_float(m.value) for m in metrics), dtype=float, count=count)
+        warnings = np.fromiter(
+            (math.nan if m.threshold_warning is None else m.threshold_warning for m in metrics),
+            dtype=float, count=count
+        )
+        criticals = np.fromiter(
+            (math.nan if m.threshold_critical is None else m.threshold_critical for m in metrics),
+            dtype=float, count=count
+        )
+        return values, warnings, criticals
+
+    def _create_alert(self, device: 'Device', metric: 'Metric', severity: AlertSeverity,
+                      threshold: Any = None) -> Optional[Alert]:
         """Create an alert from a metric."""
         try:
-            # Determine severity
-            severity = self._determine_severity(metric)
-            
             # Generate alert ID
-            alert_id = f"{device.ip}_{metric.name}_{int(time.time())}"
+            scope = device.ip if metric.interface is None else f"{device.ip}_{metric.interface}"
+            alert_id = f"{scope}_{metric.name}_{int(time.time())}"
             
             # Check for correlation with existing alerts
             correlation_id = self._check_correlation(device.ip, metric.name)
@@ -136,16 +298,18 @@ class AlertManager:
                 severity=severity,
                 status=AlertStatus.NEW,
                 device_ip=device.ip,
-                device_name=device.hostname,
+                device_name=self._device_label(device),
                 metric_name=metric.name,
                 metric_value=metric.value,
-                threshold=metric.threshold_critical or metric.threshold_warning,
+                threshold=(threshold if threshold is not None
+                           else metric.threshold_critical or metric.threshold_warning),
                 timestamp=time.time(),
                 description=self._generate_alert_description(device, metric),
                 affected_services=self._determine_affected_services(device, metric),
                 correlation_id=correlation_id,
                 resolution_steps=self._get_resolution_steps(device, metric),
-                escalation_path=self._get_escalation_path(severity)
+                escalation_path=self._get_escalation_path(severity),
+                interface=metric.interface
             )
             
             # Store alert
@@ -158,39 +322,30 @@ class AlertManager:
             logger.error(f"Error creating alert: {e}")
             return None
 
-    def _determine_severity(self, metric: 'Metric') -> AlertSeverity:
-        """Determine alert severity based on metric values and thresholds."""
-        if metric.threshold_critical is not None and metric.value >= metric.threshold_critical:
-            return AlertSeverity.CRITICAL
-        if metric.threshold_warning is not None and metric.value >= metric.threshold_warning:
-            return AlertSeverity.WARNING
-        return AlertSeverity.INFO
-
     def _check_correlation(self, device_ip: str, metric_name: str) -> Optional[str]:
         """Check for correlation with existing alerts."""
-        current_time = time.time()
-        for alert in self.active_alerts.values():
-            if (alert.device_ip == device_ip and 
-                alert.metric_name == metric_name and 
-                current_time - alert.timestamp < self.correlation_window):
-                return alert.correlation_id or alert.id
-        return None
+        return self.active_alerts.correlate(device_ip, metric_name, time.time())
 
     def _determine_affected_services(self, device: 'Device', 
                                    metric: 'Metric') -> List[BusinessService]:
         """Determine which business services are affected by this alert."""
-        affected_services = []
-        for service in self.business_services.values():
-            if device.ip in service.dependencies:
-                affected_services.append(service)
-        return affected_services
+        return self.service_index.lookup(device.ip)
 
     def _generate_alert_description(self, device: 'Device', 
                                   metric: 'Metric') -> str:
         """Generate a detailed description of the alert."""
-        return (f"Alert: {metric.name} on {device.hostname} ({device.ip}) "
+        subject = self._device_label(device)
+        if metric.interface is not None:
+            subject = f"{metric.interface} of {subject}"
+        return (f"Alert: {metric.name} on {subject} ({device.ip}) "
                 f"exceeded threshold. Current value: {metric.value}{metric.unit}")
 
+    def _device_label(self, device: 'Device') -> str:
+        """Name a device, falling back to its cached PTR name (never queries DNS)."""
+        if device.hostname and device.hostname != device.ip:
+            return device.hostname
+        return self.dns_cache.cached(device.ip) or device.ip
+
     def _get_resolution_steps(self, device: 'Device', 
                             metric: 'Metric') -> List[str]:
         """Get resolution steps based on the type of alert."""
@@ -231,7 +386,6 @@ class AlertManager:
     def _send_slack_notification(self, alert: Alert):
         """Send notification to Slack."""
         try:
-            webhook_url = self.notification_config['slack_webhook_url']
             template_name = f"slack_{alert.severity.value}"
             
             # Render the Slack message using template
@@ -240,21 +394,24 @@ class AlertManager:
                 business_services=self.business_services
             )
             
-            # Send to Slack
-            response = requests.post(
-                webhook_url,
-                json={"text": message},
-                headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()
+            # Delivered and coalesced by background workers, off the polling path
+            self._get_slack_dispatcher().submit(message)
             
         except Exception as e:
             logger.error(f"Error sending Slack notification: {e}")
 
+    def _get_slack_dispatcher(self) -> WebhookDispatcher:
+        """Start the Slack webhook dispatcher on first use."""
+        if self._slack_dispatcher is None:
+            self._slack_dispatcher = WebhookDispatcher(
+                self.notification_config['slack_webhook_url'],
+                self.notification_config.get('slack_dispatch', {})
+            )
+        return self._slack_dispatcher
+
     def _send_email_notification(self, alert: Alert):
         """Send notification via email."""
         try:
-            smtp_config = self.notification_config['smtp']
             template_name = f"email_{alert.severity.value}"
             
             # Render the email content using template
@@ -263,24 +420,48 @@ class AlertManager:
                 business_services=self.business_services
             )
             
-            # Create email message
-            msg = MIMEMultipart()
-            msg['Subject'] = f"Network Alert: {alert.severity.value.upper()} - {alert.metric_name}"
-            msg['From'] = smtp_config['from_address']
-            msg['To'] = ", ".join(self._get_notification_recipients(alert))
-            msg.attach(MIMEText(content, 'html'))
-            
-            # Send email
-            with smtplib.SMTP(smtp_config['server'], smtp_config['port']) as server:
-                if smtp_config.get('use_tls', True):
-                    server.starttls()
-                if smtp_config.get('username'):
-                    server.login(smtp_config['username'], smtp_config['password'])
-                server.send_message(msg)
+            # Pooled connection; grouped into a digest when digest_window is set
+            self._get_email_digest().submit(
+                alert, self._get_notification_recipients(alert), content
+            )
                 
         except Exception as e:
             logger.error(f"Error sending email notification: {e}")
 
+    def _get_email_digest(self) -> EmailDigest:
+        """Create the SMTP pool and digest sender on first use."""
+        if self._email_digest is None:
+            smtp_config = self.notification_config['smtp']
+            self._smtp_pool = SmtpConnectionPool(smtp_config)
+            self._email_digest = EmailDigest(smtp_config, self._smtp_pool,
+                                             self._render_email_digest)
+        return self._email_digest
+
+    def _render_email_digest(self, alerts: List[Alert]) -> str:
+        """Render several alerts for the same recipients as one email."""
+        return self.templates['email_digest'].render(
+            alerts=alerts,
+            business_services=self.business_services
+        )
+
+    def get_notification_stats(self) -> Dict[str, Any]:
+        """Get delivery counters for the notification channels."""
+        stats = {}
+        if self._email_digest is not None:
+            stats['email'] = {**self._smtp_pool.stats, **self._email_digest.stats}
+        if self._slack_dispatcher is not None:
+            stats['slack'] = dict(self._slack_dispatcher.stats)
+        return stats
+
+    def close(self):
+        """Flush pending digests, release notification connections and close the archive."""
+        if self._slack_dispatcher is not None:
+            self._slack_dispatcher.close()
+        if self._email_digest is not None:
+            self._email_digest.flush()
+            self._smtp_pool.close()
+        self.alert_history.close()
+
     def _get_notification_recipients(self, alert: Alert) -> List[str]:
         """Get list of notification recipients based on alert and affected services."""
         recipients = set()
@@ -299,14 +480,17 @@ class AlertManager:
     def acknowledge_alert(self, alert_id: str, user: str):
         """Acknowledge an alert."""
         if alert_id in self.active_alerts:
-            self.active_alerts[alert_id].status = AlertStatus.ACKNOWLEDGED
+            alert = self.active_alerts[alert_id]
+            alert.status = AlertStatus.ACKNOWLEDGED
+            self.alert_history.update(alert)
 
     def resolve_alert(self, alert_id: str, resolution_notes: str):
         """Resolve an alert."""
         if alert_id in self.active_alerts:
-            self.active_alerts[alert_id].status = AlertStatus.RESOLVED
-            # Archive the alert
-            self.alert_history.append(self.active_alerts[alert_id])
+            alert = self.active_alerts[alert_id]
+            alert.status = AlertStatus.RESOLVED
+            self.alert_history.update(alert)
+            self.deduplicator.forget(alert)
             del self.active_alerts[alert_id]
 
     def get_active_alerts(self) -> List[Alert]:
@@ -315,7 +499,4 @@ class AlertManager:
 
     def get_alert_history(self, start_time: float, end_time: float) -> List[Alert]:
         """Get historical alerts within the specified time range."""
-        return [
-            alert for alert in self.alert_history
-            if start_time <= alert.timestamp <= end_time
-        ]
+        return self.alert_history.query(start_time, end_time)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Async Metrics Manager Module
+Author: 13city
+
+asyncio-native variant of MetricsManager. DNS checks run on non-blocking
+sockets, and ICMP probes for the whole cycle go out as one burst through the
+shared BatchIcmpProber socket (off the event loop), so thousands of devices
+can be polled from one event loop without a socket or thread per probe.
+SNMP is likewise collected off the loop; code running on the loop only ever
+reads samples that are already cached.
+"""
+
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, List, Any, Optional
+import dns.asyncresolver
+
+from modules.icmp_prober import ProbeResult
+from modules.metric_batch import MetricBatch
+from modules.metrics_manager import MetricsManager, Metric
+from modules.snmp_collector import SnmpSample
+
+logger = logging.getLogger('NetworkMonitor.AsyncMetricsManager')
+
+class AsyncMetricsManager(MetricsManager):
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize the Async Metrics Manager."""
+        super().__init__(config)
+        self.max_concurrency = config.get('async_max_concurrency', 1000)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Create the concurrency limiter inside the running event loop."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def collect_metrics_many(self, devices: List['Device']) -> Dict[str, MetricBatch]:
+        """Collect metric batches for many devices concurrently, keyed by device IP."""
+        # The ICMP burst and the SNMP dispatcher both block; run them off-loop,
+        # once for the whole cycle
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            loop.run_in_executor(None, self.apply_retention),
+            loop.run_in_executor(None, self.rollups.compact, time.time()),
+            loop.run_in_executor(None, self.probe_devices, devices),
+            loop.run_in_executor(None, self.collect_snmp, devices)
+        )
+        results = await asyncio.gather(
+            *(self.collect_metric_batch_async(device) for device in devices)
+        )
+        return {device.ip: batch for device, batch in zip(devices, results)}
+
+    async def collect_metrics_async(self, device: 'Device') -> List[Metric]:
+        """Collect all metrics for a device without blocking the event loop."""
+        return list(await self.collect_metric_batch_async(device))
+
+    async def collect_metric_batch_async(self, device: 'Device') -> MetricBatch:
+        """Collect all metrics for a device into one batch without blocking the event loop."""
+        batch = self.new_batch(device)
+        try:
+            async with self._get_semaphore():
+                await self.snmp_sample_async(device)
+                await self._collect_network_performance_async(device, batch)
+                self._collect_security_metrics(device, batch)
+                self._collect_physical_metrics(device, batch)
+
+                if device.device_type in ['router', 'firewall']:
+                    await self._collect_core_service_metrics_async(device, batch)
+
+            # Segment writes and flushes are disk I/O; keep them off the loop
+            await asyncio.get_running_loop().run_in_executor(None, self._store_metrics, batch)
+            return batch
+        except Exception as e:
+            logger.error(f"Error collecting metrics for device {device.ip}: {e}")
+            return self.new_batch(device)
+
+    async def _collect_network_performance_async(self, device: 'Device', batch: MetricBatch):
+        """Collect network performance metrics asynchronously."""
+        try:
+            self._build_network_performance_metrics(
+                batch, await self.measure_probe_series_async(device)
+            )
+            self._build_interface_metrics(batch, self.get_interface_rates(device))
+        except Exception as e:
+            logger.error(f"Error collecting network performance metrics: {e}")
+
+    async def _collect_core_service_metrics_async(self, device: 'Device', batch: MetricBatch):
+        """Collect core network service metrics asynchronously."""
+        try:
+            self._build_core_service_metrics(
+                batch,
+                dns_response=await self._check_dns_health_async(),
+                dhcp_status=self._check_dhcp_health(),
+                ad_status=self._check_ad_replication()
+            )
+        except Exception as e:
+            logger.error(f"Error collecting core service metrics: {e}")
+
+    async def measure_probe_series_async(self, device: 'Device') -> ProbeResult:
+        """Get this cycle's probe series for a device, probing it off-loop if needed."""
+        result = self._probe_results.get(device.ip)
+        if result is not None and time.time() - self._probe_results_time <= self.probe_cache_ttl:
+            return result
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.measure_probe_series, device
+        )
+
+    def snmp_sample(self, device: 'Device', deadline: Optional[float] = None) -> SnmpSample:
+        """Get the cached SNMP sample for a device; never collects on the event loop."""
+        sample = self._snmp_samples.get(device.ip)
+        if sample is None or time.time() - sample.timestamp > self.probe_cache_ttl:
+            self._interface_rates.pop(device.ip, None)
+            return SnmpSample(ip=device.ip, timestamp=time.time(), error='not collected')
+        return sample
+
+    async def snmp_sample_async(self, device: 'Device') -> SnmpSample:
+        """Get this cycle's SNMP sample for a device, collecting it off-loop if needed."""
+        sample = self._snmp_samples.get(device.ip)
+        if sample is not None and time.time() - sample.timestamp <= self.probe_cache_ttl:
+            return sample
+        return await asyncio.get_running_loop().run_in_executor(
+            None, MetricsManager.snmp_sample, self, device
+        )
+
+    async def _check_dns_health_async(self) -> float:
+        """Check DNS health and response times."""
+        async def query(server: str) -> Optional[float]:
+            try:
+                resolver = dns.asyncresolver.Resolver()
+                resolver.nameservers = [server]
+                start_time = time.time()
+                await resolver.resolve('google.com', 'A')
+                return (time.time() - start_time) * 1000
+            except Exception as e:
+                logger.error(f"DNS check failed for {server}: {e}")
+                return None
+
+        results = await asyncio.gather(*(query(server) for server in self.dns_servers))
+        response_times = [r for r in results if r is not None]
+        return statistics.mean(response_times) if response_times else float('inf')
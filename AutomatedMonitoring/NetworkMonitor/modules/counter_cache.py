@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Counter Cache Module
+Author: 13city
+
+Turns successive SNMP samples into per-interface rates. The previous value
+of every (device, ifIndex, counter) is kept in one numpy array per device.
+Each new sample is differenced against it in a single vectorized step that
+handles 32-bit counter wraps, 64-bit discontinuities and device reboots.
+sysUpTime going backwards is a reboot unless the modulo-2**32 uptime delta
+matches the wall-clock time between samples, in which case the 32-bit
+TimeTicks value simply wrapped (every ~497 days).
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('NetworkMonitor.CounterCache')
+
+# Counters differenced per interface, in array order within each interface
+COUNTERS = ('in_octets', 'out_octets', 'in_errors', 'out_errors')
+
+# Sample column for each counter: (64-bit column, 32-bit fallback)
+COUNTER_COLUMNS = {
+    'in_octets': ('if_hc_in_octets', 'if_in_octets'),
+    'out_octets': ('if_hc_out_octets', 'if_out_octets'),
+    'in_errors': (None, 'if_in_errors'),
+    'out_errors': (None, 'if_out_errors'),
+}
+
+MASK_32 = np.uint64(0xFFFFFFFF)
+UPTIME_MODULUS = 2 ** 32      # sysUpTime is a 32-bit TimeTicks value
+UPTIME_SLACK = (2.0, 0.1)     # Seconds, fraction of wall time an uptime delta may differ by
+
+@dataclass
+class InterfaceRates:
+    """Per-interface rates for one device between two samples."""
+    device_ip: str
+    interfaces: List[str]          # ifIndex of each row
+    names: List[str]               # ifName of each row, or the ifIndex
+    elapsed: float                 # Seconds between the two samples
+    in_bps: np.ndarray
+    out_bps: np.ndarray
+    utilization: np.ndarray        # Percent of ifHighSpeed, busier direction; NaN if unknown
+    in_errors: np.ndarray          # Errors since the previous sample
+    out_errors: np.ndarray
+
+class _CounterState:
+    """Previous sample for one device, stored compactly."""
+    __slots__ = ('keys', 'values', 'wide', 'uptime', 'timestamp')
+
+    def __init__(self, keys: Tuple[Tuple[str, str], ...], values: np.ndarray,
+                 wide: np.ndarray, uptime: Optional[int], timestamp: float):
+        self.keys = keys          # (ifIndex, counter) for each array position
+        self.values = values      # uint64 counter values
+        self.wide = wide          # True where the counter is 64-bit
+        self.uptime = uptime      # sysUpTime in hundredths of a second
+        self.timestamp = timestamp
+
+class CounterStateCache:
+    def __init__(self):
+        """Initialize an empty cache."""
+        self._states: Dict[str, _CounterState] = {}
+        self.stats = {'samples': 0, 'wraps': 0, 'discontinuities': 0, 'reboots': 0,
+                      'uptime_wraps': 0}
+
+    def update(self, device_ip: str, sample: 'SnmpSample') -> Optional[InterfaceRates]:
+        """Store a sample and return rates against the previous one, if usable."""
+        keys, values, wide, speeds, names, interfaces = self._flatten(sample)
+        uptime = sample.scalars.get('sys_uptime')
+        previous = self._states.get(device_ip)
+        self._states[device_ip] = _CounterState(keys, values, wide, uptime, sample.timestamp)
+        self.stats['samples'] += 1
+
+        if previous is None or not interfaces or not previous.keys:
+            return None
+
+        elapsed = sample.timestamp - previous.timestamp
+        if uptime is not None and previous.uptime is not None and uptime != previous.uptime:
+            # Agent clock, immune to poll jitter
+            ticks = (uptime - previous.uptime) % UPTIME_MODULUS
+            if uptime < previous.uptime:
+                if abs(ticks / 100 - elapsed) > max(UPTIME_SLACK[0], UPTIME_SLACK[1] * elapsed):
+                    self.stats['reboots'] += 1
+                    logger.info(f"{device_ip} restarted since the last poll; counters rebaselined")
+                    return None
+                self.stats['uptime_wraps'] += 1
+            elapsed = ticks / 100
+        if elapsed <= 0:
+            return None
+
+        # Line the previous values up with this sample's layout
+        if previous.keys == keys:
+            before, known = previous.values, np.ones(len(keys), dtype=bool)
+        else:
+            positions = {key: i for i, key in enumerate(previous.keys)}
+            index = np.fromiter((positions.get(key, -1) for key in keys), dtype=np.int64,
+                                count=len(keys))
+            known = index >= 0
+            before = np.where(known, previous.values[np.maximum(index, 0)], 0).astype(np.uint64)
+
+        # uint64 subtraction wraps modulo 2**64; mask 32-bit counters to 2**32
+        backwards = values < before
+        delta = values - before
+        delta = np.where(wide, delta, delta & MASK_32)
+        # A 64-bit counter never wraps in practice; going backwards means a reset
+        valid = known & ~(backwards & wide)
+        self.stats['wraps'] += int(np.count_nonzero(backwards & ~wide & known))
+        self.stats['discontinuities'] += int(np.count_nonzero(backwards & wide & known))
+
+        deltas = np.where(valid, delta.astype(np.float64), np.nan).reshape(-1, len(COUNTERS))
+        in_bps = deltas[:, 0] * 8 / elapsed
+        out_bps = deltas[:, 1] * 8 / elapsed
+        with np.errstate(divide='ignore', invalid='ignore'):
+            utilization = np.fmax(in_bps, out_bps) / speeds * 100
+        utilization[~(speeds > 0)] = np.nan
+
+        return InterfaceRates(
+            device_ip=device_ip,
+            interfaces=interfaces,
+            names=names,
+            elapsed=elapsed,
+            in_bps=in_bps,
+            out_bps=out_bps,
+            utilization=utilization,
+            in_errors=deltas[:, 2],
+            out_errors=deltas[:, 3]
+        )
+
+    def _flatten(self, sample: 'SnmpSample'):
+        """Lay a sample's counters out as one array, interface by interface."""
+        columns = sample.columns
+        counter_columns = [
+            (columns.get(wide, {}) if wide else {}, columns.get(narrow, {}))
+            for wide, narrow in (COUNTER_COLUMNS[counter] for counter in COUNTERS)
+        ]
+        interfaces = sorted(
+            set().union(*(set(wide) | set(narrow) for wide, narrow in counter_columns)),
+            key=lambda index: tuple(int(part) for part in index.split('.'))
+        )
+
+        # Prefer each interface's 64-bit counter; fall back to the 32-bit one
+        keys = tuple((index, counter) for index in interfaces for counter in COUNTERS)
+        wide = np.fromiter(
+            (index in wide_values for index in interfaces for wide_values, _ in counter_columns),
+            dtype=bool, count=len(keys)
+        )
+        values = np.fromiter(
+            (wide_values[index] if index in wide_values else narrow_values.get(index, 0)
+             for index in interfaces for wide_values, narrow_values in counter_columns),
+            dtype=np.uint64, count=len(keys)
+        )
+
+        high_speed = columns.get('if_high_speed', {})
+        speed = columns.get('if_speed', {})
+        speeds = np.array([
+            high_speed[index] * 1e6 if high_speed.get(index) else speed.get(index, 0)
+            for index in interfaces
+        ], dtype=np.float64)
+        if_names = columns.get('if_name', {})
+        names = [if_names.get(index, index) for index in interfaces]
+        return keys, values, wide, speeds, names, interfaces
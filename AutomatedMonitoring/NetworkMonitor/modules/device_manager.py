@@ -5,17 +5,23 @@ Author: 13city
 
 Handles device discovery, management, and status tracking for network devices.
 Supports both static device configuration and automatic network discovery.
+Discovery runs on a background worker that publishes each update as a new
+device snapshot, so get_devices() never waits on a subnet sweep.
 """
 
 import logging
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any, Optional
 import ipaddress
-import socket
-from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 
+from modules.discovery_scanner import DiscoveryScanner
+from modules.dns_cache import ReverseDnsCache
+
 logger = logging.getLogger('NetworkMonitor.DeviceManager')
 
 class DeviceType(Enum):
@@ -51,13 +57,22 @@ class Device:
     location: str = None
     
 class DeviceManager:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], dns_cache: Optional[ReverseDnsCache] = None):
         """Initialize the Device Manager."""
         self.config = config
+        self.dns_cache = dns_cache or ReverseDnsCache({})
+        self.scanner = DiscoveryScanner(config.get('discovery_scan', {}))
+        # Published snapshot: replaced as a whole on every update, never mutated
         self.devices: Dict[str, Device] = {}
         self.credentials = self._process_credentials(config.get('credentials', {}))
         self.discovery_interval = config.get('discovery_interval', 3600)  # 1 hour default
+        self.discovery_shards = max(1, config.get('discovery_shards', 12))
         self.last_discovery = 0
+        self._live_ports: Dict[str, int] = {}  # Discovered device -> port it answered on
+        self._next_shard = 0
+        self._publish_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
         self._discover_devices()
 
     def _process_credentials(self, cred_config: Dict) -> Dict[str, DeviceCredentials]:
@@ -78,22 +93,93 @@ class DeviceManager:
         return processed_creds
 
     def _discover_devices(self):
-        """Discover network devices based on configuration."""
+        """Load statically configured devices; network discovery runs in the background."""
         try:
             # Process static device list
             static_devices = self.config.get('static_devices', [])
             for device_config in static_devices:
                 self._add_static_device(device_config)
+            logger.info(f"Loaded {len(self.devices)} static devices")
+        except Exception as e:
+            logger.error(f"Error during device discovery: {e}")
 
-            # Perform network discovery if enabled
-            if self.config.get('enable_discovery', False):
-                self._auto_discover_devices()
+    def _start_discovery_worker(self):
+        """Start the background discovery worker if discovery is enabled."""
+        if self._worker is not None or not self.config.get('enable_discovery', False):
+            return
+        self._worker = threading.Thread(
+            target=self._discovery_loop, name='device-discovery', daemon=True
+        )
+        self._worker.start()
 
-            logger.info(f"Discovered {len(self.devices)} devices")
+    def _discovery_loop(self):
+        """Sweep every network once, then one shard per tick plus liveness rechecks."""
+        try:
+            self._auto_discover_devices(self._discovery_hosts())
             self.last_discovery = time.time()
+            logger.info(f"Discovered {len(self.devices)} devices")
         except Exception as e:
             logger.error(f"Error during device discovery: {e}")
 
+        # Spread the next full sweep evenly across the discovery interval
+        tick = self.discovery_interval / self.discovery_shards
+        while not self._stop.wait(tick):
+            try:
+                self._recheck_live_devices()
+                self._auto_discover_devices(self._shard_hosts(self._next_shard))
+                self._next_shard = (self._next_shard + 1) % self.discovery_shards
+                if self._next_shard == 0:
+                    self.last_discovery = time.time()
+                    logger.info(f"Discovery sweep complete: {len(self.devices)} devices")
+            except Exception as e:
+                logger.error(f"Error during device discovery: {e}")
+
+    def _shard_hosts(self, shard: int) -> Iterator[str]:
+        """Yield the unknown hosts in one shard of the discovery networks."""
+        known = self.devices
+        hosts = itertools.islice(self._discovery_hosts(), shard, None, self.discovery_shards)
+        return (ip for ip in hosts if ip not in known)
+
+    def _recheck_live_devices(self):
+        """Re-probe discovered devices on the port they last answered on."""
+        by_port: Dict[int, List[str]] = {}
+        for ip, port in list(self._live_ports.items()):
+            by_port.setdefault(port, []).append(ip)
+
+        # Probe without the lock; results are applied to the snapshot current at publish time
+        results: Dict[str, bool] = {}
+        for port, ips in by_port.items():
+            responsive = {ip for ip, _ in self.scanner.scan(ips, ports=[port])}
+            results.update((ip, ip in responsive) for ip in ips)
+
+        # Published Device objects are shared with readers; publish updated copies
+        with self._publish_lock:
+            updated: Dict[str, Device] = {}
+            for ip, is_up in results.items():
+                device = self.devices.get(ip)
+                if device is None:
+                    continue
+                if is_up:
+                    updated[ip] = replace(device, status='up', last_seen=time.time())
+                elif device.status != 'down':
+                    updated[ip] = replace(device, status='down')
+                    logger.info(f"Discovered device stopped responding: {ip}")
+            self._swap(updated)
+
+    def _publish(self, discovered: Dict[str, Device]):
+        """Swap in a new device snapshot that includes new or updated devices."""
+        if not discovered:
+            return
+        with self._publish_lock:
+            self._swap(discovered)
+
+    def _swap(self, changed: Dict[str, Device]):
+        """Replace the snapshot with a copy including changed devices; hold _publish_lock."""
+        if changed:
+            devices = dict(self.devices)
+            devices.update(changed)
+            self.devices = devices
+
     def _add_static_device(self, device_config: Dict):
         """Add a statically configured device."""
         try:
@@ -110,57 +196,62 @@ class DeviceManager:
         except Exception as e:
             logger.error(f"Error adding static device {device_config.get('ip')}: {e}")
 
-    def _auto_discover_devices(self):
-        """Automatically discover devices in the network."""
-        networks = self.config.get('discovery_networks', [])
-        
+    def _auto_discover_devices(self, hosts: Iterable[str]):
+        """Discover devices among the given hosts and publish them in one update."""
+        discovered: Dict[str, Device] = {}
+
+        # Resolve every responsive host's name in one concurrent PTR batch,
+        # then gather SNMP details on a small pool
+        responsive = list(self.scanner.scan(hosts))
+        self.dns_cache.resolve_many(ip for ip, _ in responsive)
         with ThreadPoolExecutor(max_workers=10) as executor:
-            for network in networks:
+            futures = [
+                executor.submit(self._describe_device, ip, port)
+                for ip, port in responsive
+            ]
+            for future in as_completed(futures):
                 try:
-                    network_obj = ipaddress.ip_network(network)
-                    futures = [
-                        executor.submit(self._probe_device, str(ip))
-                        for ip in network_obj.hosts()
-                    ]
-                    for future in futures:
-                        try:
-                            result = future.result(timeout=2)
-                            if result:
-                                self._process_discovered_device(result)
-                        except Exception as e:
-                            logger.debug(f"Error processing discovery result: {e}")
+                    device = self._process_discovered_device(future.result())
+                    if device is not None:
+                        discovered[device.ip] = device
                 except Exception as e:
-                    logger.error(f"Error discovering network {network}: {e}")
+                    logger.debug(f"Error processing discovery result: {e}")
+
+        self._publish(discovered)
+
+    def _discovery_hosts(self) -> Iterator[str]:
+        """Yield every host address in the configured discovery networks."""
+        for network in self.config.get('discovery_networks', []):
+            try:
+                network_obj = ipaddress.ip_network(network)
+            except ValueError as e:
+                logger.error(f"Error discovering network {network}: {e}")
+                continue
+            for ip in network_obj.hosts():
+                yield str(ip)
 
     def _probe_device(self, ip: str) -> Dict[str, Any]:
         """Probe a single IP address for device discovery."""
         try:
-            # Try basic TCP port scan first
-            common_ports = [22, 23, 80, 443, 161]  # SSH, Telnet, HTTP, HTTPS, SNMP
-            for port in common_ports:
-                try:
-                    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                        s.settimeout(1)
-                        if s.connect_ex((ip, port)) == 0:
-                            # Device responds to at least one port
-                            hostname = self._get_hostname(ip)
-                            device_info = self._get_device_info(ip)
-                            return {
-                                'ip': ip,
-                                'hostname': hostname,
-                                'open_ports': port,
-                                **device_info
-                            }
-                except Exception:
-                    continue
+            for ip, port in self.scanner.scan([ip]):
+                return self._describe_device(ip, port)
         except Exception as e:
             logger.debug(f"Error probing device {ip}: {e}")
         return None
 
+    def _describe_device(self, ip: str, port: int) -> Dict[str, Any]:
+        """Gather hostname and device details for a responsive host."""
+        return {
+            'ip': ip,
+            'hostname': self._get_hostname(ip),
+            'open_ports': port,
+            **self._get_device_info(ip)
+        }
+
     def _get_hostname(self, ip: str) -> str:
         """Attempt to resolve hostname for an IP."""
         try:
-            return socket.gethostbyaddr(ip)[0]
+            return self.dns_cache.resolve(ip)
         except Exception:
             return ip
 
@@ -174,8 +265,8 @@ class DeviceManager:
             'type': DeviceType.OTHER
         }
 
-    def _process_discovered_device(self, device_info: Dict[str, Any]):
-        """Process and add a discovered device."""
+    def _process_discovered_device(self, device_info: Dict[str, Any]) -> Optional[Device]:
+        """Build a Device for a newly discovered host."""
         if device_info['ip'] not in self.devices:
             try:
                 device = Device(
@@ -188,27 +279,32 @@ class DeviceManager:
                     last_seen=time.time(),
                     status='up'
                 )
-                self.devices[device.ip] = device
+                self._live_ports[device.ip] = device_info['open_ports']
                 logger.info(f"Added discovered device: {device.ip} ({device.hostname})")
+                return device
             except Exception as e:
                 logger.error(f"Error processing discovered device {device_info['ip']}: {e}")
+        return None
 
     def get_devices(self) -> List[Device]:
-        """Get list of all managed devices."""
-        # Check if we need to run discovery again
-        if time.time() - self.last_discovery > self.discovery_interval:
-            self._discover_devices()
+        """Get the current device snapshot; discovery updates it in the background."""
+        self._start_discovery_worker()
         return list(self.devices.values())
 
+    async def get_devices_async(self) -> List[Device]:
+        """Get the current device snapshot from async code."""
+        return self.get_devices()
+
     def get_device(self, ip: str) -> Device:
         """Get a specific device by IP."""
         return self.devices.get(ip)
 
     def update_device_status(self, ip: str, status: str):
         """Update the status of a device."""
-        if ip in self.devices:
-            self.devices[ip].status = status
-            self.devices[ip].last_seen = time.time()
+        with self._publish_lock:
+            device = self.devices.get(ip)
+            if device is not None:
+                self._swap({ip: replace(device, status=status, last_seen=time.time())})
 
     def get_devices_by_type(self, device_type: DeviceType) -> List[Device]:
         """Get all devices of a specific type."""
@@ -217,3 +313,9 @@ class DeviceManager:
     def get_devices_by_vendor(self, vendor: str) -> List[Device]:
         """Get all devices from a specific vendor."""
         return [d for d in self.devices.values() if d.vendor.lower() == vendor.lower()]
+
+    def close(self):
+        """Stop the background discovery worker."""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
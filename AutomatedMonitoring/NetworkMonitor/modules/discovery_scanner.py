@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Discovery Scanner Module
+Author: 13city
+
+Non-blocking TCP connect scanner for subnet discovery. Connection attempts
+to every host:port pair are in flight concurrently under a global
+probes-per-second budget and a cap on open sockets, and responsive hosts
+are reported in completion order rather than submission order.
+"""
+
+import errno
+import logging
+import os
+import selectors
+import socket
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+logger = logging.getLogger('NetworkMonitor.DiscoveryScanner')
+
+DEFAULT_PORTS = [22, 23, 80, 443, 161]  # SSH, Telnet, HTTP, HTTPS, SNMP
+
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY}
+# Out of descriptors or buffers: worth retrying once in-flight probes close
+_RESOURCE_ERRORS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM}
+
+class TokenBucket:
+    """Probes-per-second limiter allowing short bursts."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate / 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available."""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+class DiscoveryScanner:
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize the scanner from the discovery_scan configuration."""
+        self.ports: List[int] = config.get('ports', DEFAULT_PORTS)
+        self.rate = config.get('rate', 5000)
+        self.max_open = config.get('max_open', 512)
+        self.timeout = config.get('timeout', 1.0)
+        self.stats = {'probes': 0, 'open': 0, 'timeouts': 0, 'refused': 0, 'errors': 0,
+                      'duration': 0.0}
+
+    def scan(self, hosts: Iterable[str],
+             ports: Optional[List[int]] = None) -> Iterator[Tuple[str, int]]:
+        """Yield (ip, open_port) for each responsive host as soon as it answers."""
+        started = time.monotonic()
+        probes = self.stats['probes']  # Stats accumulate across scans
+        bucket = TokenBucket(self.rate)
+        selector = selectors.DefaultSelector()
+        ports = self.ports if ports is None else ports
+        targets = ((ip, port) for ip in hosts for port in ports)
+        retry: deque = deque()  # Targets deferred until sockets free up
+        in_flight: Dict[socket.socket, Tuple[str, int]] = {}
+        deadlines: deque = deque()  # (deadline, sock); one timeout so already ordered
+        responsive = set()
+        exhausted = False
+
+        try:
+            while True:
+                # Launch new attempts within the rate and open-socket budgets
+                while not exhausted and len(in_flight) < self.max_open and bucket.take():
+                    target = retry.popleft() if retry else next(targets, None)
+                    if target is None:
+                        exhausted = True
+                        break
+                    if target[0] in responsive:
+                        bucket.tokens += 1  # Host already found; skip its other ports
+                        continue
+                    try:
+                        result = self._connect(selector, in_flight, deadlines, target)
+                    except OSError as e:
+                        if in_flight:
+                            # Retry after some in-flight probes complete
+                            retry.appendleft(target)
+                            bucket.tokens += 1
+                            break
+                        logger.warning(f"Skipping {target[0]}:{target[1]}: {e}")
+                        self.stats['errors'] += 1
+                        continue
+                    if result is not None:
+                        responsive.add(result[0])
+                        yield result
+
+                if exhausted and not in_flight:
+                    break
+
+                timeout = self.timeout
+                if deadlines:
+                    timeout = max(0.0, deadlines[0][0] - time.monotonic())
+                if not exhausted and len(in_flight) < self.max_open:
+                    timeout = min(timeout, bucket.wait_time())
+
+                if in_flight:
+                    events = selector.select(timeout)
+                else:
+                    time.sleep(timeout)  # Waiting on the rate limit only
+                    events = []
+
+                for key, _ in events:
+                    sock = key.fileobj
+                    ip, port = self._finish(selector, in_flight, sock)
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    sock.close()
+                    if err == 0:
+                        self.stats['open'] += 1
+                        if ip not in responsive:
+                            responsive.add(ip)
+                            yield ip, port
+                    elif err == errno.ECONNREFUSED:
+                        self.stats['refused'] += 1
+
+                now = time.monotonic()
+                while deadlines and deadlines[0][0] <= now:
+                    _, sock = deadlines.popleft()
+                    if sock in in_flight:
+                        self._finish(selector, in_flight, sock)
+                        sock.close()
+                        self.stats['timeouts'] += 1
+        finally:
+            for sock in list(in_flight):
+                self._finish(selector, in_flight, sock)
+                sock.close()
+            selector.close()
+            self.stats['duration'] = time.monotonic() - started
+            logger.info(
+                f"Discovery scan: {self.stats['probes'] - probes} probes, {len(responsive)} hosts "
+                f"responsive in {self.stats['duration']:.1f}s"
+            )
+
+    def _connect(self, selector, in_flight, deadlines,
+                 target: Tuple[str, int]) -> Optional[Tuple[str, int]]:
+        """Start a non-blocking connect; returns the target if it connected at once.
+
+        Raises OSError when out of sockets or buffers, so the target can be retried.
+        """
+        ip, port = target
+        family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+        sock = None
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            err = sock.connect_ex((ip, port))
+        except OSError as e:
+            if sock is not None:
+                sock.close()
+            if e.errno in _RESOURCE_ERRORS:
+                raise
+            logger.debug(f"Error probing {ip}:{port}: {e}")
+            self.stats['errors'] += 1
+            return None
+        if err in _RESOURCE_ERRORS:
+            sock.close()
+            raise OSError(err, os.strerror(err))
+        self.stats['probes'] += 1
+
+        if err == 0:
+            sock.close()
+            self.stats['open'] += 1
+            return target
+        if err not in _IN_PROGRESS:
+            sock.close()
+            if err == errno.ECONNREFUSED:
+                self.stats['refused'] += 1
+            return None
+
+        selector.register(sock, selectors.EVENT_WRITE)
+        in_flight[sock] = target
+        deadlines.append((time.monotonic() + self.timeout, sock))
+        return None
+
+    def _finish(self, selector, in_flight, sock: socket.socket) -> Tuple[str, int]:
+        selector.unregister(sock)
+        return in_flight.pop(sock)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+DNS Cache Module
+Author: 13city
+
+Shared reverse-DNS cache for discovery, alerting and topology. Answers are
+kept for the record TTL (capped by the configured ttl), failed lookups are
+cached for negative_ttl, and cache misses are resolved as one concurrent
+batch of PTR queries instead of one blocking lookup after another. The
+system backend runs each batch on its own thread pool that is never joined,
+so a hung resolver call can't hold a caller past the timeout.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+
+logger = logging.getLogger('NetworkMonitor.DnsCache')
+
+class ReverseDnsCache:
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize the cache from the dns_cache configuration."""
+        self.ttl = config.get('ttl', 3600)
+        self.negative_ttl = config.get('negative_ttl', 300)
+        self.max_entries = config.get('max_entries', 10000)
+        self.timeout = config.get('timeout', 2.0)
+        self.max_concurrency = config.get('max_concurrency', 100)
+        self.backend = config.get('backend', 'dns')  # 'dns' (PTR queries) or 'system'
+        self._entries: 'OrderedDict[str, Tuple[Optional[str], float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._resolver = None
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'queries': 0, 'failures': 0}
+
+    def cached(self, ip: str) -> Optional[str]:
+        """Get a cached hostname without ever issuing a DNS query."""
+        found, hostname = self._get(ip)
+        return hostname if found else None
+
+    def resolve(self, ip: str) -> str:
+        """Get the hostname for an IP, or the IP itself if it has none."""
+        return self.resolve_many([ip])[ip]
+
+    def resolve_many(self, ips: Iterable[str]) -> Dict[str, str]:
+        """Resolve many IPs, querying only cache misses, concurrently."""
+        results, misses = self._split(ips)
+        if misses:
+            results.update(asyncio.run(self._lookup_all(misses)))
+        return results
+
+    async def resolve_many_async(self, ips: Iterable[str]) -> Dict[str, str]:
+        """Resolve many IPs from a running event loop."""
+        results, misses = self._split(ips)
+        if misses:
+            results.update(await self._lookup_all(misses))
+        return results
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def _split(self, ips: Iterable[str]) -> Tuple[Dict[str, str], list]:
+        """Answer what the cache can; return the IPs that need a query."""
+        results: Dict[str, str] = {}
+        misses = []
+        for ip in dict.fromkeys(ips):
+            try:
+                ipaddress.ip_address(ip)
+            except ValueError:
+                results[ip] = ip  # Networks and names are labelled as-is
+                continue
+            found, hostname = self._get(ip)
+            if found:
+                results[ip] = hostname or ip
+            else:
+                misses.append(ip)
+        return results, misses
+
+    def _get(self, ip: str) -> Tuple[bool, Optional[str]]:
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[ip]
+                self.stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(ip)
+            if entry[0] is None:
+                self.stats['negative_hits'] += 1
+            else:
+                self.stats['hits'] += 1
+            return True, entry[0]
+
+    def _store(self, ip: str, hostname: Optional[str], ttl: float):
+        with self._lock:
+            self._entries[ip] = (hostname, time.time() + ttl)
+            self._entries.move_to_end(ip)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def _lookup_all(self, ips) -> Dict[str, str]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        executor = None
+        if self.backend == 'system':
+            # Not the loop's default executor, which asyncio.run waits for
+            executor = ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(ips)),
+                                          thread_name_prefix='dns-lookup')
+
+        async def lookup(ip: str) -> str:
+            async with semaphore:
+                self.stats['queries'] += 1
+                try:
+                    hostname, ttl = await self._lookup(ip, executor)
+                except Exception as e:
+                    logger.debug(f"Reverse lookup failed for {ip}: {e}")
+                    self.stats['failures'] += 1
+                    hostname, ttl = None, None
+
+                if hostname is None:
+                    self._store(ip, None, self.negative_ttl)
+                    return ip
+                self._store(ip, hostname, min(ttl, self.ttl) if ttl else self.ttl)
+                return hostname
+
+        try:
+            hostnames = await asyncio.gather(*(lookup(ip) for ip in ips))
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)  # Abandon lookups that timed out
+        return dict(zip(ips, hostnames))
+
+    async def _lookup(self, ip: str, executor: Optional[ThreadPoolExecutor] = None
+                      ) -> Tuple[Optional[str], Optional[int]]:
+        """Return (hostname, ttl); hostname is None when no PTR record exists."""
+        if self.backend == 'system':
+            loop = asyncio.get_running_loop()
+            try:
+                hostname = await asyncio.wait_for(
+                    loop.run_in_executor(executor, socket.gethostbyaddr, ip), self.timeout
+                )
+                return hostname[0], None
+            except socket.herror:
+                return None, None
+
+        if self._resolver is None:
+            self._resolver = dns.asyncresolver.Resolver()
+            self._resolver.lifetime = self.timeout
+        try:
+            answer = await self._resolver.resolve_address(ip)
+            return str(answer[0].target).rstrip('.'), answer.rrset.ttl
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return None, None
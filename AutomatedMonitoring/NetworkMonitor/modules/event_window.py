@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Event Window Module
+Author: 13city
+
+Sliding-window event counters for security metrics. Every (device, event
+type) gets a ring of fixed-width buckets covering its configured window, plus
+a running total. Adding events and reading the window total are O(1);
+expired buckets are subtracted from the total as the ring advances, so the
+window slides in steps of one bucket.
+"""
+
+import logging
+import threading
+from typing import Dict, Tuple
+
+logger = logging.getLogger('NetworkMonitor.EventWindow')
+
+class _RingCounter:
+    """Event counts for one (device, event type) in a ring of buckets."""
+    __slots__ = ('counts', 'width', 'head', 'total')
+
+    def __init__(self, buckets: int, width: float, now: float):
+        self.counts = [0] * buckets
+        self.width = width          # Seconds covered by each bucket
+        self.head = int(now // width)  # Absolute number of the newest bucket
+        self.total = 0              # Sum of every bucket in the ring
+
+    def advance(self, now: float):
+        """Move the ring forward to now, expiring buckets that left the window."""
+        bucket = int(now // self.width)
+        gap = bucket - self.head
+        if gap <= 0:
+            return  # Same bucket, or a timestamp from the past
+        counts = self.counts
+        if gap >= len(counts):
+            counts[:] = [0] * len(counts)
+            self.total = 0
+        else:
+            for number in range(self.head + 1, bucket + 1):
+                slot = number % len(counts)
+                self.total -= counts[slot]
+                counts[slot] = 0
+        self.head = bucket
+
+    def add(self, count: int, now: float):
+        """Add events to the newest bucket."""
+        self.advance(now)
+        self.counts[self.head % len(self.counts)] += count
+        self.total += count
+
+class EventWindowCounters:
+    def __init__(self, windows: Dict[str, float], buckets: int = 10):
+        """Initialize counters for the given event type -> window seconds."""
+        self.windows = dict(windows)
+        self.buckets = max(1, buckets)
+        self._rings: Dict[Tuple[str, str], _RingCounter] = {}
+        self._lock = threading.Lock()
+
+    def record(self, device_ip: str, event_type: str, count: int, now: float):
+        """Add events seen on a device; event types without a window are ignored."""
+        window = self.windows.get(event_type)
+        if window is None or not count:
+            return
+        key = (device_ip, event_type)
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                ring = self._rings[key] = _RingCounter(self.buckets, window / self.buckets, now)
+            ring.add(count, now)
+
+    def count(self, device_ip: str, event_type: str, now: float) -> int:
+        """Events of one type seen on a device within its window."""
+        ring = self._rings.get((device_ip, event_type))
+        if ring is None:
+            return 0
+        with self._lock:
+            ring.advance(now)
+            return ring.total
+
+    def __len__(self) -> int:
+        return len(self._rings)
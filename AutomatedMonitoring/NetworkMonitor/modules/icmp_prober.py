@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+ICMP Prober Module
+Author: 13city
+
+Builds and parses ICMP echo packets and sends them over non-blocking sockets
+so reachability probes don't need scapy or a thread per probe. The batch
+prober sends one burst per cycle to every device through a single socket and
+matches replies by identifier and sequence number.
+"""
+
+import bisect
+import heapq
+import logging
+import os
+import select
+import socket
+import statistics
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger('NetworkMonitor.IcmpProber')
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+def icmp_checksum(data: bytes) -> int:
+    """Compute the RFC 1071 Internet checksum."""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+def build_echo_request(identifier: int, sequence: int, payload: bytes = b'') -> bytes:
+    """Build an ICMP echo request packet."""
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    checksum = icmp_checksum(header + payload)
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, identifier, sequence)
+    return header + payload
+
+def parse_echo_reply(packet: bytes) -> Optional[Tuple[int, int]]:
+    """Return (identifier, sequence) for an echo reply, or None."""
+    # Raw sockets deliver the IP header, datagram ICMP sockets do not
+    if packet and packet[0] >> 4 == 4:
+        packet = packet[(packet[0] & 0x0F) * 4:]
+    if len(packet) < 8:
+        return None
+    icmp_type, _, _, identifier, sequence = struct.unpack('!BBHHH', packet[:8])
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return identifier, sequence
+
+def open_icmp_socket() -> Tuple[socket.socket, bool]:
+    """Open a non-blocking ICMP socket, returning (socket, is_raw)."""
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        is_raw = True
+    except PermissionError:
+        # Unprivileged ping sockets (Linux net.ipv4.ping_group_range)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        is_raw = False
+    sock.setblocking(False)
+    return sock, is_raw
+
+@dataclass
+class ProbeResult:
+    ip: str
+    sent: int = 0
+    rtts: List[float] = field(default_factory=list)       # In sequence order
+    sequences: List[int] = field(default_factory=list)    # Probe number of each RTT
+
+    def record(self, sequence: int, rtt: float):
+        """Add a reply, keeping RTTs in probe order however the replies arrived."""
+        position = bisect.bisect(self.sequences, sequence)
+        self.sequences.insert(position, sequence)
+        self.rtts.insert(position, rtt)
+
+    @property
+    def received(self) -> int:
+        return len(self.rtts)
+
+    @property
+    def loss(self) -> float:
+        """Packet loss percentage."""
+        if not self.sent:
+            return 100.0
+        return ((self.sent - self.received) / self.sent) * 100
+
+    @property
+    def min_rtt(self) -> float:
+        return min(self.rtts) if self.rtts else float('inf')
+
+    @property
+    def avg_rtt(self) -> float:
+        return statistics.mean(self.rtts) if self.rtts else float('inf')
+
+    @property
+    def max_rtt(self) -> float:
+        return max(self.rtts) if self.rtts else float('inf')
+
+    @property
+    def p50_rtt(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p95_rtt(self) -> float:
+        return self.percentile(95)
+
+    @property
+    def stddev_rtt(self) -> float:
+        return statistics.pstdev(self.rtts) if self.rtts else 0.0
+
+    @property
+    def jitter(self) -> float:
+        """Mean absolute RTT difference between consecutive probes; a lost probe breaks the pair."""
+        sequences = self.sequences or range(len(self.rtts))
+        deltas = [
+            abs(b - a)
+            for (seq_a, a), (seq_b, b) in zip(zip(sequences, self.rtts),
+                                              zip(sequences[1:], self.rtts[1:]))
+            if seq_b == seq_a + 1
+        ]
+        return statistics.mean(deltas) if deltas else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Round-trip time at the given percentile, linearly interpolated."""
+        if not self.rtts:
+            return float('inf')
+        ordered = sorted(self.rtts)
+        rank = (len(ordered) - 1) * pct / 100
+        lower = int(rank)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+    def summary(self) -> str:
+        """Human-readable RTT distribution."""
+        if not self.rtts:
+            return f"{self.sent} sent, no replies"
+        return (f"{self.received}/{self.sent} replies, rtt min/avg/p50/p95/max/stddev = "
+                f"{self.min_rtt:.2f}/{self.avg_rtt:.2f}/{self.p50_rtt:.2f}/"
+                f"{self.p95_rtt:.2f}/{self.max_rtt:.2f}/{self.stddev_rtt:.2f} ms")
+
+class IcmpSocketBackend:
+    """Sends and receives echo packets through a real ICMP socket."""
+
+    def __init__(self):
+        self.sock, self.is_raw = open_icmp_socket()
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        except OSError:
+            pass
+
+    def send(self, packet: bytes, ip: str):
+        self.sock.sendto(packet, (ip, 0))
+
+    def recv(self, timeout: float) -> Optional[Tuple[str, bytes]]:
+        """Return (source_ip, packet) or None if nothing arrived in time."""
+        readable, _, _ = select.select([self.sock], [], [], max(0.0, timeout))
+        if not readable:
+            return None
+        try:
+            data, (source_ip, _) = self.sock.recvfrom(2048)
+        except BlockingIOError:
+            return None
+        return source_ip, data
+
+    def close(self):
+        self.sock.close()
+
+class LoopbackIcmpBackend:
+    """In-memory backend that answers echo requests without network access."""
+
+    is_raw = True
+
+    def __init__(self, reachable: Dict[str, float] = None,
+                 dropped: Set[Tuple[str, int]] = None):
+        # reachable maps an IP to its simulated round-trip time in ms;
+        # dropped holds (ip, sequence) pairs whose replies are lost
+        self.reachable = reachable or {}
+        self.dropped = dropped or set()
+        self._replies: List[Tuple[float, str, bytes]] = []
+
+    def send(self, packet: bytes, ip: str):
+        identifier, sequence = struct.unpack('!HH', packet[4:8])
+        if ip not in self.reachable or (ip, sequence) in self.dropped:
+            return
+        reply = struct.pack('!BBHHH', ICMP_ECHO_REPLY, 0, 0, identifier, sequence)
+        deliver_at = time.perf_counter() + self.reachable[ip] / 1000
+        heapq.heappush(self._replies, (deliver_at, ip, reply + packet[8:]))
+
+    def recv(self, timeout: float) -> Optional[Tuple[str, bytes]]:
+        if not self._replies:
+            time.sleep(max(0.0, timeout))
+            return None
+        deliver_at, ip, reply = self._replies[0]
+        wait = deliver_at - time.perf_counter()
+        if wait > timeout:
+            time.sleep(max(0.0, timeout))
+            return None
+        if wait > 0:
+            time.sleep(wait)
+        heapq.heappop(self._replies)
+        return ip, reply
+
+    def close(self):
+        self._replies.clear()
+
+class BatchIcmpProber:
+    # Sequence numbers are 16 bits, so cap the number of probes in flight
+    MAX_IN_FLIGHT = 0xFFFF
+
+    def __init__(self, backend=None, timeout: float = 1.0, count: int = 10):
+        """Initialize the prober with a shared socket backend."""
+        self.backend = backend or IcmpSocketBackend()
+        self.timeout = timeout
+        self.count = count
+        self.identifier = os.getpid() & 0xFFFF
+        self._lock = threading.Lock()
+
+    def probe(self, ips: Iterable[str], count: int = None,
+              deadline: Optional[float] = None) -> Dict[str, ProbeResult]:
+        """Probe every IP in one burst and return per-IP results, waiting no later than deadline."""
+        count = count or self.count
+        ips = list(dict.fromkeys(ips))
+        results = {ip: ProbeResult(ip=ip) for ip in ips}
+        chunk_size = max(1, self.MAX_IN_FLIGHT // count)
+
+        # Deadlines are wall-clock (time.time()); RTTs are timed with perf_counter
+        wait = -1 if deadline is None else max(0.0, deadline - time.time())
+        if not self._lock.acquire(timeout=wait):
+            logger.debug(f"ICMP prober busy; {len(ips)} probes skipped at deadline")
+            return results
+        try:
+            for i in range(0, len(ips), chunk_size):
+                self._probe_chunk(ips[i:i + chunk_size], count, results, deadline)
+        finally:
+            self._lock.release()
+        return results
+
+    def _probe_chunk(self, ips: List[str], count: int,
+                     results: Dict[str, ProbeResult], deadline: Optional[float] = None):
+        """Send count rounds to every IP, then collect replies until the timeout."""
+        in_flight: Dict[int, Tuple[str, int, float]] = {}
+        sequence = 0
+
+        for round_number in range(count):
+            for ip in ips:
+                packet = build_echo_request(self.identifier, sequence)
+                results[ip].sent += 1
+                try:
+                    self.backend.send(packet, ip)
+                    in_flight[sequence] = (ip, round_number, time.perf_counter())
+                except OSError as e:
+                    logger.debug(f"ICMP send to {ip} failed: {e}")
+                sequence += 1
+            # Drain replies between rounds so RTTs aren't inflated by the burst
+            self._drain(in_flight, results, deadline=time.perf_counter())
+
+        timeout = self.timeout
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, deadline - time.time()))
+        self._drain(in_flight, results, deadline=time.perf_counter() + timeout)
+
+    def _drain(self, in_flight: Dict[int, Tuple[str, int, float]],
+               results: Dict[str, ProbeResult], deadline: float):
+        """Match replies to outstanding probes until the deadline passes."""
+        while in_flight:
+            received = self.backend.recv(deadline - time.perf_counter())
+            if received is None:
+                return
+            source_ip, data = received
+            reply = parse_echo_reply(data)
+            if reply is None:
+                continue
+            identifier, sequence = reply
+            # The kernel rewrites the identifier on datagram sockets
+            if self.backend.is_raw and identifier != self.identifier:
+                continue
+            pending = in_flight.get(sequence)
+            if pending is None or pending[0] != source_ip:
+                continue
+            ip, round_number, sent_at = in_flight.pop(sequence)
+            results[ip].record(round_number, (time.perf_counter() - sent_at) * 1000)
+
+    def close(self):
+        """Release the underlying socket."""
+        self.backend.close()
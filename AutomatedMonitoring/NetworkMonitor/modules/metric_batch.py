@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Metric Batch Module
+Author: 13city
+
+Columnar container for one device's metrics from a polling cycle. Values,
+timestamps, series ids and descriptor ids are kept in typed arrays, while
+the per-metric constants (type, unit, thresholds) live once in a shared
+DescriptorTable. A Metric object is only built when a row is read back,
+e.g. for the few rows that raise an alert.
+"""
+
+import logging
+import math
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from modules.series_registry import SeriesRegistry
+
+logger = logging.getLogger('NetworkMonitor.MetricBatch')
+
+@dataclass(frozen=True)
+class MetricDescriptor:
+    name: str
+    type: 'MetricType'
+    unit: str = ""
+    threshold_warning: Optional[float] = None
+    threshold_critical: Optional[float] = None
+
+class DescriptorTable:
+    def __init__(self):
+        """Initialize an empty table."""
+        self.descriptors: List[MetricDescriptor] = []
+        self._ids: Dict[MetricDescriptor, int] = {}
+        self._lock = threading.Lock()
+        self._thresholds: Tuple[np.ndarray, np.ndarray] = (np.empty(0), np.empty(0))
+
+    def register(self, name: str, metric_type: 'MetricType', unit: str = "",
+                 warning: Optional[float] = None, critical: Optional[float] = None) -> int:
+        """Get the id of a descriptor, adding it on first registration."""
+        descriptor = MetricDescriptor(name, metric_type, unit, warning, critical)
+        with self._lock:
+            descriptor_id = self._ids.get(descriptor)
+            if descriptor_id is None:
+                descriptor_id = self._ids[descriptor] = len(self.descriptors)
+                self.descriptors.append(descriptor)
+            return descriptor_id
+
+    def thresholds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Warning and critical thresholds by descriptor id; NaN where unset."""
+        warnings, criticals = self._thresholds
+        if len(warnings) != len(self.descriptors):
+            with self._lock:
+                warnings = np.array([
+                    math.nan if d.threshold_warning is None else d.threshold_warning
+                    for d in self.descriptors
+                ], dtype=float)
+                criticals = np.array([
+                    math.nan if d.threshold_critical is None else d.threshold_critical
+                    for d in self.descriptors
+                ], dtype=float)
+                self._thresholds = (warnings, criticals)
+        return warnings, criticals
+
+    def __getitem__(self, descriptor_id: int) -> MetricDescriptor:
+        return self.descriptors[descriptor_id]
+
+class MetricBatch:
+    """One device's samples as parallel arrays over a shared descriptor table."""
+
+    __slots__ = ('device_ip', 'table', 'registry', 'timestamp', 'descriptor_ids',
+                 'series_ids', 'timestamps', 'values', 'interfaces', 'text', 'descriptions')
+
+    def __init__(self, device_ip: str, table: DescriptorTable, registry: SeriesRegistry,
+                 timestamp: float):
+        self.device_ip = device_ip
+        self.table = table
+        self.registry = registry
+        self.timestamp = timestamp              # Default timestamp for every row
+        self.descriptor_ids = array('I')
+        self.series_ids = array('q')
+        self.timestamps = array('d')
+        self.values = array('d')                # NaN for non-numeric rows
+        self.interfaces: List[Optional[str]] = []
+        self.text: Dict[int, str] = {}          # Row -> value of status metrics
+        self.descriptions: Dict[int, str] = {}  # Row -> per-sample description
+
+    def add(self, descriptor_id: int, value: Any, interface: Optional[str] = None,
+            description: str = ""):
+        """Append one sample."""
+        row = len(self.values)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            self.text[row] = value
+            value = math.nan
+        if description:
+            self.descriptions[row] = description
+        self.descriptor_ids.append(descriptor_id)
+        self.series_ids.append(self.registry.intern(
+            self.device_ip, self.table.descriptors[descriptor_id].name, interface
+        ))
+        self.timestamps.append(self.timestamp)
+        self.values.append(value)
+        self.interfaces.append(interface)
+
+    def add_column(self, descriptor_id: int, interfaces: List[str], values: List[float]):
+        """Append one numeric sample per interface, skipping NaN values."""
+        name = self.table.descriptors[descriptor_id].name
+        intern = self.registry.intern
+        device_ip = self.device_ip
+        for interface, value in zip(interfaces, values):
+            if value != value:
+                continue  # NaN: unknown speed or a counter discontinuity
+            self.series_ids.append(intern(device_ip, name, interface))
+            self.values.append(value)
+            self.interfaces.append(interface)
+        added = len(self.values) - len(self.descriptor_ids)
+        self.descriptor_ids.extend(array('I', [descriptor_id]) * added)
+        self.timestamps.extend(array('d', [self.timestamp]) * added)
+
+    def series_ids_in(self, registry: SeriesRegistry) -> array:
+        """Series id of every row in another registry; the batch's own ids if it's the same."""
+        if registry is self.registry:
+            return self.series_ids
+        descriptors = self.table.descriptors
+        return array('q', (
+            registry.intern(self.device_ip, descriptors[descriptor_id].name, interface)
+            for descriptor_id, interface in zip(self.descriptor_ids, self.interfaces)
+        ))
+
+    def value(self, row: int) -> Any:
+        """The sample value of a row, numeric or status."""
+        if row in self.text:
+            return self.text[row]
+        return self.values[row]
+
+    def numeric_values(self) -> np.ndarray:
+        """Values as a float array; status rows are NaN and never breach."""
+        return np.array(self.values, dtype=float)
+
+    def thresholds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Warning and critical thresholds for every row."""
+        warnings, criticals = self.table.thresholds()
+        ids = np.frombuffer(self.descriptor_ids, dtype=np.uint32)
+        return warnings[ids], criticals[ids]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, row: int) -> 'Metric':
+        """Build a Metric for one row."""
+        from modules.metrics_manager import Metric
+        descriptor = self.table.descriptors[self.descriptor_ids[row]]
+        return Metric(
+            name=descriptor.name,
+            value=self.value(row),
+            type=descriptor.type,
+            timestamp=self.timestamps[row],
+            device_ip=self.device_ip,
+            threshold_warning=descriptor.threshold_warning,
+            threshold_critical=descriptor.threshold_critical,
+            unit=descriptor.unit,
+            description=self.descriptions.get(row, ""),
+            interface=self.interfaces[row],
+            series_id=self.series_ids[row]
+        )
+
+    def __iter__(self) -> Iterator['Metric']:
+        return (self[row] for row in range(len(self)))
@@ -1,16 +1,26 @@
 #!/usr/bin/env python3
 
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 from dataclasses import dataclass
 from datetime import datetime
 import time
 import statistics
+import numpy as np
 from enum import Enum
 import dns.resolver
 import ldap3
 import pysnmp.hlapi as snmp
-from scapy.all import srp1, IP, ICMP
+
+from modules.counter_cache import CounterStateCache, InterfaceRates
+from modules.event_window import EventWindowCounters
+from modules.icmp_prober import BatchIcmpProber, ProbeResult
+from modules.metric_batch import DescriptorTable, MetricBatch
+from modules.metrics_storage import MetricsStorage, create_metrics_storage
+from modules.metrics_rollup import RollupManager, RollupPoint
+from modules.series_registry import SeriesRegistry
+from modules.snmp_collector import SnmpCollector, SnmpSample
+from modules.threshold_registry import ThresholdRegistry
 
 logger = logging.getLogger('NetworkMonitor.MetricsManager')
 
@@ -20,7 +30,7 @@ class MetricType(Enum):
     PHYSICAL = "physical"
     SERVICE = "service"
 
-@dataclass
+@dataclass(slots=True)
 class Metric:
     name: str
     value: Any
@@ -31,276 +41,360 @@ class Metric:
     threshold_critical: Optional[float] = None
     unit: str = ""
     description: str = ""
+    interface: Optional[str] = None    # ifName for per-interface series
+    series_id: Optional[int] = None    # Id from the MetricsManager's SeriesRegistry
+
+@dataclass(slots=True)
+class SecurityEvent:
+    """A security counter whose sliding-window total breached a threshold."""
+    device: 'Device'
+    metric: Metric          # Value is the total within the window
+    severity: int           # Severity code, 1 warning or 2 critical
+    threshold: float
+    window: float
+
+# Constants shared by every sample of a metric; thresholds come from
+# metrics.thresholds in the configuration
+METRIC_DESCRIPTORS = (
+    # name, type, unit
+    ('bandwidth_utilization', MetricType.NETWORK_PERFORMANCE, 'percent'),
+    ('packet_loss', MetricType.NETWORK_PERFORMANCE, 'percent'),
+    ('latency', MetricType.NETWORK_PERFORMANCE, 'ms'),
+    ('latency_p50', MetricType.NETWORK_PERFORMANCE, 'ms'),
+    ('latency_p95', MetricType.NETWORK_PERFORMANCE, 'ms'),
+    ('latency_stddev', MetricType.NETWORK_PERFORMANCE, 'ms'),
+    ('jitter', MetricType.NETWORK_PERFORMANCE, 'ms'),
+    ('interface_errors', MetricType.NETWORK_PERFORMANCE, 'count'),
+    ('traffic_in', MetricType.NETWORK_PERFORMANCE, 'bps'),
+    ('traffic_out', MetricType.NETWORK_PERFORMANCE, 'bps'),
+    ('auth_failures', MetricType.SECURITY, 'count'),
+    ('acl_violations', MetricType.SECURITY, 'count'),
+    ('port_security_violations', MetricType.SECURITY, 'count'),
+    ('temperature', MetricType.PHYSICAL, 'celsius'),
+    ('fan_status', MetricType.PHYSICAL, 'status'),
+    ('poe_usage', MetricType.PHYSICAL, 'percent'),
+    ('dns_response_time', MetricType.SERVICE, 'ms'),
+    ('dhcp_lease_status', MetricType.SERVICE, 'status'),
+    ('ad_replication_status', MetricType.SERVICE, 'status'),
+)
+
+# Per-interface series fanned out from each device's interface rates
+INTERFACE_METRICS = (
+    # name, InterfaceRates column
+    ('bandwidth_utilization', 'utilization'),
+    ('traffic_in', 'in_bps'),
+    ('traffic_out', 'out_bps'),
+    ('interface_errors', 'errors'),
+)
 
 class MetricsManager:
     def __init__(self, config: Dict[str, Any]):
         """Initialize the Metrics Manager."""
         self.config = config
-        self.metrics_history: Dict[str, List[Metric]] = {}
+        self.storage: Optional[MetricsStorage] = None
+        self.series = SeriesRegistry()
+        self.thresholds = ThresholdRegistry(config.get('thresholds', {}))
+        self.descriptors = DescriptorTable()
+        self.descriptor_ids = {
+            name: self.descriptors.register(name, metric_type, unit,
+                                            *self.thresholds.default(name))
+            for name, metric_type, unit in METRIC_DESCRIPTORS
+        }
+        self.rollups = RollupManager(config.get('rollups', {}), self.series)
+        self.security_windows = EventWindowCounters(
+            self.thresholds.windows, config.get('window_buckets', 10)
+        )
         self.dns_servers = config.get('dns_servers', [])
         self.dhcp_servers = config.get('dhcp_servers', [])
         self.ad_servers = config.get('ad_servers', [])
         self.retention_days = config.get('retention_days', 30)
+        self.retention_check_interval = config.get('retention_check_interval', 3600)
+        self._last_retention = 0.0
+        self.probe_timeout = config.get('probe_timeout', 1.0)
+        self.probe_count = config.get('probe_count', 10)
+        self.probe_cache_ttl = config.get('collection_interval', 300)
+        self.icmp_prober: Optional[BatchIcmpProber] = None
+        self._probe_results: Dict[str, ProbeResult] = {}
+        self._probe_results_time = 0.0
+        self.snmp_collector: Optional[SnmpCollector] = None
+        self._snmp_samples: Dict[str, SnmpSample] = {}
+        self.counter_cache = CounterStateCache()
+        self._interface_rates: Dict[str, InterfaceRates] = {}
         self._initialize_metrics_storage()
 
     def _initialize_metrics_storage(self):
         """Initialize metrics storage system."""
-        # This would typically initialize a database connection
-        # For now, we'll use in-memory storage
-        pass
+        self.storage = create_metrics_storage(
+            self.config.get('storage', {}),
+            retention_seconds=self.retention_days * 86400,
+            registry=self.series
+        )
+        self._rebuild_rollups()
+
+    def _rebuild_rollups(self):
+        """Refold persisted history into the in-memory rollup tiers after a restart."""
+        try:
+            now = time.time()
+            start = now - max(tier.retention for tier in self.rollups.tiers)
+            self.rollups.rebuild(self.storage.scan_numeric(start), now)
+        except Exception as e:
+            logger.error(f"Error rebuilding metric rollups: {e}")
+
+    def begin_cycle(self, devices: List['Device']):
+        """Run the shared per-cycle probes for all devices in one pass."""
+        self.rollups.compact(time.time())
+        self.apply_retention()
+        self.probe_devices(devices)
+        self.collect_snmp(devices)
+
+    def apply_retention(self, now: Optional[float] = None):
+        """Drop stored history older than retention_days, at most once per check interval."""
+        now = time.time() if now is None else now
+        if now - self._last_retention < self.retention_check_interval:
+            return
+        self._last_retention = now
+        try:
+            self.storage.apply_retention(now - self.retention_days * 86400)
+        except Exception as e:
+            logger.error(f"Error applying metrics retention: {e}")
+
+    def probe_devices(self, devices: List['Device']):
+        """Probe every device in one ICMP burst through the shared prober."""
+        try:
+            self._probe_results = self._get_icmp_prober().probe(
+                [device.ip for device in devices]
+            )
+            self._probe_results_time = time.time()
+        except Exception as e:
+            logger.error(f"Error running ICMP sweep: {e}")
+
+    def new_batch(self, device: 'Device') -> MetricBatch:
+        """Start an empty batch for a device, stamped with the current time."""
+        return MetricBatch(device.ip, self.descriptors, self.series, time.time())
 
     def collect_metrics(self, device: 'Device') -> List[Metric]:
         """Collect all metrics for a device."""
-        metrics = []
+        return list(self.collect_metric_batch(device))
+
+    def collect_metric_batch(self, device: 'Device',
+                             deadline: Optional[float] = None) -> MetricBatch:
+        """Collect all metrics for a device into one columnar batch, giving up at deadline."""
+        batch = self.new_batch(device)
         try:
+            # Fetch anything this cycle's sweeps missed within the deadline;
+            # the collectors below then read it from the cycle cache
+            self.snmp_sample(device, deadline)
+            self.measure_probe_series(device, deadline)
+
             # Collect different types of metrics based on device type
-            metrics.extend(self._collect_network_performance(device))
-            metrics.extend(self._collect_security_metrics(device))
-            metrics.extend(self._collect_physical_metrics(device))
-            
+            self._collect_network_performance(device, batch)
+            self._collect_security_metrics(device, batch)
+            self._collect_physical_metrics(device, batch)
+
             # Collect service-specific metrics for certain device types
             if device.device_type in ['router', 'firewall']:
-                metrics.extend(self._collect_core_service_metrics(device))
+                self._collect_core_service_metrics(device, batch, deadline)
 
             # Store metrics in history
-            self._store_metrics(metrics)
-            
-            return metrics
+            self._store_metrics(batch)
+            return batch
         except Exception as e:
             logger.error(f"Error collecting metrics for device {device.ip}: {e}")
-            return []
+            return self.new_batch(device)
 
-    def _collect_network_performance(self, device: 'Device') -> List[Metric]:
+    def _collect_network_performance(self, device: 'Device', batch: MetricBatch):
         """Collect network performance metrics."""
-        metrics = []
         try:
-            # Bandwidth utilization
-            bandwidth = self._get_interface_bandwidth(device)
-            metrics.append(Metric(
-                name="bandwidth_utilization",
-                value=bandwidth,
-                type=MetricType.NETWORK_PERFORMANCE,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=80,
-                threshold_critical=90,
-                unit="percent"
-            ))
-
-            # Packet loss
-            packet_loss = self._measure_packet_loss(device)
-            metrics.append(Metric(
-                name="packet_loss",
-                value=packet_loss,
-                type=MetricType.NETWORK_PERFORMANCE,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=5,
-                threshold_critical=10,
-                unit="percent"
-            ))
-
-            # Latency
-            latency = self._measure_latency(device)
-            metrics.append(Metric(
-                name="latency",
-                value=latency,
-                type=MetricType.NETWORK_PERFORMANCE,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=100,
-                threshold_critical=200,
-                unit="ms"
-            ))
-
-            # Interface errors
-            errors = self._get_interface_errors(device)
-            metrics.append(Metric(
-                name="interface_errors",
-                value=errors,
-                type=MetricType.NETWORK_PERFORMANCE,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=100,
-                threshold_critical=1000,
-                unit="count"
-            ))
-
+            self._build_network_performance_metrics(batch, self.measure_probe_series(device))
+            self._build_interface_metrics(batch, self.get_interface_rates(device))
         except Exception as e:
             logger.error(f"Error collecting network performance metrics: {e}")
 
-        return metrics
-
-    def _collect_security_metrics(self, device: 'Device') -> List[Metric]:
+    def _build_network_performance_metrics(self, batch: MetricBatch, probe: ProbeResult):
+        """Add network performance metrics from measured values."""
+        # Packet loss, latency and jitter all come from the same probe series;
+        # utilization and errors are reported per interface only
+        ids = self.descriptor_ids
+        batch.add(ids['packet_loss'], probe.loss)
+        batch.add(ids['latency'], probe.avg_rtt, description=probe.summary())
+        batch.add(ids['latency_p50'], probe.p50_rtt)
+        batch.add(ids['latency_p95'], probe.p95_rtt)
+        batch.add(ids['latency_stddev'], probe.stddev_rtt)
+        batch.add(ids['jitter'], probe.jitter)
+
+    def _build_interface_metrics(self, batch: MetricBatch, rates: Optional[InterfaceRates]):
+        """Add one sample per interface for each of INTERFACE_METRICS."""
+        if rates is None:
+            return
+        columns = {
+            'utilization': rates.utilization,
+            'in_bps': rates.in_bps,
+            'out_bps': rates.out_bps,
+            'errors': rates.in_errors + rates.out_errors,
+        }
+        for name, column in INTERFACE_METRICS:
+            batch.add_column(self.descriptor_ids[name], rates.names,
+                             np.round(columns[column], 2).tolist())
+
+    def _collect_security_metrics(self, device: 'Device', batch: MetricBatch):
         """Collect security-related metrics."""
-        metrics = []
         try:
-            # Authentication failures
-            auth_failures = self._get_auth_failures(device)
-            metrics.append(Metric(
-                name="auth_failures",
-                value=auth_failures,
-                type=MetricType.SECURITY,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=5,
-                threshold_critical=10,
-                unit="count"
-            ))
-
-            # ACL violations
-            acl_violations = self._get_acl_violations(device)
-            metrics.append(Metric(
-                name="acl_violations",
-                value=acl_violations,
-                type=MetricType.SECURITY,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=10,
-                threshold_critical=50,
-                unit="count"
-            ))
-
-            # Port security violations
-            port_violations = self._get_port_security_violations(device)
-            metrics.append(Metric(
-                name="port_security_violations",
-                value=port_violations,
-                type=MetricType.SECURITY,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=1,
-                threshold_critical=5,
-                unit="count"
-            ))
-
+            ids = self.descriptor_ids
+            counts = {
+                'auth_failures': self._get_auth_failures(device),
+                'acl_violations': self._get_acl_violations(device),
+                'port_security_violations': self._get_port_security_violations(device),
+            }
+            for name, count in counts.items():
+                batch.add(ids[name], count)
+                self.security_windows.record(device.ip, name, count, batch.timestamp)
         except Exception as e:
             logger.error(f"Error collecting security metrics: {e}")
 
-        return metrics
+    def check_security(self, device: 'Device') -> List[SecurityEvent]:
+        """Get an event for every security counter whose window total breaches a threshold."""
+        events = []
+        try:
+            now = time.time()
+            profile = self.thresholds.profile(device)
+            for name, window in self.thresholds.windows.items():
+                descriptor_id = self.descriptor_ids.get(name)
+                if descriptor_id is None:
+                    continue  # Windowed threshold for a metric this manager never collects
+                count = self.security_windows.count(device.ip, name, now)
+                if not count:
+                    continue
+                index = self.thresholds.index(name)
+                # NaN (threshold unset for this device) compares False
+                if count >= profile.criticals[index]:
+                    severity, threshold = 2, float(profile.criticals[index])
+                elif count >= profile.warnings[index]:
+                    severity, threshold = 1, float(profile.warnings[index])
+                else:
+                    continue
+                descriptor = self.descriptors[descriptor_id]
+                metric = Metric(
+                    name=name,
+                    value=count,
+                    type=descriptor.type,
+                    timestamp=now,
+                    device_ip=device.ip,
+                    unit=descriptor.unit,
+                    description=f"{count} in the last {window:g}s"
+                )
+                events.append(SecurityEvent(device, metric, severity, threshold, window))
+        except Exception as e:
+            logger.error(f"Error checking security counters for device {device.ip}: {e}")
+        return events
 
-    def _collect_physical_metrics(self, device: 'Device') -> List[Metric]:
+    def _collect_physical_metrics(self, device: 'Device', batch: MetricBatch):
         """Collect physical infrastructure metrics."""
-        metrics = []
         try:
-            # Temperature
-            temp = self._get_temperature(device)
-            metrics.append(Metric(
-                name="temperature",
-                value=temp,
-                type=MetricType.PHYSICAL,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=75,
-                threshold_critical=85,
-                unit="celsius"
-            ))
-
-            # Fan status
-            fan_status = self._get_fan_status(device)
-            metrics.append(Metric(
-                name="fan_status",
-                value=fan_status,
-                type=MetricType.PHYSICAL,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                unit="status"
-            ))
-
-            # PoE usage
-            poe_usage = self._get_poe_usage(device)
-            metrics.append(Metric(
-                name="poe_usage",
-                value=poe_usage,
-                type=MetricType.PHYSICAL,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=80,
-                threshold_critical=90,
-                unit="percent"
-            ))
-
+            ids = self.descriptor_ids
+            batch.add(ids['temperature'], self._get_temperature(device))
+            batch.add(ids['fan_status'], self._get_fan_status(device))
+            batch.add(ids['poe_usage'], self._get_poe_usage(device))
         except Exception as e:
             logger.error(f"Error collecting physical metrics: {e}")
 
-        return metrics
-
-    def _collect_core_service_metrics(self, device: 'Device') -> List[Metric]:
+    def _collect_core_service_metrics(self, device: 'Device', batch: MetricBatch,
+                                      deadline: Optional[float] = None):
         """Collect core network service metrics."""
-        metrics = []
         try:
-            # DNS response time
-            dns_response = self._check_dns_health()
-            metrics.append(Metric(
-                name="dns_response_time",
-                value=dns_response,
-                type=MetricType.SERVICE,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                threshold_warning=100,
-                threshold_critical=200,
-                unit="ms"
-            ))
-
-            # DHCP lease status
-            dhcp_status = self._check_dhcp_health()
-            metrics.append(Metric(
-                name="dhcp_lease_status",
-                value=dhcp_status,
-                type=MetricType.SERVICE,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                unit="status"
-            ))
-
-            # AD replication
-            ad_status = self._check_ad_replication()
-            metrics.append(Metric(
-                name="ad_replication_status",
-                value=ad_status,
-                type=MetricType.SERVICE,
-                timestamp=time.time(),
-                device_ip=device.ip,
-                unit="status"
-            ))
-
+            self._build_core_service_metrics(
+                batch,
+                dns_response=self._check_dns_health(deadline),
+                dhcp_status=self._check_dhcp_health(),
+                ad_status=self._check_ad_replication()
+            )
         except Exception as e:
             logger.error(f"Error collecting core service metrics: {e}")
 
-        return metrics
-
-    def _measure_latency(self, device: 'Device') -> float:
-        """Measure network latency to a device."""
+    def _build_core_service_metrics(self, batch: MetricBatch, dns_response: float,
+                                    dhcp_status: str, ad_status: str):
+        """Add core network service metrics from measured values."""
+        ids = self.descriptor_ids
+        batch.add(ids['dns_response_time'], dns_response)
+        batch.add(ids['dhcp_lease_status'], dhcp_status)
+        batch.add(ids['ad_replication_status'], ad_status)
+
+    def _get_icmp_prober(self) -> BatchIcmpProber:
+        """Get the shared ICMP prober, opening its socket on first use."""
+        if self.icmp_prober is None:
+            self.icmp_prober = BatchIcmpProber(
+                timeout=self.probe_timeout,
+                count=self.probe_count
+            )
+        return self.icmp_prober
+
+    def measure_probe_series(self, device: 'Device',
+                             deadline: Optional[float] = None) -> ProbeResult:
+        """Get this cycle's ICMP probe series for a device, probing it if needed."""
+        result = self._probe_results.get(device.ip)
+        if result is None or time.time() - self._probe_results_time > self.probe_cache_ttl:
+            try:
+                result = self._get_icmp_prober().probe([device.ip], deadline=deadline)[device.ip]
+            except Exception as e:
+                logger.error(f"Error probing {device.ip}: {e}")
+                result = ProbeResult(ip=device.ip)
+            self._probe_results[device.ip] = result
+        return result
+
+    def _get_snmp_collector(self) -> SnmpCollector:
+        """Get the shared SNMP collector, creating its engine on first use."""
+        if self.snmp_collector is None:
+            self.snmp_collector = SnmpCollector(self.config.get('snmp', {}))
+        return self.snmp_collector
+
+    def collect_snmp(self, devices: List['Device'], deadline: Optional[float] = None):
+        """Collect SNMP data from all devices in one concurrent bulk pass."""
         try:
-            # Send ICMP echo request and measure round-trip time
-            packet = IP(dst=device.ip)/ICMP()
-            reply = srp1(packet, timeout=1, verbose=0)
-            if reply:
-                return reply.time * 1000  # Convert to milliseconds
-            return float('inf')
+            self._record_snmp_samples(self._get_snmp_collector().collect(devices, deadline))
         except Exception as e:
-            logger.error(f"Error measuring latency: {e}")
-            return float('inf')
-
-    def _measure_packet_loss(self, device: 'Device', count: int = 10) -> float:
-        """Measure packet loss rate to a device."""
-        received = 0
-        for _ in range(count):
-            try:
-                packet = IP(dst=device.ip)/ICMP()
-                if srp1(packet, timeout=1, verbose=0):
-                    received += 1
-            except Exception:
-                continue
-        return ((count - received) / count) * 100
-
-    def _check_dns_health(self) -> float:
+            logger.error(f"Error running SNMP collection: {e}")
+
+    def _record_snmp_samples(self, samples: Dict[str, SnmpSample]):
+        """Keep the latest SNMP sample per device and derive its interface rates."""
+        for ip, sample in samples.items():
+            self._snmp_samples[ip] = sample
+            rates = None if sample.error else self.counter_cache.update(ip, sample)
+            if rates is None:
+                self._interface_rates.pop(ip, None)
+            else:
+                self._interface_rates[ip] = rates
+
+    def snmp_sample(self, device: 'Device', deadline: Optional[float] = None) -> SnmpSample:
+        """Get this cycle's SNMP sample for a device, collecting it if needed."""
+        sample = self._snmp_samples.get(device.ip)
+        if sample is None or time.time() - sample.timestamp > self.probe_cache_ttl:
+            self.collect_snmp([device], deadline)
+            sample = self._snmp_samples.get(device.ip)
+            if sample is None or time.time() - sample.timestamp > self.probe_cache_ttl:
+                # Cache the failure so the rest of the cycle doesn't retry it
+                sample = self._snmp_samples[device.ip] = SnmpSample(
+                    ip=device.ip, timestamp=time.time(), error='no response'
+                )
+                self._interface_rates.pop(device.ip, None)
+        return sample
+
+    def get_interface_rates(self, device: 'Device') -> Optional[InterfaceRates]:
+        """Get per-interface traffic and error rates from the last two samples."""
+        self.snmp_sample(device)
+        return self._interface_rates.get(device.ip)
+
+    def _check_dns_health(self, deadline: Optional[float] = None) -> float:
         """Check DNS health and response times."""
         response_times = []
         for server in self.dns_servers:
             try:
                 resolver = dns.resolver.Resolver()
                 resolver.nameservers = [server]
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        logger.warning(f"DNS check for {server} skipped at device deadline")
+                        continue
+                    resolver.lifetime = min(resolver.lifetime, remaining)
                 start_time = time.time()
                 resolver.query('google.com', 'A')
                 response_time = (time.time() - start_time) * 1000
@@ -322,32 +416,33 @@ class MetricsManager:
         # This is a placeholder
         return "healthy"
 
-    def _store_metrics(self, metrics: List[Metric]):
+    def _store_metrics(self, metrics: Union[MetricBatch, List[Metric]]):
         """Store metrics in the history database."""
-        for metric in metrics:
-            key = f"{metric.device_ip}_{metric.name}"
-            if key not in self.metrics_history:
-                self.metrics_history[key] = []
-            self.metrics_history[key].append(metric)
-            
-            # Clean up old metrics
-            cutoff_time = time.time() - (self.retention_days * 86400)
-            self.metrics_history[key] = [
-                m for m in self.metrics_history[key]
-                if m.timestamp > cutoff_time
-            ]
+        if isinstance(metrics, MetricBatch):
+            self.storage.append_batch(metrics)
+            self.rollups.add_batch(metrics)
+        else:
+            for metric in metrics:
+                self.storage.append(metric)
+                self.rollups.add(metric)
+        self.storage.flush()
 
     def get_metric_history(self, device_ip: str, metric_name: str,
-                          start_time: float, end_time: float) -> List[Metric]:
-        """Get historical metrics for a device and metric name."""
-        key = f"{device_ip}_{metric_name}"
-        if key not in self.metrics_history:
-            return []
-        
-        return [
-            m for m in self.metrics_history[key]
-            if start_time <= m.timestamp <= end_time
-        ]
+                          start_time: float, end_time: float,
+                          interface: Optional[str] = None) -> List[Metric]:
+        """Get historical metrics for a device (or one of its interfaces) and metric name."""
+        return self.storage.query(device_ip, metric_name, start_time, end_time, interface)
+
+    def get_metric_rollup(self, device_ip: str, metric_name: str,
+                          start_time: float, end_time: float,
+                          resolution: Optional[int] = None,
+                          interface: Optional[str] = None) -> List[RollupPoint]:
+        """Get downsampled history, picking the rollup tier from the range."""
+        tier, points = self.rollups.query(
+            device_ip, metric_name, start_time, end_time,
+            now=time.time(), resolution=resolution, interface=interface
+        )
+        return points
 
     def generate_daily_report(self):
         """Generate daily metrics report."""
@@ -364,17 +459,7 @@ class MetricsManager:
         # Implementation for monthly report generation
         pass
 
-    # Helper methods for SNMP queries would go here
-    def _get_interface_bandwidth(self, device: 'Device') -> float:
-        """Get interface bandwidth utilization."""
-        # Implementation would use SNMP to get interface statistics
-        return 0.0
-
-    def _get_interface_errors(self, device: 'Device') -> int:
-        """Get interface error counts."""
-        # Implementation would use SNMP to get error counts
-        return 0
-
+    # Helpers deriving values from the device's SNMP sample
     def _get_auth_failures(self, device: 'Device') -> int:
         """Get authentication failure count."""
         # Implementation would check device logs
@@ -391,16 +476,24 @@ class MetricsManager:
         return 0
 
     def _get_temperature(self, device: 'Device') -> float:
-        """Get device temperature."""
-        # Implementation would use SNMP to get temperature
-        return 0.0
+        """Get the hottest temperature sensor reading."""
+        readings = self.snmp_sample(device).columns.get('temperature', {})
+        return float(max(readings.values())) if readings else 0.0
 
     def _get_fan_status(self, device: 'Device') -> str:
-        """Get fan status."""
-        # Implementation would use SNMP to get fan status
+        """Get the worst fan status."""
+        states = self.snmp_sample(device).columns.get('fan_state', {}).values()
+        # ciscoEnvMonFanState: 1 normal, 2 warning, 3 critical, 4 shutdown,
+        # 5 notPresent, 6 notFunctioning
+        if any(state in (3, 4, 6) for state in states):
+            return "failed"
+        if 2 in states:
+            return "degraded"
         return "normal"
 
     def _get_poe_usage(self, device: 'Device') -> float:
         """Get PoE usage percentage."""
-        # Implementation would use SNMP to get PoE usage
-        return 0.0
+        columns = self.snmp_sample(device).columns
+        power = sum(columns.get('poe_power', {}).values())
+        consumption = sum(columns.get('poe_consumption', {}).values())
+        return round(consumption / power * 100, 2) if power else 0.0
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Metrics Rollup Module
+Author: 13city
+
+Maintains downsampled copies of every numeric series at coarser resolutions
+(1 minute, 1 hour, 1 day by default). Each bucket keeps min, max, avg, count
+and last, and long-range queries are served from the coarsest tier that
+still gives enough points instead of scanning raw samples. Series are
+indexed by their SeriesRegistry id, and each tier of a series is a set of
+parallel arrays, so a bucket costs a few machine words rather than an object.
+RollupPoint objects are only built for the buckets a query returns.
+"""
+
+import bisect
+import logging
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+
+import numpy as np
+
+from modules.series_registry import SeriesRegistry
+
+logger = logging.getLogger('NetworkMonitor.MetricsRollup')
+
+@dataclass
+class RollupPoint:
+    timestamp: float
+    min: float
+    max: float
+    sum: float
+    count: int
+    last: float
+
+    @property
+    def avg(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+@dataclass
+class RollupTier:
+    name: str
+    resolution: int
+    retention: int
+
+DEFAULT_TIERS = [
+    {'name': '1m', 'resolution': 60, 'retention': 7 * 86400},
+    {'name': '1h', 'resolution': 3600, 'retention': 90 * 86400},
+    {'name': '1d', 'resolution': 86400, 'retention': 730 * 86400},
+]
+
+class _TierSeries:
+    """One tier of one series as parallel arrays, one row per bucket."""
+    __slots__ = ('starts', 'mins', 'maxs', 'sums', 'counts', 'lasts')
+
+    def __init__(self):
+        self.starts = array('d')
+        self.mins = array('d')
+        self.maxs = array('d')
+        self.sums = array('d')
+        self.counts = array('q')
+        self.lasts = array('d')
+
+    def add(self, bucket: float, value: float):
+        """Fold one sample into its bucket, creating the bucket if needed."""
+        self.merge(bucket, value, value, value, 1, value)
+
+    def merge(self, bucket: float, low: float, high: float, total: float,
+              count: int, last: float):
+        """Fold an aggregate into its bucket, creating the bucket if needed."""
+        starts = self.starts
+        if starts and starts[-1] == bucket:
+            pos = len(starts) - 1
+        elif not starts or bucket > starts[-1]:
+            self._insert(len(starts), bucket, low, high, total, count, last)
+            return
+        else:
+            pos = bisect.bisect_left(starts, bucket)
+            if pos == len(starts) or starts[pos] != bucket:
+                self._insert(pos, bucket, low, high, total, count, last)
+                return
+        # Existing bucket (late samples land in an older one)
+        if low < self.mins[pos]:
+            self.mins[pos] = low
+        if high > self.maxs[pos]:
+            self.maxs[pos] = high
+        self.sums[pos] += total
+        self.counts[pos] += count
+        self.lasts[pos] = last
+
+    def _insert(self, pos: int, bucket: float, low: float, high: float, total: float,
+                count: int, last: float):
+        for column, value in ((self.starts, bucket), (self.mins, low), (self.maxs, high),
+                              (self.sums, total), (self.counts, count), (self.lasts, last)):
+            column.insert(pos, value)
+
+    def extend(self, buckets: np.ndarray, mins: np.ndarray, maxs: np.ndarray,
+               sums: np.ndarray, counts: np.ndarray, lasts: np.ndarray):
+        """Append sorted aggregates in bulk, merging any that overlap existing buckets."""
+        first = 0
+        while first < len(buckets) and self.starts and buckets[first] <= self.starts[-1]:
+            self.merge(float(buckets[first]), float(mins[first]), float(maxs[first]),
+                       float(sums[first]), int(counts[first]), float(lasts[first]))
+            first += 1
+        for column, values, dtype in ((self.starts, buckets, np.float64),
+                                      (self.mins, mins, np.float64),
+                                      (self.maxs, maxs, np.float64),
+                                      (self.sums, sums, np.float64),
+                                      (self.counts, counts, np.int64),
+                                      (self.lasts, lasts, np.float64)):
+            column.frombytes(np.ascontiguousarray(values[first:], dtype=dtype).tobytes())
+
+    def expire(self, count: int):
+        """Drop the oldest count buckets."""
+        for column in (self.starts, self.mins, self.maxs, self.sums, self.counts, self.lasts):
+            del column[:count]
+
+    def points(self, lo: int, hi: int) -> List[RollupPoint]:
+        """Build RollupPoints for buckets lo..hi."""
+        return [
+            RollupPoint(self.starts[i], self.mins[i], self.maxs[i], self.sums[i],
+                        self.counts[i], self.lasts[i])
+            for i in range(lo, hi)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+class RollupManager:
+    def __init__(self, config: Dict[str, Any], registry: Optional[SeriesRegistry] = None):
+        """Initialize rollup tiers from configuration."""
+        self.config = config
+        self.registry = registry if registry is not None else SeriesRegistry()
+        self.tiers = sorted(
+            (RollupTier(**tier) for tier in config.get('tiers', DEFAULT_TIERS)),
+            key=lambda tier: tier.resolution
+        )
+        self.max_points = config.get('max_points', 1000)
+        self.series: Dict[int, List[_TierSeries]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, metric: 'Metric'):
+        """Fold a raw sample into every tier's current bucket."""
+        if isinstance(metric.value, bool) or not isinstance(metric.value, (int, float)):
+            return  # Status metrics have no meaningful aggregate
+
+        with self._lock:
+            self._add_value(self.registry.metric_id(metric), metric.timestamp,
+                            float(metric.value))
+
+    def add_batch(self, batch: 'MetricBatch'):
+        """Fold every numeric row of a MetricBatch into the tiers."""
+        with self._lock:
+            for series_id, timestamp, value in zip(batch.series_ids_in(self.registry),
+                                                   batch.timestamps,
+                                                   batch.values):
+                if value == value:  # Status rows are NaN
+                    self._add_value(series_id, timestamp, value)
+
+    def _tier_series(self, key: int) -> List[_TierSeries]:
+        tier_series = self.series.get(key)
+        if tier_series is None:
+            tier_series = self.series[key] = [_TierSeries() for _ in self.tiers]
+        return tier_series
+
+    def _add_value(self, key: int, timestamp: float, value: float):
+        for tier, series in zip(self.tiers, self._tier_series(key)):
+            series.add(timestamp - (timestamp % tier.resolution), value)
+
+    def rebuild(self, blocks: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]], now: float):
+        """Fold stored (series ids, timestamps, values) columns back into the tiers."""
+        samples = 0
+        with self._lock:
+            for series_ids, timestamps, values in blocks:
+                order = np.lexsort((timestamps, series_ids))
+                series_ids, timestamps, values = (series_ids[order], timestamps[order],
+                                                  values[order])
+                samples += len(values)
+                for index, tier in enumerate(self.tiers):
+                    self._rebuild_tier(index, tier, series_ids, timestamps, values, now)
+        if samples:
+            logger.info(f"Rebuilt rollups from {samples} stored samples")
+
+    def _rebuild_tier(self, index: int, tier: RollupTier, series_ids: np.ndarray,
+                      timestamps: np.ndarray, values: np.ndarray, now: float):
+        """Aggregate sorted samples into one tier's buckets, one series at a time."""
+        keep = timestamps >= now - tier.retention
+        if not keep.all():
+            series_ids, timestamps, values = series_ids[keep], timestamps[keep], values[keep]
+        if not len(values):
+            return
+        buckets = timestamps - timestamps % tier.resolution
+        boundary = (series_ids[1:] != series_ids[:-1]) | (buckets[1:] != buckets[:-1])
+        starts = np.concatenate(([0], np.flatnonzero(boundary) + 1))
+        ends = np.append(starts[1:], len(values))
+        group_ids = series_ids[starts]
+        columns = (buckets[starts],
+                   np.minimum.reduceat(values, starts),
+                   np.maximum.reduceat(values, starts),
+                   np.add.reduceat(values, starts),
+                   ends - starts,
+                   values[ends - 1])
+
+        series_starts = np.concatenate(([0], np.flatnonzero(group_ids[1:] != group_ids[:-1]) + 1))
+        series_ends = np.append(series_starts[1:], len(group_ids))
+        for lo, hi in zip(series_starts.tolist(), series_ends.tolist()):
+            tier_series = self._tier_series(int(group_ids[lo]))[index]
+            tier_series.extend(*(column[lo:hi] for column in columns))
+
+    def compact(self, now: float):
+        """Drop buckets that have aged out of each tier's retention."""
+        with self._lock:
+            for tier_series in self.series.values():
+                for tier, series in zip(self.tiers, tier_series):
+                    expired = bisect.bisect_left(series.starts, now - tier.retention)
+                    if expired:
+                        series.expire(expired)
+
+    def select_tier(self, start_time: float, end_time: float, now: float,
+                    resolution: Optional[int] = None) -> Optional[RollupTier]:
+        """Pick the finest tier that covers the range within max_points."""
+        if resolution is not None:
+            for tier in self.tiers:
+                if tier.resolution >= resolution and now - tier.retention <= start_time:
+                    return tier
+            return None
+
+        span = max(0.0, end_time - start_time)
+        for tier in self.tiers:
+            if now - tier.retention > start_time:
+                continue  # Tier no longer holds the start of the range
+            if span / tier.resolution <= self.max_points:
+                return tier
+        return self.tiers[-1] if self.tiers else None
+
+    def query(self, device_ip: str, metric_name: str, start_time: float,
+              end_time: float, now: float, resolution: Optional[int] = None,
+              interface: Optional[str] = None
+              ) -> Tuple[Optional[RollupTier], List[RollupPoint]]:
+        """Return (tier, points) for a series over the requested range."""
+        tier = self.select_tier(start_time, end_time, now, resolution)
+        tier_series = self.series.get(self.registry.lookup(device_ip, metric_name, interface))
+        if tier is None or tier_series is None:
+            return tier, []
+
+        series = tier_series[self.tiers.index(tier)]
+        with self._lock:
+            lo = bisect.bisect_left(series.starts, start_time - (start_time % tier.resolution))
+            hi = bisect.bisect_right(series.starts, end_time)
+            return tier, series.points(lo, hi)
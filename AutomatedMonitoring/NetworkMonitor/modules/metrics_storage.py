@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+Metrics Storage Module
+Author: 13city
+
+Pluggable storage backends for metric history. The default backend keeps each
+series as time-bucketed chunks of array-backed timestamps and values, so an
+append is O(1), retention drops whole chunks and range queries binary-search.
+The segment backend persists the same data as fixed-width binary records in
+one append-only file per time block, read back through mmap. Series are
+indexed by the integer ids of a shared SeriesRegistry.
+"""
+
+import bisect
+import dataclasses
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+import numpy as np
+
+from modules.series_compression import CompressedSeries, RAW_SAMPLE_BYTES
+from modules.series_registry import SeriesKey, SeriesRegistry
+
+logger = logging.getLogger('NetworkMonitor.MetricsStorage')
+
+class MetricsStorage:
+    """Base class for metric storage backends."""
+
+    def __init__(self, config: Dict[str, Any], retention_seconds: float,
+                 registry: Optional[SeriesRegistry] = None):
+        self.config = config
+        self.retention_seconds = retention_seconds
+        self.registry = registry if registry is not None else SeriesRegistry()
+
+    def append(self, metric: 'Metric'):
+        """Store a single metric sample."""
+        raise NotImplementedError
+
+    def append_batch(self, batch: 'MetricBatch'):
+        """Store every row of a MetricBatch."""
+        for metric in batch:
+            self.append(metric)
+
+    def query(self, device_ip: str, metric_name: str, start_time: float,
+              end_time: float, interface: Optional[str] = None) -> List['Metric']:
+        """Return samples for a series within [start_time, end_time]."""
+        raise NotImplementedError
+
+    def apply_retention(self, cutoff_time: float):
+        """Drop samples older than cutoff_time."""
+        raise NotImplementedError
+
+    def scan_numeric(self, start_time: float) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield (series ids, timestamps, values) blocks of persisted numeric samples."""
+        return iter(())  # In-memory backends hold nothing across a restart
+
+    def flush(self):
+        """Make buffered samples durable."""
+        pass
+
+    def close(self):
+        """Release any resources held by the backend."""
+        pass
+
+class _Chunk:
+    __slots__ = ('start', 'timestamps', 'values')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.timestamps = array('d')
+        self.values = array('d')
+
+    def append(self, timestamp: float, value: Any):
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            # Late sample; keep the chunk sorted
+            pos = bisect.bisect_right(self.timestamps, timestamp)
+            self.timestamps.insert(pos, timestamp)
+            self._insert_value(pos, value)
+            return
+        self.timestamps.append(timestamp)
+        self._insert_value(len(self.values), value)
+
+    def _insert_value(self, pos: int, value: Any):
+        if isinstance(self.values, array) and (
+                isinstance(value, bool) or not isinstance(value, (int, float))):
+            # Status metrics ("normal", "healthy") can't live in a double array
+            self.values = list(self.values)
+        self.values.insert(pos, value)
+
+    def range(self, start_time: float, end_time: float) -> Iterator[Tuple[float, Any]]:
+        lo = bisect.bisect_left(self.timestamps, start_time)
+        hi = bisect.bisect_right(self.timestamps, end_time)
+        for i in range(lo, hi):
+            yield self.timestamps[i], self.values[i]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+class _CompressedChunk:
+    __slots__ = ('start', 'series')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.series = CompressedSeries()
+
+    def append(self, timestamp: float, value: Any):
+        self.series.insert(timestamp, value)
+
+    def range(self, start_time: float, end_time: float) -> Iterator[Tuple[float, Any]]:
+        return self.series.range(start_time, end_time)
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+class _Series:
+    __slots__ = ('template', 'chunks', 'chunk_starts')
+
+    def __init__(self, template: 'Metric', series_id: int):
+        # The first sample carries the per-series constants (type, unit, thresholds);
+        # descriptions are per-sample and aren't retained
+        self.template = dataclasses.replace(template, description="", series_id=series_id)
+        self.chunks: List[_Chunk] = []
+        self.chunk_starts: List[float] = []
+
+class ColumnarMetricsStorage(MetricsStorage):
+    """In-process columnar store with chunked, array-backed series."""
+
+    chunk_class = _Chunk
+
+    def __init__(self, config: Dict[str, Any], retention_seconds: float,
+                 registry: Optional[SeriesRegistry] = None):
+        super().__init__(config, retention_seconds, registry)
+        self.chunk_duration = config.get('chunk_duration', 86400)
+        self.series: Dict[int, _Series] = {}
+
+    def append(self, metric: 'Metric'):
+        series_id = self.registry.metric_id(metric)
+        series = self.series.get(series_id)
+        if series is None:
+            series = self.series[series_id] = _Series(metric, series_id)
+        self._append_sample(series, metric.timestamp, metric.value)
+
+    def append_batch(self, batch: 'MetricBatch'):
+        text = batch.text
+        for row, (series_id, timestamp, value) in enumerate(
+                zip(batch.series_ids_in(self.registry), batch.timestamps, batch.values)):
+            series = self.series.get(series_id)
+            if series is None:
+                series = self.series[series_id] = _Series(batch[row], series_id)
+            self._append_sample(series, timestamp, text[row] if row in text else value)
+
+    def _append_sample(self, series: _Series, timestamp: float, value: Any):
+        chunk_start = timestamp - (timestamp % self.chunk_duration)
+        if not series.chunks or chunk_start > series.chunk_starts[-1]:
+            series.chunks.append(self.chunk_class(chunk_start))
+            series.chunk_starts.append(chunk_start)
+            self._drop_expired(series, timestamp - self.retention_seconds)
+            chunk = series.chunks[-1]
+        elif chunk_start == series.chunk_starts[-1]:
+            chunk = series.chunks[-1]
+        else:
+            chunk = self._find_or_create_chunk(series, chunk_start)
+        chunk.append(timestamp, value)
+
+    def _find_or_create_chunk(self, series: _Series, chunk_start: float) -> _Chunk:
+        """Locate the chunk for an out-of-order sample."""
+        pos = bisect.bisect_left(series.chunk_starts, chunk_start)
+        if pos < len(series.chunks) and series.chunk_starts[pos] == chunk_start:
+            return series.chunks[pos]
+        chunk = self.chunk_class(chunk_start)
+        series.chunks.insert(pos, chunk)
+        series.chunk_starts.insert(pos, chunk_start)
+        return chunk
+
+    def _drop_expired(self, series: _Series, cutoff_time: float):
+        """Drop whole chunks that end before the cutoff."""
+        expired = bisect.bisect_right(series.chunk_starts, cutoff_time - self.chunk_duration)
+        if expired:
+            del series.chunks[:expired]
+            del series.chunk_starts[:expired]
+
+    def query(self, device_ip: str, metric_name: str, start_time: float,
+              end_time: float, interface: Optional[str] = None) -> List['Metric']:
+        series = self.series.get(self.registry.lookup(device_ip, metric_name, interface))
+        if series is None:
+            return []
+
+        results = []
+        first = max(0, bisect.bisect_right(series.chunk_starts, start_time) - 1)
+        last = bisect.bisect_right(series.chunk_starts, end_time)
+        for chunk in series.chunks[first:last]:
+            for timestamp, value in chunk.range(start_time, end_time):
+                results.append(dataclasses.replace(
+                    series.template, value=value, timestamp=timestamp
+                ))
+        return results
+
+    def apply_retention(self, cutoff_time: float):
+        for key in list(self.series):
+            series = self.series[key]
+            self._drop_expired(series, cutoff_time)
+            if not series.chunks:
+                del self.series[key]
+
+class CompressedMetricsStorage(ColumnarMetricsStorage):
+    """In-process store whose chunks are Gorilla-compressed bit streams."""
+
+    chunk_class = _CompressedChunk
+
+    def compression_stats(self) -> Dict[str, float]:
+        """Report sample count, compressed size and overall compression ratio."""
+        samples = 0
+        nbytes = 0
+        for series in self.series.values():
+            for chunk in series.chunks:
+                samples += len(chunk)
+                nbytes += chunk.series.nbytes
+        return {
+            'samples': samples,
+            'bytes': nbytes,
+            'bytes_per_sample': nbytes / samples if samples else 0.0,
+            'compression_ratio': (samples * RAW_SAMPLE_BYTES) / nbytes if nbytes else 0.0
+        }
+
+# series id, value kind, timestamp, value (string values hold a dictionary code)
+_RECORD = struct.Struct('<IB3xdd')
+_RECORD_DTYPE = np.dtype([('series', '<u4'), ('kind', 'u1'), ('pad', 'V3'),
+                          ('timestamp', '<f8'), ('value', '<f8')])
+_KIND_NUMBER = 0
+_KIND_STRING = 1
+
+class SegmentFileMetricsStorage(MetricsStorage):
+    """Persistent store of fixed-width records in one file per time block."""
+
+    def __init__(self, config: Dict[str, Any], retention_seconds: float,
+                 registry: Optional[SeriesRegistry] = None):
+        super().__init__(config, retention_seconds, registry)
+        self.data_dir = Path(config.get('data_dir', 'data/metrics'))
+        self.segment_duration = int(config.get('segment_duration', 86400))
+        self.fsync = config.get('fsync', False)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Ids in the series catalog are persistent; registry ids are per process
+        self._series_ids: Dict[SeriesKey, int] = {}
+        self._file_ids: Dict[int, int] = {}  # registry id -> catalog id
+        self._templates: Dict[int, 'Metric'] = {}
+        self._string_codes: Dict[str, int] = {}
+        self._strings: List[str] = []
+        self._writers: Dict[int, Any] = {}
+        # Per-segment record offsets for each series, built lazily on first read
+        self._segment_index: Dict[int, Dict[int, array]] = {}
+        self._sealed_maps: Dict[int, mmap.mmap] = {}
+
+        self._catalog = self._open_catalog('series.jsonl', self._load_series)
+        self._string_table = self._open_catalog('strings.jsonl', self._load_string)
+        self._recover_segments()
+
+    def _open_catalog(self, filename: str, loader) -> Any:
+        """Replay an append-only JSON-lines catalog and keep it open for appends."""
+        path = self.data_dir / filename
+        if path.exists():
+            with open(path) as f:
+                for line in f:
+                    try:
+                        loader(json.loads(line))
+                    except ValueError:
+                        # Torn final line from a crash; everything before it is intact
+                        logger.warning(f"Ignoring corrupt entry in {path}")
+        return open(path, 'a')
+
+    def _load_series(self, entry: Dict[str, Any]):
+        from modules.metrics_manager import Metric, MetricType
+        interface = entry.get('interface')
+        series_id = self.registry.intern(entry['device_ip'], entry['name'], interface)
+        self._series_ids[self.registry.key(series_id)] = entry['id']
+        self._file_ids[series_id] = entry['id']
+        self._templates[entry['id']] = Metric(
+            name=entry['name'],
+            value=None,
+            type=MetricType(entry['type']),
+            timestamp=0.0,
+            device_ip=entry['device_ip'],
+            interface=interface,
+            series_id=series_id,
+            threshold_warning=entry.get('threshold_warning'),
+            threshold_critical=entry.get('threshold_critical'),
+            unit=entry.get('unit', '')
+        )
+
+    def _load_string(self, entry: Dict[str, Any]):
+        self._string_codes[entry['value']] = entry['code']
+        self._strings.append(entry['value'])
+
+    def _recover_segments(self):
+        """Trim partially written records left behind by a crash."""
+        for block in self._list_segments():
+            path = self._segment_path(block)
+            size = path.stat().st_size
+            if size % _RECORD.size:
+                logger.warning(f"Truncating partial record in {path}")
+                os.truncate(path, size - size % _RECORD.size)
+
+    def _segment_path(self, block: int) -> Path:
+        return self.data_dir / f"segment_{block}.dat"
+
+    def _list_segments(self) -> List[int]:
+        blocks = []
+        for path in self.data_dir.glob('segment_*.dat'):
+            try:
+                blocks.append(int(path.stem.split('_', 1)[1]))
+            except ValueError:
+                continue
+        return sorted(blocks)
+
+    def _series_id(self, metric: 'Metric', registry_id: Optional[int] = None) -> int:
+        if registry_id is None:
+            registry_id = self.registry.metric_id(metric)
+        series_id = self._file_ids.get(registry_id)
+        if series_id is not None:
+            return series_id
+        key = self.registry.key(registry_id)
+        series_id = self._series_ids.get(key)
+        if series_id is None:
+            series_id = len(self._series_ids)
+            self._catalog.write(json.dumps({
+                'id': series_id,
+                'device_ip': metric.device_ip,
+                'name': metric.name,
+                'interface': metric.interface,
+                'type': metric.type.value,
+                'unit': metric.unit,
+                'threshold_warning': metric.threshold_warning,
+                'threshold_critical': metric.threshold_critical
+            }) + '\n')
+            self._catalog.flush()
+            self._series_ids[key] = series_id
+            self._templates[series_id] = dataclasses.replace(
+                metric, description="", series_id=registry_id
+            )
+        self._file_ids[registry_id] = series_id
+        return series_id
+
+    def _string_code(self, value: str) -> int:
+        code = self._string_codes.get(value)
+        if code is None:
+            code = len(self._strings)
+            self._string_table.write(json.dumps({'code': code, 'value': value}) + '\n')
+            self._string_table.flush()
+            self._string_codes[value] = code
+            self._strings.append(value)
+        return code
+
+    def _writer(self, block: int):
+        writer = self._writers.get(block)
+        if writer is None:
+            writer = self._writers[block] = open(self._segment_path(block), 'ab')
+            stale = self._sealed_maps.pop(block, None)
+            if stale is not None:
+                stale.close()
+            # Only the newest blocks receive writes; seal the rest
+            for old_block in sorted(b for b in self._writers if b != block)[:-1]:
+                self._writers.pop(old_block).close()
+            self._drop_segments(block - self.retention_seconds)
+        return writer
+
+    def append(self, metric: 'Metric'):
+        with self._lock:
+            self._write_record(self._series_id(metric), metric.timestamp, metric.value)
+
+    def append_batch(self, batch: 'MetricBatch'):
+        text = batch.text
+        with self._lock:
+            for row, (registry_id, timestamp, value) in enumerate(
+                    zip(batch.series_ids_in(self.registry), batch.timestamps, batch.values)):
+                series_id = self._file_ids.get(registry_id)
+                if series_id is None:
+                    series_id = self._series_id(batch[row], registry_id)
+                self._write_record(series_id, timestamp, text[row] if row in text else value)
+
+    def _write_record(self, series_id: int, timestamp: float, value: Any):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            kind, value = _KIND_NUMBER, float(value)
+        else:
+            kind, value = _KIND_STRING, float(self._string_code(str(value)))
+
+        block = int(timestamp // self.segment_duration) * self.segment_duration
+        writer = self._writer(block)
+        offset = writer.tell()
+        writer.write(_RECORD.pack(series_id, kind, timestamp, value))
+        index = self._segment_index.get(block)
+        if index is not None:
+            index.setdefault(series_id, array('Q')).append(offset)
+
+    def flush(self):
+        with self._lock:
+            for writer in self._writers.values():
+                writer.flush()
+                if self.fsync:
+                    os.fsync(writer.fileno())
+
+    def _map_segment(self, block: int) -> Optional[mmap.mmap]:
+        """Memory-map a segment; sealed segments stay mapped between queries."""
+        mapped = self._sealed_maps.get(block)
+        if mapped is not None:
+            return mapped
+        path = self._segment_path(block)
+        if not path.exists() or path.stat().st_size == 0:
+            return None
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if block not in self._writers:
+            self._sealed_maps[block] = mapped
+        return mapped
+
+    def _index_segment(self, block: int, mapped: mmap.mmap) -> Dict[int, array]:
+        index = self._segment_index.get(block)
+        if index is None:
+            index = {}
+            for offset in range(0, len(mapped) - len(mapped) % _RECORD.size, _RECORD.size):
+                series_id = struct.unpack_from('<I', mapped, offset)[0]
+                index.setdefault(series_id, array('Q')).append(offset)
+            self._segment_index[block] = index
+        return index
+
+    def query(self, device_ip: str, metric_name: str, start_time: float,
+              end_time: float, interface: Optional[str] = None) -> List['Metric']:
+        series_id = self._series_ids.get((device_ip, metric_name, interface))
+        if series_id is None:
+            return []
+        template = self._templates[series_id]
+
+        results = []
+        with self._lock:
+            for writer in self._writers.values():
+                writer.flush()
+            first_block = int(start_time // self.segment_duration) * self.segment_duration
+            for block in self._list_segments():
+                if block < first_block or block > end_time:
+                    continue
+                mapped = self._map_segment(block)
+                if mapped is None:
+                    continue
+                for offset in self._index_segment(block, mapped).get(series_id, ()):
+                    if offset + _RECORD.size > len(mapped):
+                        break
+                    _, kind, timestamp, value = _RECORD.unpack_from(mapped, offset)
+                    if not start_time <= timestamp <= end_time:
+                        continue
+                    if kind == _KIND_STRING:
+                        value = self._strings[int(value)]
+                    results.append(dataclasses.replace(
+                        template, value=value, timestamp=timestamp
+                    ))
+                if block not in self._sealed_maps:
+                    mapped.close()
+
+        results.sort(key=lambda m: m.timestamp)
+        return results
+
+    def scan_numeric(self, start_time: float,
+                     chunk_records: int = 1 << 20) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        with self._lock:
+            for writer in self._writers.values():
+                writer.flush()
+            registry_ids = np.full(len(self._templates), -1, dtype=np.int64)
+            for series_id, template in self._templates.items():
+                registry_ids[series_id] = template.series_id
+            blocks = [block for block in self._list_segments()
+                      if block + self.segment_duration > start_time]
+
+        for block in blocks:
+            path = self._segment_path(block)
+            try:
+                records = np.memmap(path, dtype=_RECORD_DTYPE, mode='r')
+            except (OSError, ValueError):
+                continue  # Dropped by retention, or empty
+            for offset in range(0, len(records), chunk_records):
+                chunk = records[offset:offset + chunk_records]
+                keep = ((chunk['kind'] == _KIND_NUMBER) & (chunk['timestamp'] >= start_time)
+                        & (chunk['series'] < len(registry_ids)))
+                series_ids = registry_ids[chunk['series'][keep]]
+                known = series_ids >= 0
+                yield (series_ids[known], np.array(chunk['timestamp'][keep][known]),
+                       np.array(chunk['value'][keep][known]))
+            del records
+
+    def apply_retention(self, cutoff_time: float):
+        with self._lock:
+            self._drop_segments(cutoff_time)
+
+    def _drop_segments(self, cutoff_time: float):
+        """Delete segments whose whole time block ends before the cutoff."""
+        for block in self._list_segments():
+            if block + self.segment_duration > cutoff_time:
+                break
+            if block in self._writers:
+                self._writers.pop(block).close()
+            mapped = self._sealed_maps.pop(block, None)
+            if mapped is not None:
+                mapped.close()
+            self._segment_index.pop(block, None)
+            self._segment_path(block).unlink()
+            logger.info(f"Dropped expired metrics segment {block}")
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+            for mapped in self._sealed_maps.values():
+                mapped.close()
+            self._sealed_maps.clear()
+            self._catalog.close()
+            self._string_table.close()
+
+STORAGE_BACKENDS = {
+    'memory': ColumnarMetricsStorage,
+    'compressed': CompressedMetricsStorage,
+    'segment': SegmentFileMetricsStorage,
+}
+
+def create_metrics_storage(config: Dict[str, Any], retention_seconds: float,
+                           registry: Optional[SeriesRegistry] = None) -> MetricsStorage:
+    """Create the storage backend selected by config['backend']."""
+    backend = config.get('backend', 'memory')
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unsupported metrics storage backend: {backend}")
+    return STORAGE_BACKENDS[backend](config, retention_seconds, registry)
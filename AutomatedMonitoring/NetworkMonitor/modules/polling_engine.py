@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Polling Engine Module
+Author: 13city
+
+Fans per-device metric collection and security checks out across a bounded
+worker pool so a full sweep fits inside the polling interval. Thresholds are
+evaluated, still vectorized, over each group of devices that finish together,
+so one slow device never holds back alerts for the rest.
+
+Each poll is handed a deadline (the device timeout, capped by the cycle
+deadline) that SNMP, ICMP and DNS calls honor. A worker that still outlives
+it is tracked, and its device is skipped until that poll returns, so hung
+devices can't pile workers up across cycles.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Dict, List, Any
+
+logger = logging.getLogger('NetworkMonitor.PollingEngine')
+
+@dataclass
+class DevicePollResult:
+    device: Any
+    metrics: List[Any] = field(default_factory=list)
+    security_events: List[Any] = field(default_factory=list)
+    duration: float = 0.0
+    timed_out: bool = False
+    error: str = None
+
+@dataclass
+class CycleStats:
+    started: float
+    duration: float = 0.0
+    devices_total: int = 0
+    devices_polled: int = 0
+    devices_failed: int = 0
+    devices_timed_out: int = 0
+    devices_skipped: int = 0       # Previous poll still running
+    alerts: int = 0
+
+class PollingEngine:
+    def __init__(self, config: Dict[str, Any], metrics_manager, alert_manager):
+        """Initialize the Polling Engine."""
+        self.config = config
+        self.metrics_manager = metrics_manager
+        self.alert_manager = alert_manager
+        self.max_in_flight = config.get('max_in_flight', 32)
+        self.device_timeout = config.get('device_timeout', 120)
+        self.cycle_history: List[CycleStats] = []
+        self.history_size = config.get('cycle_history_size', 100)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight,
+            thread_name_prefix='poller'
+        )
+        # Device IP -> poll abandoned at a cycle deadline that is still running
+        self._abandoned: Dict[str, Future] = {}
+        self._abandoned_lock = threading.Lock()
+
+    def run_cycle(self, devices: List['Device'], cycle_timeout: float = None) -> CycleStats:
+        """Poll all devices once and return timing statistics for the cycle."""
+        stats = CycleStats(started=time.time(), devices_total=len(devices))
+        cycle_deadline = stats.started + cycle_timeout if cycle_timeout else None
+
+        # One ICMP burst for every device instead of per-device ping loops
+        self.metrics_manager.begin_cycle(devices)
+
+        with self._abandoned_lock:
+            busy = [device for device in devices if device.ip in self._abandoned]
+        for device in busy:
+            logger.warning(f"Skipping {device.ip}: its previous poll is still running")
+        stats.devices_skipped = len(busy)
+        busy_ips = {device.ip for device in busy}
+
+        pending = {
+            self._executor.submit(self._poll_device, device, cycle_deadline): device
+            for device in devices if device.ip not in busy_ips
+        }
+        while pending:
+            timeout = None
+            if cycle_deadline is not None:
+                timeout = max(0.0, cycle_deadline - time.time())
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Cycle budget exhausted; abandon devices that have not reported
+                for future, device in pending.items():
+                    logger.warning(f"Polling of {device.ip} abandoned at cycle deadline")
+                    if not future.cancel():
+                        self._track_abandoned(device, future)
+                stats.devices_timed_out += len(pending)
+                break
+
+            completed: List[DevicePollResult] = []
+            for future in done:
+                device = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Error polling device {device.ip}: {e}")
+                    stats.devices_failed += 1
+                    continue
+                if self._record_result(stats, result):
+                    completed.append(result)
+            if completed:
+                stats.alerts += self._process_alerts(completed)
+
+        stats.duration = time.time() - stats.started
+        self._record_cycle(stats)
+        return stats
+
+    def _process_alerts(self, results: List[DevicePollResult]) -> int:
+        """Evaluate thresholds for a group of finished devices in one batch and notify."""
+        try:
+            alerts = self.alert_manager.process_metrics_batch(
+                [(result.device, result.metrics) for result in results]
+            )
+            alerts += self.alert_manager.process_security_events(
+                [event for result in results for event in result.security_events]
+            )
+            if alerts:
+                self.alert_manager.send_notifications(alerts)
+            return len(alerts)
+        except Exception as e:
+            logger.error(f"Error processing alerts for polling cycle: {e}")
+            return 0
+
+    def _track_abandoned(self, device: 'Device', future: Future):
+        """Remember a poll that is still running so its device is skipped until it ends."""
+        with self._abandoned_lock:
+            self._abandoned[device.ip] = future
+
+        def release(_):
+            with self._abandoned_lock:
+                if self._abandoned.get(device.ip) is future:
+                    del self._abandoned[device.ip]
+        future.add_done_callback(release)
+
+    def _poll_device(self, device: 'Device', cycle_deadline: float = None) -> DevicePollResult:
+        """Collect metrics and security events for a single device within its deadline."""
+        started = time.time()
+        result = DevicePollResult(device=device)
+        deadline = started + self.device_timeout
+        if cycle_deadline is not None:
+            deadline = min(deadline, cycle_deadline)
+
+        try:
+            result.metrics = self.metrics_manager.collect_metric_batch(device, deadline)
+            result.security_events = self.metrics_manager.check_security(device)
+        except Exception as e:
+            result.error = str(e)
+        finally:
+            result.duration = time.time() - started
+
+        # Drop stale results from devices that blew through their deadline
+        result.timed_out = result.duration > self.device_timeout
+        return result
+
+    def _record_result(self, stats: CycleStats, result: DevicePollResult) -> bool:
+        """Fold a single device result into the cycle statistics."""
+        if result.timed_out:
+            stats.devices_timed_out += 1
+            logger.warning(
+                f"Device {result.device.ip} exceeded {self.device_timeout}s deadline "
+                f"({result.duration:.2f}s)"
+            )
+        elif result.error:
+            stats.devices_failed += 1
+            logger.error(f"Error polling device {result.device.ip}: {result.error}")
+        else:
+            stats.devices_polled += 1
+            return True
+        return False
+
+    def _record_cycle(self, stats: CycleStats):
+        """Log and retain statistics for a completed cycle."""
+        self.cycle_history.append(stats)
+        if len(self.cycle_history) > self.history_size:
+            del self.cycle_history[0]
+
+        logger.info(
+            f"Polling cycle completed in {stats.duration:.2f}s: "
+            f"{stats.devices_polled}/{stats.devices_total} polled, "
+            f"{stats.devices_failed} failed, {stats.devices_timed_out} timed out, "
+            f"{stats.devices_skipped} skipped, "
+            f"{stats.alerts} alerts"
+        )
+
+    def get_cycle_stats(self) -> List[CycleStats]:
+        """Get statistics for recent polling cycles."""
+        return list(self.cycle_history)
+
+    def shutdown(self):
+        """Stop the worker pool."""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Series Compression Module
+Author: 13city
+
+Gorilla-style encoding for metric series: delta-of-delta timestamps, XOR'd
+floats and dictionary-encoded status strings, packed into a bit stream.
+Slowly changing or constant series shrink to a few bits per sample.
+"""
+
+import struct
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Uncompressed cost of a sample: 8-byte timestamp plus 8-byte value
+RAW_SAMPLE_BYTES = 16
+
+class BitWriter:
+    __slots__ = ('buffer', '_acc', '_nbits')
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._acc = 0
+        self._nbits = 0
+
+    def write(self, value: int, nbits: int):
+        """Append the low nbits of value, most significant bit first."""
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._nbits += nbits
+        while self._nbits >= 8:
+            self._nbits -= 8
+            self.buffer.append((self._acc >> self._nbits) & 0xFF)
+        self._acc &= (1 << self._nbits) - 1
+
+    def getvalue(self) -> bytes:
+        """Return the stream padded to a whole byte."""
+        if self._nbits:
+            return bytes(self.buffer) + bytes([(self._acc << (8 - self._nbits)) & 0xFF])
+        return bytes(self.buffer)
+
+    def __len__(self) -> int:
+        """Size in bytes, including any partial trailing byte."""
+        return len(self.buffer) + (1 if self._nbits else 0)
+
+class BitReader:
+    __slots__ = ('data', 'pos')
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def read(self, nbits: int) -> int:
+        value = 0
+        for _ in range(nbits):
+            byte = self.data[self.pos >> 3]
+            value = (value << 1) | ((byte >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return value
+
+    def read_bit(self) -> int:
+        byte = self.data[self.pos >> 3]
+        bit = (byte >> (7 - (self.pos & 7))) & 1
+        self.pos += 1
+        return bit
+
+def _float_to_bits(value: float) -> int:
+    return struct.unpack('>Q', struct.pack('>d', value))[0]
+
+def _bits_to_float(bits: int) -> float:
+    return struct.unpack('>d', struct.pack('>Q', bits))[0]
+
+def _to_ms(timestamp: float) -> int:
+    """Timestamp at the millisecond resolution samples are stored with."""
+    return int(round(timestamp * 1000))
+
+def _sign_extend(value: int, nbits: int) -> int:
+    if value >= 1 << (nbits - 1):
+        value -= 1 << nbits
+    return value
+
+# (prefix, prefix bits, payload bits) buckets for delta-of-delta timestamps
+_DOD_BUCKETS = [
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+]
+
+class CompressedSeries:
+    """Append-only compressed (timestamp, value) series.
+
+    Timestamps are stored at millisecond resolution, and range bounds are
+    compared at the same resolution, so a query bounded by a sample's original
+    timestamp always includes it. Numeric values use XOR encoding; anything
+    else (status strings) is dictionary-encoded, with a single bit for "same
+    as previous".
+    """
+
+    __slots__ = ('_writer', '_count', '_numeric', '_dictionary', '_codes',
+                 '_first_ts', '_prev_ts', '_prev_delta', '_prev_bits',
+                 '_prev_leading', '_prev_trailing', '_prev_code')
+
+    def __init__(self, numeric: bool = True):
+        self._writer = BitWriter()
+        self._count = 0
+        self._numeric = numeric
+        self._dictionary: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+        self._first_ts = 0
+        self._prev_ts = 0
+        self._prev_delta = 0
+        self._prev_bits = 0
+        self._prev_leading = -1
+        self._prev_trailing = 0
+        self._prev_code = -1
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def first_timestamp(self) -> float:
+        return self._first_ts / 1000
+
+    @property
+    def last_timestamp(self) -> float:
+        return self._prev_ts / 1000
+
+    @property
+    def nbytes(self) -> int:
+        """Compressed size including the string dictionary."""
+        return len(self._writer) + sum(len(str(v)) for v in self._dictionary)
+
+    @property
+    def compression_ratio(self) -> float:
+        if not self.nbytes:
+            return 0.0
+        return (self._count * RAW_SAMPLE_BYTES) / self.nbytes
+
+    def append(self, timestamp: float, value: Any):
+        """Append a sample; timestamps must not go backwards."""
+        if self._numeric and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            self._rebuild(numeric=False, extra=[(timestamp, value)])
+            return
+
+        ts = _to_ms(timestamp)
+        if self._count and ts < self._prev_ts:
+            raise ValueError("CompressedSeries is append-only; timestamp went backwards")
+        self._write_timestamp(ts)
+        if self._numeric:
+            self._write_float(float(value))
+        else:
+            self._write_code(value)
+        self._count += 1
+
+    def _write_timestamp(self, ts: int):
+        w = self._writer
+        if self._count == 0:
+            w.write(ts, 64)
+            self._first_ts = ts
+        else:
+            delta = ts - self._prev_ts
+            dod = delta - self._prev_delta
+            if dod == 0:
+                w.write(0, 1)
+            else:
+                for prefix, prefix_bits, payload_bits in _DOD_BUCKETS:
+                    limit = 1 << (payload_bits - 1)
+                    if -limit <= dod < limit:
+                        w.write(prefix, prefix_bits)
+                        w.write(dod, payload_bits)
+                        break
+                else:
+                    w.write(0b1111, 4)
+                    w.write(dod, 64)
+            self._prev_delta = delta
+        self._prev_ts = ts
+
+    def _write_float(self, value: float):
+        w = self._writer
+        bits = _float_to_bits(value)
+        if self._count == 0:
+            w.write(bits, 64)
+            self._prev_bits = bits
+            return
+
+        xor = bits ^ self._prev_bits
+        self._prev_bits = bits
+        if xor == 0:
+            w.write(0, 1)
+            return
+
+        w.write(1, 1)
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if self._prev_leading >= 0 and leading >= self._prev_leading and trailing >= self._prev_trailing:
+            # Meaningful bits fit inside the previous window
+            w.write(0, 1)
+            w.write(xor >> self._prev_trailing, 64 - self._prev_leading - self._prev_trailing)
+        else:
+            length = 64 - leading - trailing
+            w.write(1, 1)
+            w.write(leading, 5)
+            w.write(length & 0x3F, 6)  # 64 is stored as 0
+            w.write(xor >> trailing, length)
+            self._prev_leading = leading
+            self._prev_trailing = trailing
+
+    def _write_code(self, value: Any):
+        w = self._writer
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._dictionary)
+            self._dictionary.append(value)
+        if code == self._prev_code:
+            w.write(0, 1)
+        else:
+            w.write(1, 1)
+            w.write(code, 16)
+            self._prev_code = code
+
+    def _rebuild(self, numeric: bool, extra: List[Tuple[float, Any]] = ()):
+        """Re-encode every sample, e.g. after a status value hits a numeric series."""
+        samples = list(self) + list(extra)
+        samples.sort(key=lambda sample: sample[0])
+        self.__init__(numeric=numeric)
+        for timestamp, value in samples:
+            self.append(timestamp, value)
+
+    def insert(self, timestamp: float, value: Any):
+        """Add a sample that may be out of order (re-encodes if it is)."""
+        if not self._count or _to_ms(timestamp) >= self._prev_ts:
+            self.append(timestamp, value)
+        else:
+            numeric = self._numeric and isinstance(value, (int, float)) and not isinstance(value, bool)
+            self._rebuild(numeric=numeric, extra=[(timestamp, value)])
+
+    def __iter__(self) -> Iterator[Tuple[float, Any]]:
+        for ts, value in self._decode():
+            yield ts / 1000, value
+
+    def _decode(self) -> Iterator[Tuple[int, Any]]:
+        """Yield (timestamp in ms, value) for every sample."""
+        reader = BitReader(self._writer.getvalue())
+        ts = delta = 0
+        bits = leading = trailing = 0
+        code = -1
+        for i in range(self._count):
+            # Timestamp
+            if i == 0:
+                ts = _sign_extend(reader.read(64), 64)
+            else:
+                if reader.read_bit() == 0:
+                    dod = 0
+                elif reader.read_bit() == 0:
+                    dod = _sign_extend(reader.read(7), 7)
+                elif reader.read_bit() == 0:
+                    dod = _sign_extend(reader.read(9), 9)
+                elif reader.read_bit() == 0:
+                    dod = _sign_extend(reader.read(12), 12)
+                else:
+                    dod = _sign_extend(reader.read(64), 64)
+                delta += dod
+                ts += delta
+
+            # Value
+            if self._numeric:
+                if i == 0:
+                    bits = reader.read(64)
+                elif reader.read_bit() == 1:
+                    if reader.read_bit() == 1:
+                        leading = reader.read(5)
+                        length = reader.read(6) or 64
+                        trailing = 64 - leading - length
+                    bits ^= reader.read(64 - leading - trailing) << trailing
+                yield ts, _bits_to_float(bits)
+            else:
+                if reader.read_bit() == 1:
+                    code = reader.read(16)
+                yield ts, self._dictionary[code]
+
+    def range(self, start_time: float, end_time: float) -> Iterator[Tuple[float, Any]]:
+        """Yield samples within [start_time, end_time], compared in milliseconds."""
+        start, end = _to_ms(start_time), _to_ms(end_time)
+        if not self._count or start > self._prev_ts or end < self._first_ts:
+            return
+        for ts, value in self._decode():
+            if ts > end:
+                return
+            if ts >= start:
+                yield ts / 1000, value
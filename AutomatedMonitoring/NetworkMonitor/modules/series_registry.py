@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Series Registry Module
+Author: 13city
+
+Interns metric series keys to small integer ids. A series is identified by
+(device_ip, metric name, interface), where interface is None for device-wide
+metrics. MetricsManager stamps each metric with its id from one shared
+registry, so storage and rollups index series by int instead of building
+and hashing a key on every sample.
+"""
+
+import logging
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('NetworkMonitor.SeriesRegistry')
+
+SeriesKey = Tuple[str, str, Optional[str]]
+
+class SeriesRegistry:
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._ids: Dict[SeriesKey, int] = {}
+        self._keys: List[SeriesKey] = []
+        self._lock = threading.Lock()
+
+    def intern(self, device_ip: str, name: str, interface: Optional[str] = None) -> int:
+        """Get the id for a series, assigning the next free id on first sight."""
+        key = (device_ip, name, interface)
+        series_id = self._ids.get(key)
+        if series_id is not None:
+            return series_id
+        with self._lock:
+            series_id = self._ids.get(key)
+            if series_id is None:
+                key = (sys.intern(device_ip), sys.intern(name),
+                       None if interface is None else sys.intern(interface))
+                series_id = len(self._keys)
+                self._keys.append(key)
+                self._ids[key] = series_id
+            return series_id
+
+    def lookup(self, device_ip: str, name: str,
+               interface: Optional[str] = None) -> Optional[int]:
+        """Get the id for a series without registering it."""
+        return self._ids.get((device_ip, name, interface))
+
+    def key(self, series_id: int) -> SeriesKey:
+        """Get the (device_ip, name, interface) key for an id."""
+        return self._keys[series_id]
+
+    def metric_id(self, metric: 'Metric') -> int:
+        """Get a metric's series id, interning its key if it wasn't assigned one."""
+        if metric.series_id is not None:
+            return metric.series_id
+        return self.intern(metric.device_ip, metric.name, metric.interface)
+
+    def __len__(self) -> int:
+        return len(self._keys)
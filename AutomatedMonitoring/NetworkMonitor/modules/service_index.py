@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Service Index Module
+Author: 13city
+
+Inverted index from device IP to the business services that depend on it.
+Service dependencies may be single IPs, CIDR prefixes (matched through a
+binary prefix trie) or the names of other services, in which case an outage
+propagates to every service that depends on the affected one. Lookups
+are cached per IP in a bounded LRU.
+"""
+
+import ipaddress
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger('NetworkMonitor.ServiceIndex')
+
+class _TrieNode:
+    __slots__ = ('children', 'services')
+
+    def __init__(self):
+        self.children: List[Optional['_TrieNode']] = [None, None]
+        self.services: Set[str] = set()
+
+class PrefixTrie:
+    """Binary trie of network prefixes for one address family."""
+
+    def __init__(self, max_bits: int):
+        self.max_bits = max_bits
+        self.root = _TrieNode()
+
+    def _bits(self, address: int, length: int):
+        for shift in range(self.max_bits - 1, self.max_bits - 1 - length, -1):
+            yield (address >> shift) & 1
+
+    def insert(self, network, service: str):
+        node = self.root
+        for bit in self._bits(int(network.network_address), network.prefixlen):
+            if node.children[bit] is None:
+                node.children[bit] = _TrieNode()
+            node = node.children[bit]
+        node.services.add(service)
+
+    def remove(self, network, service: str):
+        node = self.root
+        for bit in self._bits(int(network.network_address), network.prefixlen):
+            node = node.children[bit]
+            if node is None:
+                return
+        node.services.discard(service)
+
+    def match(self, address) -> Set[str]:
+        """Services on every prefix that contains the address."""
+        matched = set(self.root.services)
+        node = self.root
+        for bit in self._bits(int(address), self.max_bits):
+            node = node.children[bit]
+            if node is None:
+                break
+            matched |= node.services
+        return matched
+
+class ServiceIndex:
+    def __init__(self, cache_size: int = 4096):
+        """Initialize an empty index."""
+        self.services: Dict[str, 'BusinessService'] = {}
+        self._names: Set[str] = set()
+        self._order: Dict[str, int] = {}
+        self._by_ip: Dict[str, Set[str]] = {}
+        self._tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+        self._dependents: Dict[str, Set[str]] = {}
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, List[BusinessService]]' = OrderedDict()
+
+    def update(self, services: Dict[str, 'BusinessService']) -> Tuple[Set[str], Set[str], Set[str]]:
+        """Apply a new service set, re-indexing only services that changed."""
+        names = set(services)
+        added = names - self._names
+        removed = self._names - names
+        changed = {
+            name for name in names & self._names
+            if services[name] != self.services[name]
+        }
+
+        for name in removed | changed:
+            self._unindex(self.services[name])
+        for name in added | changed:
+            self._index(services[name])
+
+        self.services = dict(services)
+        self._names = names
+        self._order = {name: i for i, name in enumerate(services)}
+        if added or removed or changed:
+            self._cache.clear()
+            logger.info(
+                f"Service index updated: {len(added)} added, {len(removed)} removed, "
+                f"{len(changed)} changed"
+            )
+        return added, removed, changed
+
+    def _dependencies(self, service: 'BusinessService'):
+        """Yield ('ip' | 'network' | 'service', value) for each dependency."""
+        for dependency in service.dependencies:
+            try:
+                if '/' in dependency:
+                    yield 'network', ipaddress.ip_network(dependency, strict=False)
+                else:
+                    yield 'ip', str(ipaddress.ip_address(dependency))
+            except ValueError:
+                yield 'service', dependency
+
+    def _index(self, service: 'BusinessService'):
+        for kind, value in self._dependencies(service):
+            if kind == 'ip':
+                self._by_ip.setdefault(value, set()).add(service.name)
+            elif kind == 'network':
+                self._tries[value.version].insert(value, service.name)
+            else:
+                self._dependents.setdefault(value, set()).add(service.name)
+
+    def _unindex(self, service: 'BusinessService'):
+        for kind, value in self._dependencies(service):
+            if kind == 'ip':
+                names = self._by_ip.get(value)
+                if names is not None:
+                    names.discard(service.name)
+                    if not names:
+                        del self._by_ip[value]
+            elif kind == 'network':
+                self._tries[value.version].remove(value, service.name)
+            else:
+                names = self._dependents.get(value)
+                if names is not None:
+                    names.discard(service.name)
+                    if not names:
+                        del self._dependents[value]
+
+    def lookup(self, device_ip: str) -> List['BusinessService']:
+        """Get the services affected by a device, including dependent services."""
+        cached = self._cache.get(device_ip)
+        if cached is not None:
+            self._cache.move_to_end(device_ip)
+            return list(cached)
+
+        try:
+            address = ipaddress.ip_address(device_ip)
+        except ValueError:
+            return []
+        affected = set(self._by_ip.get(str(address), ()))
+        affected |= self._tries[address.version].match(address)
+
+        # Services that depend on an affected service are affected too
+        pending = deque(affected)
+        while pending:
+            for dependent in self._dependents.get(pending.popleft(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+
+        result = [
+            self.services[name]
+            for name in sorted(affected & self._names, key=self._order.__getitem__)
+        ]
+        self._cache[device_ip] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return list(result)
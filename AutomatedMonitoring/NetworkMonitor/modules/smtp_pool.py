@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+SMTP Pool Module
+Author: 13city
+
+Reuses authenticated SMTP connections across notifications instead of doing
+a fresh connect, STARTTLS and login for every alert, and optionally groups
+alerts for the same recipients into one digest message per window. A digest
+is rendered as a single HTML document listing all of its alerts.
+"""
+
+import logging
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Dict, List, Any, Tuple
+
+logger = logging.getLogger('NetworkMonitor.SmtpPool')
+
+class SmtpConnectionPool:
+    def __init__(self, smtp_config: Dict[str, Any]):
+        """Initialize the pool from the alerting SMTP configuration."""
+        self.config = smtp_config
+        self.max_connections = smtp_config.get('max_connections', 2)
+        self.idle_timeout = smtp_config.get('idle_timeout', 60)
+        self.timeout = smtp_config.get('timeout', 30)
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._lock = threading.Lock()
+        self.stats = {
+            'handshakes': 0,
+            'messages_sent': 0,
+            'reconnects': 0,
+            'failures': 0
+        }
+
+    def _connect(self) -> smtplib.SMTP:
+        """Open, secure and authenticate a new connection."""
+        server = smtplib.SMTP(self.config['server'], self.config['port'], timeout=self.timeout)
+        try:
+            if self.config.get('use_tls', True):
+                server.starttls()
+            if self.config.get('username'):
+                server.login(self.config['username'], self.config['password'])
+        except Exception:
+            self._close(server)
+            raise
+        with self._lock:
+            self.stats['handshakes'] += 1
+        return server
+
+    def _checkout(self) -> smtplib.SMTP:
+        """Take the most recently used idle connection, or open a new one."""
+        now = time.time()
+        server = None
+        expired = []
+        with self._lock:
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if now - last_used < self.idle_timeout:
+                    server = candidate
+                    break
+                expired.append(candidate)
+        # QUIT can be slow; don't hold up other senders while it runs
+        for stale in expired:
+            self._close(stale)
+        return server if server is not None else self._connect()
+
+    def _checkin(self, server: smtplib.SMTP):
+        with self._lock:
+            self._idle.append((server, time.time()))
+
+    def _close(self, server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def send_message(self, msg: MIMEMultipart):
+        """Send a message over a pooled connection, reconnecting once if dropped."""
+        with self._slots:
+            server = self._checkout()
+            try:
+                try:
+                    server.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # Relay closed an idle connection on us
+                    server = self._connect()
+                    with self._lock:
+                        self.stats['reconnects'] += 1
+                    server.send_message(msg)
+            except Exception:
+                self._close(server)
+                with self._lock:
+                    self.stats['failures'] += 1
+                raise
+            self._checkin(server)
+            with self._lock:
+                self.stats['messages_sent'] += 1
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._close(server)
+
+class EmailDigest:
+    def __init__(self, smtp_config: Dict[str, Any], pool: SmtpConnectionPool,
+                 render_digest: Callable[[List['Alert']], str]):
+        """Initialize digest batching; a window of 0 sends every alert at once."""
+        self.from_address = smtp_config['from_address']
+        self.window = smtp_config.get('digest_window', 0)
+        self.pool = pool
+        self.render_digest = render_digest  # One HTML document for several alerts
+        self._groups: Dict[Tuple[str, ...], List[Tuple['Alert', str]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'alerts_queued': 0, 'digests_sent': 0}
+
+    def submit(self, alert: 'Alert', recipients: List[str], content: str):
+        """Queue a rendered alert for its recipient set."""
+        key = tuple(sorted(recipients))
+        if self.window <= 0:
+            self._send(key, [(alert, content)])
+            return
+
+        with self._lock:
+            self.stats['alerts_queued'] += 1
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = []
+                timer = threading.Timer(self.window, self.flush_group, args=(key,))
+                timer.daemon = True
+                timer.start()
+            group.append((alert, content))
+
+    def flush_group(self, key: Tuple[str, ...]):
+        """Send everything queued for one recipient set."""
+        with self._lock:
+            entries = self._groups.pop(key, None)
+        if entries:
+            try:
+                self._send(key, entries)
+            except Exception as e:
+                logger.error(f"Error sending email digest to {', '.join(key)}: {e}")
+
+    def flush(self):
+        """Send all pending digests now."""
+        with self._lock:
+            keys = list(self._groups)
+        for key in keys:
+            self.flush_group(key)
+
+    def _send(self, recipients: Tuple[str, ...], entries: List[Tuple['Alert', str]]):
+        msg = MIMEMultipart()
+        if len(entries) == 1:
+            alert, content = entries[0]
+            msg['Subject'] = f"Network Alert: {alert.severity.value.upper()} - {alert.metric_name}"
+        else:
+            alerts = [alert for alert, _ in entries]
+            critical = sum(1 for alert in alerts if alert.severity.value == 'critical')
+            msg['Subject'] = f"Network Alert Digest: {len(entries)} alerts ({critical} critical)"
+            content = self.render_digest(alerts)
+        msg['From'] = self.from_address
+        msg['To'] = ", ".join(recipients)
+        msg.attach(MIMEText(content, 'html'))
+        self.pool.send_message(msg)
+        if len(entries) > 1:
+            with self._lock:
+                self.stats['digests_sent'] += 1
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+SNMP Collector Module
+Author: 13city
+
+Bulk SNMP collection for every device in a polling cycle. All the OIDs a
+device needs go out together as multi-varbind GETBULK requests, which are
+repeated only for table columns that still have rows left. One SNMP engine
+and one UDP transport are shared by all devices, so requests to different
+devices are in flight at the same time.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from pysnmp.hlapi.asyncore import (
+    CommunityData, ContextData, ObjectIdentity, ObjectType, SnmpEngine,
+    UdpTransportTarget, bulkCmd, nextCmd
+)
+from pysnmp.proto.rfc1905 import EndOfMibView, NoSuchInstance, NoSuchObject
+from pyasn1.type.univ import ObjectIdentifier, OctetString
+
+logger = logging.getLogger('NetworkMonitor.SnmpCollector')
+
+# Scalars are sent as GETBULK non-repeaters; the OID is the object, not .0
+SCALAR_OIDS = {
+    'sys_uptime': '1.3.6.1.2.1.1.3',                 # SNMPv2-MIB sysUpTime
+}
+
+# Table columns are walked with GETBULK repetitions
+COLUMN_OIDS = {
+    'if_name': '1.3.6.1.2.1.31.1.1.1.1',             # IF-MIB ifName
+    'if_in_errors': '1.3.6.1.2.1.2.2.1.14',          # IF-MIB ifInErrors
+    'if_out_errors': '1.3.6.1.2.1.2.2.1.20',         # IF-MIB ifOutErrors
+    'temperature': '1.3.6.1.4.1.9.9.13.1.3.1.3',     # CISCO-ENVMON-MIB ciscoEnvMonTemperatureStatusValue
+    'fan_state': '1.3.6.1.4.1.9.9.13.1.4.1.3',       # CISCO-ENVMON-MIB ciscoEnvMonFanState
+    'poe_power': '1.3.6.1.2.1.105.1.3.1.1.2',        # POWER-ETHERNET-MIB pethMainPsePower (W)
+    'poe_consumption': '1.3.6.1.2.1.105.1.3.1.1.4',  # POWER-ETHERNET-MIB pethMainPseConsumptionPower (W)
+}
+
+# Traffic counters: 64-bit where the protocol can carry them
+HC_COUNTER_OIDS = {
+    'if_hc_in_octets': '1.3.6.1.2.1.31.1.1.1.6',     # IF-MIB ifHCInOctets
+    'if_hc_out_octets': '1.3.6.1.2.1.31.1.1.1.10',   # IF-MIB ifHCOutOctets
+    'if_high_speed': '1.3.6.1.2.1.31.1.1.1.15',      # IF-MIB ifHighSpeed (Mbps)
+}
+
+# SNMPv1 cannot carry Counter64, so v1 devices report the 32-bit counters
+V1_COUNTER_OIDS = {
+    'if_in_octets': '1.3.6.1.2.1.2.2.1.10',          # IF-MIB ifInOctets
+    'if_out_octets': '1.3.6.1.2.1.2.2.1.16',         # IF-MIB ifOutOctets
+    'if_speed': '1.3.6.1.2.1.2.2.1.5',               # IF-MIB ifSpeed (bps)
+}
+
+@dataclass
+class SnmpSample:
+    ip: str
+    timestamp: float = 0.0
+    scalars: Dict[str, Any] = field(default_factory=dict)
+    columns: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # column -> index -> value
+    requests: int = 0
+    error: Optional[str] = None
+
+class _DeviceWalk:
+    """Progress of one device's collection across GETBULK round trips."""
+
+    def __init__(self, device: 'Device', target, auth, deadline: Optional[float] = None):
+        self.device = device
+        self.target = target
+        self.auth = auth
+        self.deadline = deadline  # No further requests are sent after this time
+        self.sample = SnmpSample(ip=device.ip)
+        counters = V1_COUNTER_OIDS if auth.mpModel == 0 else HC_COUNTER_OIDS
+        self.prefixes = {
+            name: ObjectIdentifier(oid) for name, oid in {**counters, **COLUMN_OIDS}.items()
+        }
+        self.pending: Dict[str, ObjectIdentifier] = dict(self.prefixes)  # column -> last OID seen
+        self.scalars_done = False
+
+class SnmpCollector:
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize the collector from the metrics.snmp configuration."""
+        self.port = config.get('port', 161)
+        self.timeout = config.get('timeout', 2.0)
+        self.retries = config.get('retries', 1)
+        self.max_repetitions = config.get('max_repetitions', 25)
+        self.default_community = config.get('community', 'public')
+        self.engine = SnmpEngine()
+        self._lock = threading.Lock()  # The engine's dispatcher runs one job set at a time
+        self.stats = {'devices': 0, 'requests': 0, 'failures': 0}
+
+    def collect(self, devices: List['Device'],
+                deadline: Optional[float] = None) -> Dict[str, SnmpSample]:
+        """Collect every configured OID from all devices concurrently, stopping at deadline."""
+        walks = []
+        for device in devices:
+            try:
+                walks.append(self._start_walk(device, deadline))
+            except Exception as e:
+                logger.error(f"Error starting SNMP collection for {device.ip}: {e}")
+
+        if not walks:
+            return {}
+        wait = -1 if deadline is None else max(0.0, deadline - time.time())
+        if not self._lock.acquire(timeout=wait):
+            self.stats['failures'] += len(walks)
+            return {walk.device.ip: SnmpSample(ip=walk.device.ip, timestamp=time.time(),
+                                               error='deadline exceeded')
+                    for walk in walks}
+        try:
+            for walk in walks:
+                self._send(walk)
+            self.engine.transportDispatcher.runDispatcher()
+        finally:
+            self._lock.release()
+
+        self.stats['devices'] += len(walks)
+        return {walk.device.ip: walk.sample for walk in walks}
+
+    def close(self):
+        """Release the shared transport."""
+        self.engine.transportDispatcher.closeDispatcher()
+
+    def _start_walk(self, device: 'Device', deadline: Optional[float] = None) -> _DeviceWalk:
+        credentials = device.credentials
+        community = (credentials.snmp_community if credentials and credentials.snmp_community
+                     else self.default_community)
+        version = credentials.snmp_version if credentials else 'v2c'
+        auth = CommunityData(community, mpModel=0 if version == 'v1' else 1)
+        timeout = self.timeout
+        if deadline is not None:
+            # One request, retries included, must not outlast the deadline
+            remaining = max(0.0, deadline - time.time())
+            timeout = max(0.1, min(timeout, remaining / (self.retries + 1)))
+        target = UdpTransportTarget((device.ip, self.port), timeout=timeout,
+                                    retries=self.retries)
+        return _DeviceWalk(device, target, auth, deadline)
+
+    def _send(self, walk: _DeviceWalk):
+        """Send the next request for every column of the device still in progress."""
+        columns = list(walk.pending)
+        var_binds = [ObjectType(ObjectIdentity(walk.pending[name])) for name in columns]
+        non_repeaters = 0
+        if not walk.scalars_done:
+            var_binds = [ObjectType(ObjectIdentity(oid)) for oid in SCALAR_OIDS.values()] + var_binds
+            non_repeaters = len(SCALAR_OIDS)
+
+        walk.sample.requests += 1
+        self.stats['requests'] += 1
+        context = (walk, columns, non_repeaters)
+        if walk.auth.mpModel == 0:
+            # SNMPv1 has no GETBULK; a multi-varbind GETNEXT still covers every column
+            nextCmd(self.engine, walk.auth, walk.target, ContextData(), *var_binds,
+                    cbFun=self._on_response, cbCtx=context, lookupMib=False)
+        else:
+            bulkCmd(self.engine, walk.auth, walk.target, ContextData(),
+                    non_repeaters, self.max_repetitions, *var_binds,
+                    cbFun=self._on_response, cbCtx=context, lookupMib=False)
+
+    def _on_response(self, engine, handle, error_indication, error_status, error_index,
+                     var_bind_table, context):
+        walk, columns, non_repeaters = context
+        sample = walk.sample
+        if error_status and int(error_status) == 2 and walk.auth.mpModel == 0 and error_index:
+            # SNMPv1 reports walking off the end of the MIB as noSuchName on one varbind
+            position = int(error_index) - 1 - non_repeaters
+            if position >= 0:
+                walk.pending.pop(columns[position], None)
+            else:
+                walk.scalars_done = True
+            self._continue(walk)
+            return
+        if error_indication or error_status:
+            sample.error = str(error_indication or error_status.prettyPrint())
+            sample.timestamp = time.time()
+            self.stats['failures'] += 1
+            logger.debug(f"SNMP collection failed for {sample.ip}: {sample.error}")
+            return
+
+        walk.scalars_done = True
+        for row_number, row in enumerate(var_bind_table):
+            if row_number == 0:
+                for name, (oid, value) in zip(SCALAR_OIDS, row[:non_repeaters]):
+                    if not self._is_missing(value):
+                        sample.scalars[name] = self._convert(value)
+            for name, (oid, value) in zip(columns, row[non_repeaters:]):
+                if name not in walk.pending:
+                    continue
+                prefix = walk.prefixes[name]
+                if self._is_missing(value) or not prefix.isPrefixOf(oid):
+                    del walk.pending[name]  # Walked past the end of this column
+                    continue
+                index = '.'.join(str(part) for part in tuple(oid)[len(prefix):])
+                sample.columns.setdefault(name, {})[index] = self._convert(value)
+                walk.pending[name] = oid
+
+        if not var_bind_table:
+            walk.pending.clear()
+        self._continue(walk)
+
+    def _continue(self, walk: _DeviceWalk):
+        """Request the next rows, or finish the device once every column is done."""
+        if not walk.pending:
+            walk.sample.timestamp = time.time()
+        elif walk.deadline is not None and time.time() >= walk.deadline:
+            walk.sample.error = 'deadline exceeded'
+            walk.sample.timestamp = time.time()
+            self.stats['failures'] += 1
+            logger.debug(f"SNMP collection for {walk.sample.ip} stopped at its deadline")
+        else:
+            self._send(walk)
+
+    @staticmethod
+    def _is_missing(value) -> bool:
+        return isinstance(value, (EndOfMibView, NoSuchInstance, NoSuchObject))
+
+    @staticmethod
+    def _convert(value):
+        if isinstance(value, OctetString):
+            try:
+                text = value.asOctets().decode('utf-8')
+                if text.isprintable():
+                    return text
+            except UnicodeDecodeError:
+                pass
+            return value.prettyPrint()  # Binary values as 0x-prefixed hex
+        if isinstance(value, ObjectIdentifier):
+            return str(value)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return value.prettyPrint()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Template Renderer Module
+Author: 13city
+
+Notification templates loaded through one jinja2 Environment: templates are
+compiled once on first use (optionally with an on-disk bytecode cache in
+cache_dir, kept across restarts), and repeated fragments such as service
+lists and escalation paths are rendered once per distinct input and then
+served from a cache.
+"""
+
+import dataclasses
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+logger = logging.getLogger('NetworkMonitor.TemplateRenderer')
+
+def format_datetime(timestamp: float, fmt: str = '%Y-%m-%d %H:%M:%S') -> str:
+    """Jinja filter: format a Unix timestamp in local time."""
+    return datetime.fromtimestamp(timestamp).strftime(fmt)
+
+def _freeze(value: Any) -> Any:
+    """Hashable key for a fragment argument (lists, dicts and dataclasses)."""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return (type(value).__name__,) + tuple(
+            _freeze(getattr(value, f.name)) for f in dataclasses.fields(value)
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+class TemplateRenderer:
+    def __init__(self, template_dir: str, cache_dir: Optional[str] = None,
+                 fragment_cache_size: int = 256):
+        """Initialize the template environment."""
+        bytecode_cache = None
+        if cache_dir:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=bytecode_cache,
+            auto_reload=False
+        )
+        self.env.filters['datetime'] = format_datetime
+        self.env.globals['fragment'] = self.render_fragment
+        self.fragment_cache_size = fragment_cache_size
+        self._fragments: 'OrderedDict[Any, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'fragment_hits': 0, 'fragment_misses': 0}
+
+    def __getitem__(self, name: str) -> Template:
+        """Get a compiled template by name, e.g. 'slack_critical'."""
+        return self.env.get_template(f"{name}.j2")
+
+    def __contains__(self, name: str) -> bool:
+        return f"{name}.j2" in self.env.list_templates()
+
+    def render_fragment(self, name: str, items: Any) -> str:
+        """Render fragments/<name>.j2 for items, reusing earlier output."""
+        try:
+            key = (name, _freeze(items))
+            hash(key)
+        except TypeError:
+            return self.env.get_template(f"fragments/{name}.j2").render(items=items)
+
+        with self._lock:
+            output = self._fragments.get(key)
+            if output is not None:
+                self._fragments.move_to_end(key)
+                self.stats['fragment_hits'] += 1
+                return output
+
+        output = self.env.get_template(f"fragments/{name}.j2").render(items=items)
+        with self._lock:
+            self.stats['fragment_misses'] += 1
+            self._fragments[key] = output
+            if len(self._fragments) > self.fragment_cache_size:
+                self._fragments.popitem(last=False)
+        return output
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Threshold Registry Module
+Author: 13city
+
+Compiles metrics.thresholds from the configuration into lookup tables once
+at startup. Each metric gets an index into warning/critical arrays, and
+per-device-type, per-location and per-device overrides are folded into one
+threshold profile per combination the first time it is seen. Evaluating a
+row is then an array index, however many overrides are configured. Metrics
+with a window (e.g. auth_failures) are compared on their sliding-window
+totals rather than on each sample.
+"""
+
+import logging
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('NetworkMonitor.ThresholdRegistry')
+
+# Override layers, applied in this order so the most specific one wins
+OVERRIDE_LAYERS = ('device_type', 'location', 'device')
+
+# Severity codes as produced by AlertManager's evaluate_thresholds
+_STATUS_LEVELS = (('warning', 1), ('critical', 2))
+
+class ThresholdProfile:
+    """Resolved thresholds for one (device type, location, device) combination."""
+    __slots__ = ('warnings', 'criticals', 'status')
+
+    def __init__(self, warnings: np.ndarray, criticals: np.ndarray,
+                 status: Dict[int, Dict[str, int]]):
+        # One slot per metric index plus a trailing NaN slot, so index -1
+        # (a metric with no configured threshold) never breaches
+        self.warnings = warnings
+        self.criticals = criticals
+        self.status = status      # Metric index -> status value -> severity code
+
+class ThresholdRegistry:
+    def __init__(self, config: Dict[str, Any]):
+        """Compile the metrics.thresholds configuration."""
+        self.metric_index: Dict[str, int] = {}
+        metrics = {name: settings for category, metrics in config.items()
+                   if category != 'overrides' for name, settings in metrics.items()}
+        self._base = self._compile_layer(metrics)
+        # Metric name -> window in seconds, for thresholds on windowed totals
+        self.windows: Dict[str, float] = {
+            name: float(settings['window']) for name, settings in metrics.items()
+            if settings.get('window')
+        }
+        overrides = config.get('overrides', {})
+        self._overrides = {
+            layer: {key: self._compile_layer(metrics)
+                    for key, metrics in overrides.get(layer, {}).items()}
+            for layer in OVERRIDE_LAYERS
+        }
+        self._profiles: Dict[Tuple, ThresholdProfile] = {}
+        self._descriptor_indices: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.default_profile = self._build_profile(())
+
+    def _compile_layer(self, metrics: Dict[str, Dict[str, Any]]) -> List[Tuple[int, str, Any]]:
+        """Flatten one layer to (metric index, level, threshold) entries."""
+        entries = []
+        for name, settings in metrics.items():
+            index = self.metric_index.setdefault(name, len(self.metric_index))
+            for level in ('warning', 'critical'):
+                if settings.get(level) is not None:
+                    entries.append((index, level, settings[level]))
+        return entries
+
+    def _build_profile(self, layers: Tuple[List[Tuple[int, str, Any]], ...]) -> ThresholdProfile:
+        size = len(self.metric_index) + 1
+        warnings = np.full(size, math.nan)
+        criticals = np.full(size, math.nan)
+        status: Dict[int, Dict[str, Any]] = {}
+        for layer in (self._base,) + layers:
+            for index, level, threshold in layer:
+                if isinstance(threshold, str):
+                    status.setdefault(index, {})[level] = threshold
+                    continue
+                (warnings if level == 'warning' else criticals)[index] = threshold
+        # Status thresholds name the value that triggers each level
+        codes = {
+            index: {levels[level]: code for level, code in _STATUS_LEVELS if level in levels}
+            for index, levels in status.items()
+        }
+        return ThresholdProfile(warnings, criticals, codes)
+
+    def profile(self, device: 'Device') -> ThresholdProfile:
+        """Get the resolved thresholds for a device."""
+        device_type = getattr(device.device_type, 'value', device.device_type)
+        location = getattr(device, 'location', None)
+        keys = (device_type, location, device.ip)
+        # Devices sharing every override that applies to them share a profile
+        key = tuple(k if k in self._overrides[layer] else None
+                    for layer, k in zip(OVERRIDE_LAYERS, keys))
+        profile = self._profiles.get(key)
+        if profile is None:
+            with self._lock:
+                profile = self._profiles.get(key)
+                if profile is None:
+                    layers = tuple(self._overrides[layer][k]
+                                   for layer, k in zip(OVERRIDE_LAYERS, key) if k is not None)
+                    profile = self._profiles[key] = (
+                        self._build_profile(layers) if layers else self.default_profile
+                    )
+        return profile
+
+    def index(self, name: str) -> int:
+        """Metric index for a name, or -1 if it has no configured thresholds."""
+        return self.metric_index.get(name, -1)
+
+    def sample_index(self, name: str) -> int:
+        """Metric index for thresholds on single samples; -1 for windowed metrics."""
+        return -1 if name in self.windows else self.metric_index.get(name, -1)
+
+    def descriptor_indices(self, table: 'DescriptorTable') -> np.ndarray:
+        """Sample metric index for every descriptor id of a DescriptorTable."""
+        indices = self._descriptor_indices.get(id(table))
+        if indices is None or len(indices) != len(table.descriptors):
+            indices = np.array([self.sample_index(d.name) for d in table.descriptors],
+                               dtype=np.intp)
+            self._descriptor_indices[id(table)] = indices
+        return indices
+
+    def default(self, name: str) -> Tuple[Optional[float], Optional[float]]:
+        """(warning, critical) sample thresholds without overrides, None where unset."""
+        index = self.sample_index(name)
+        if index < 0:
+            return None, None
+        profile = self.default_profile
+        return tuple(None if math.isnan(value) else float(value)
+                     for value in (profile.warnings[index], profile.criticals[index]))
+
+    @staticmethod
+    def status_code(profile: ThresholdProfile, index: int, value: Any) -> int:
+        """Severity code for a status value such as "failed"."""
+        levels = profile.status.get(index)
+        return levels.get(value, 0) if levels else 0
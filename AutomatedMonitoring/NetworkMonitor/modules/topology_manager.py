@@ -11,6 +11,8 @@ import json
 import pysnmp.hlapi as snmp
 from scapy.all import *
 
+from modules.dns_cache import ReverseDnsCache
+
 logger = logging.getLogger('NetworkMonitor.TopologyManager')
 
 class LinkType(Enum):
@@ -50,9 +52,10 @@ class TopologyNode:
     routes: List[Dict] = None
 
 class TopologyManager:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], dns_cache: Optional[ReverseDnsCache] = None):
         """Initialize the Topology Manager."""
         self.config = config
+        self.dns_cache = dns_cache or ReverseDnsCache({})
         self.topology: nx.Graph = nx.Graph()
         self.layer2_topology: nx.Graph = nx.Graph()
         self.layer3_topology: nx.Graph = nx.Graph()
@@ -85,6 +88,9 @@ class TopologyManager:
             # Merge Layer 2 and Layer 3 topologies
             self._merge_topologies()
 
+            # Label nodes with their DNS names
+            self._label_nodes()
+
             # Detect and record changes
             self._detect_topology_changes(previous_topology)
 
@@ -217,6 +223,16 @@ class TopologyManager:
         except Exception as e:
             logger.error(f"Error merging topologies: {e}")
 
+    def _label_nodes(self):
+        """Set each node's label to its reverse-DNS name in one bulk lookup."""
+        try:
+            labels = self.dns_cache.resolve_many(str(node) for node in self.topology.nodes())
+            nx.set_node_attributes(
+                self.topology, {node: labels[str(node)] for node in self.topology.nodes()}, 'label'
+            )
+        except Exception as e:
+            logger.error(f"Error labelling topology nodes: {e}")
+
     def _merge_duplicate_links(self):
         """Identify and merge duplicate links between the same devices."""
         duplicate_edges = []
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Webhook Dispatcher Module
+Author: 13city
+
+Delivers Slack webhook notifications from background workers so a slow or
+rate-limited webhook never holds up polling. Messages wait in a bounded
+queue, are coalesced into one post per batch and go out over a keep-alive
+session, with backoff retries that honor 429 Retry-After. Closing drains
+the queue for up to close_timeout seconds; after that, retries are abandoned
+and whatever is still queued is dropped.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('NetworkMonitor.WebhookDispatcher')
+
+_STOP = object()
+_IDLE_POLL = 0.5  # Seconds an idle worker waits before rechecking for close
+
+class WebhookDispatcher:
+    def __init__(self, webhook_url: str, config: Dict[str, Any]):
+        """Initialize the dispatcher and start its worker threads."""
+        self.webhook_url = webhook_url
+        self.config = config
+        self.workers = config.get('workers', 2)
+        self.timeout = config.get('timeout', 10)
+        self.max_retries = config.get('max_retries', 5)
+        self.backoff = config.get('backoff', 1.0)
+        self.max_backoff = config.get('max_backoff', 60.0)
+        self.max_batch = config.get('max_batch', 10)
+        self.batch_wait = config.get('batch_wait', 1.0)
+        self.separator = config.get('separator', '\n\n')
+        self.close_timeout = config.get('close_timeout', 30.0)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=config.get('queue_size', 1000))
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_maxsize=self.workers))
+        self._session.mount('http://', HTTPAdapter(pool_maxsize=self.workers))
+        self._lock = threading.Lock()
+        self._closing = threading.Event()  # No new messages; exit once drained
+        self._stopped = threading.Event()  # Drain timed out; abandon retries
+        self.stats = {
+            'queued': 0,
+            'dropped': 0,
+            'posts': 0,
+            'messages_sent': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'failures': 0
+        }
+        self._threads = [
+            threading.Thread(target=self._run, name=f"webhook-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def submit(self, message: str) -> bool:
+        """Queue a message without blocking; returns False if the queue is full."""
+        if self._closing.is_set():
+            self._count('dropped')
+            return False
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self._count('dropped')
+            logger.warning("Webhook queue full; dropping Slack notification")
+            return False
+        self._count('queued')
+        return True
+
+    def _next_batch(self) -> Optional[List[str]]:
+        """Wait for one message, then gather more for up to batch_wait seconds."""
+        while True:
+            try:
+                first = self._queue.get(timeout=_IDLE_POLL)
+                break
+            except queue.Empty:
+                if self._closing.is_set():
+                    return None
+        if first is _STOP:
+            self._queue.task_done()
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if message is _STOP:
+                # Leave the stop marker for the next idle worker; if the queue
+                # filled up meanwhile, the closing flag stops them instead
+                self._queue.task_done()
+                try:
+                    self._queue.put_nowait(_STOP)
+                except queue.Full:
+                    pass
+                break
+            batch.append(message)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if self._stopped.is_set():
+                self._count('dropped', len(batch))
+                for _ in batch:
+                    self._queue.task_done()
+                continue
+            try:
+                self._post(self.separator.join(batch))
+                self._count('messages_sent', len(batch))
+            except Exception as e:
+                self._count('failures')
+                logger.error(f"Error sending Slack notification batch ({len(batch)} alerts): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _post(self, text: str):
+        """Post one coalesced message, retrying with backoff."""
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._session.post(
+                    self.webhook_url, json={"text": text}, timeout=self.timeout
+                )
+                self._count('posts')
+                if response.status_code == 429:
+                    self._count('rate_limited')
+                    wait = self._retry_after(response, delay)
+                elif response.status_code >= 500:
+                    wait = delay
+                else:
+                    response.raise_for_status()
+                    return
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                wait, error = delay, str(e)
+
+            if attempt == self.max_retries:
+                raise RuntimeError(f"giving up after {attempt + 1} attempts: {error}")
+            self._count('retries')
+            logger.warning(f"Slack webhook {error}; retrying in {wait:.1f}s")
+            if self._stopped.wait(wait):
+                raise RuntimeError(f"dispatcher closed after {attempt + 1} attempts: {error}")
+            delay = min(delay * 2, self.max_backoff)
+
+    def _retry_after(self, response: requests.Response, default: float) -> float:
+        try:
+            return min(float(response.headers['Retry-After']), self.max_backoff)
+        except (KeyError, ValueError):
+            return default
+
+    def flush(self):
+        """Block until every queued message has been delivered or dropped."""
+        self._queue.join()
+
+    def close(self, timeout: Optional[float] = None):
+        """Drain the queue within timeout, stop the workers and close the HTTP session."""
+        timeout = self.close_timeout if timeout is None else timeout
+        self._closing.set()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                break  # Workers see the closing flag once the queue drains
+
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in self._threads):
+            logger.warning("Webhook queue not drained before close timeout; "
+                           "dropping remaining Slack notifications")
+            self._stopped.set()
+            # A post already in flight is bounded by the request timeout
+            for thread in self._threads:
+                thread.join(self.timeout)
+        self._session.close()
@@ -9,6 +9,7 @@ performance metrics, and security events.
 
 import os
 import sys
+import asyncio
 import json
 import time
 import logging
@@ -28,13 +29,17 @@ logging.basicConfig(
 logger = logging.getLogger('NetworkMonitor')
 
 class NetworkMonitor:
-    def __init__(self, config_path: str = 'config/config.json'):
+    def __init__(self, config_path: str = 'config/config.json', async_mode: bool = False):
         """Initialize the Network Monitor with configuration."""
         self.config = self._load_config(config_path)
+        self.async_mode = async_mode
+        self.dns_cache = None
         self.alert_manager = None
         self.device_manager = None
         self.metrics_manager = None
         self.topology_manager = None
+        self.polling_engine = None
+        self.polling_interval = self.config.get('general', {}).get('polling_interval', 300)
         self._initialize_components()
 
     def _load_config(self, config_path: str) -> Dict[str, Any]:
@@ -52,13 +57,30 @@ class NetworkMonitor:
         from modules.alert_manager import AlertManager
         from modules.device_manager import DeviceManager
         from modules.metrics_manager import MetricsManager
+        from modules.async_metrics_manager import AsyncMetricsManager
         from modules.topology_manager import TopologyManager
+        from modules.polling_engine import PollingEngine
+        from modules.dns_cache import ReverseDnsCache
 
         try:
-            self.alert_manager = AlertManager(self.config['alerting'])
-            self.device_manager = DeviceManager(self.config['devices'])
-            self.metrics_manager = MetricsManager(self.config['metrics'])
-            self.topology_manager = TopologyManager(self.config['topology'])
+            # One reverse-DNS cache shared by discovery, alerts and topology
+            self.dns_cache = ReverseDnsCache(self.config.get('dns_cache', {}))
+            self.device_manager = DeviceManager(self.config['devices'], self.dns_cache)
+            if self.async_mode:
+                self.metrics_manager = AsyncMetricsManager(self.config['metrics'])
+            else:
+                self.metrics_manager = MetricsManager(self.config['metrics'])
+            # Alerts are evaluated against the thresholds compiled by the metrics manager
+            self.alert_manager = AlertManager(
+                self.config['alerting'], self.dns_cache, self.metrics_manager.thresholds,
+                self.polling_interval
+            )
+            self.topology_manager = TopologyManager(self.config['topology'], self.dns_cache)
+            self.polling_engine = PollingEngine(
+                self.config.get('polling', {}),
+                self.metrics_manager,
+                self.alert_manager
+            )
         except Exception as e:
             logger.error(f"Failed to initialize components: {e}")
             sys.exit(1)
@@ -72,34 +94,76 @@ class NetworkMonitor:
                 # Update network topology
                 topology = self.topology_manager.update_topology()
 
-                # Monitor all devices
-                for device in self.device_manager.get_devices():
-                    # Collect metrics
-                    metrics = self.metrics_manager.collect_metrics(device)
-                    
-                    # Process security events
-                    security_events = self.metrics_manager.check_security(device)
-                    
-                    # Check thresholds and generate alerts
-                    alerts = self.alert_manager.process_metrics(device, metrics)
-                    
-                    # Process security alerts
-                    security_alerts = self.alert_manager.process_security_events(security_events)
-                    
-                    # Send notifications if needed
-                    if alerts or security_alerts:
-                        self.alert_manager.send_notifications(alerts + security_alerts)
+                # Monitor all devices concurrently within the polling interval
+                stats = self.polling_engine.run_cycle(
+                    self.device_manager.get_devices(),
+                    cycle_timeout=self.polling_interval
+                )
+                if stats.duration > self.polling_interval:
+                    logger.warning(
+                        f"Polling cycle took {stats.duration:.2f}s, longer than the "
+                        f"{self.polling_interval}s polling interval"
+                    )
 
                 # Generate periodic reports
                 self._generate_reports()
                 
-                # Sleep for the configured interval
-                time.sleep(self.config.get('polling_interval', 300))  # Default 5 minutes
+                # Sleep for the remainder of the configured interval
+                time.sleep(max(0, self.polling_interval - stats.duration))
 
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
                 time.sleep(60)  # Wait before retrying
 
+    async def start_monitoring_async(self):
+        """Start the main monitoring loop on a single asyncio event loop."""
+        logger.info("Starting network monitoring (async mode)...")
+        loop = asyncio.get_running_loop()
+
+        while True:
+            try:
+                started = time.time()
+
+                # Update network topology
+                await loop.run_in_executor(None, self.topology_manager.update_topology)
+
+                # Probe every device concurrently from this event loop
+                devices = await self.device_manager.get_devices_async()
+                results = await self.metrics_manager.collect_metrics_many(devices)
+
+                # Evaluate the whole cycle's thresholds in one batch
+                alerts = self.alert_manager.process_metrics_batch(
+                    [(device, results.get(device.ip, [])) for device in devices]
+                )
+                alerts += self.alert_manager.process_security_events([
+                    event for device in devices
+                    for event in self.metrics_manager.check_security(device)
+                ])
+
+                # Notification I/O is blocking; keep it off the event loop
+                if alerts:
+                    await loop.run_in_executor(
+                        None, self.alert_manager.send_notifications, alerts
+                    )
+
+                duration = time.time() - started
+                logger.info(f"Async polling cycle completed in {duration:.2f}s ({len(devices)} devices)")
+
+                # Generate periodic reports
+                self._generate_reports()
+
+                await asyncio.sleep(max(0, self.polling_interval - duration))
+
+            except Exception as e:
+                logger.error(f"Error in monitoring loop: {e}")
+                await asyncio.sleep(60)  # Wait before retrying
+
+    def shutdown(self):
+        """Stop background workers and flush pending notifications."""
+        self.device_manager.close()
+        self.polling_engine.shutdown()
+        self.alert_manager.close()
+
     def _generate_reports(self):
         """Generate periodic reports."""
         try:
@@ -137,13 +201,23 @@ def main():
                       help='Path to configuration file')
     parser.add_argument('--debug', action='store_true',
                       help='Enable debug logging')
+    parser.add_argument('--async', dest='async_mode', action='store_true',
+                      help='Run collection on a single asyncio event loop')
     args = parser.parse_args()
 
     if args.debug:
         logger.setLevel(logging.DEBUG)
 
-    monitor = NetworkMonitor(args.config)
-    monitor.start_monitoring()
+    monitor = NetworkMonitor(args.config, async_mode=args.async_mode)
+    try:
+        if args.async_mode:
+            asyncio.run(monitor.start_monitoring_async())
+        else:
+            monitor.start_monitoring()
+    except KeyboardInterrupt:
+        logger.info("Stopping network monitoring...")
+    finally:
+        monitor.shutdown()
 
 if __name__ == '__main__':
     main()
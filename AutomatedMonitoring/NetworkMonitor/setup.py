@@ -29,12 +29,13 @@ class SetupManager:
             'data',
             'data/topology',
             'data/metrics',
+            'data/alerts',
             'data/reports',
             'data/backups',
             'data/exports',
             'data/cache'
         ]
-        self.required_python_version = (3, 8)
+        self.required_python_version = (3, 10)
         self.load_environment()
 
     def load_environment(self):
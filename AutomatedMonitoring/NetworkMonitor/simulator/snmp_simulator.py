@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+SNMP Simulator
+Author: 13city
+
+Minimal SNMPv1/v2c command responder for offline testing of the SNMP
+collector. It serves snmpsim-format data files (one "OID|type|value" record
+per line), selecting the file by community name as snmpsim does, so
+simulator/data/switch.snmprec answers to community "switch". The same data
+directory also works with snmpsim-command-responder.
+
+Usage:
+    python simulator/snmp_simulator.py --data-dir simulator/data --port 1161
+"""
+
+import argparse
+import bisect
+import logging
+import select
+import socket
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pyasn1.codec.ber import decoder, encoder
+from pysnmp.proto import api
+
+logger = logging.getLogger('NetworkMonitor.SnmpSimulator')
+
+# snmprec type tags (BER tag numbers) to SNMP value types
+VALUE_TYPES = {
+    '2': api.v2c.Integer,
+    '4': api.v2c.OctetString,
+    '5': api.v2c.Null,
+    '6': api.v2c.ObjectIdentifier,
+    '64': api.v2c.IpAddress,
+    '65': api.v2c.Counter32,
+    '66': api.v2c.Gauge32,
+    '67': api.v2c.TimeTicks,
+    '68': api.v2c.Opaque,
+    '70': api.v2c.Counter64,
+}
+
+class SnmpRecords:
+    """Sorted OID -> value table loaded from one .snmprec file."""
+
+    def __init__(self, path: Path):
+        self.oids: List[Tuple[int, ...]] = []
+        self.values: Dict[Tuple[int, ...], object] = {}
+        for line in path.read_text().splitlines():
+            if not line.strip() or line.startswith('#'):
+                continue
+            oid, tag, value = line.split('|', 2)
+            key = tuple(int(part) for part in oid.split('.'))
+            self.values[key] = self._parse_value(tag, value)
+        self.oids = sorted(self.values)
+
+    @staticmethod
+    def _parse_value(tag: str, value: str):
+        if tag.endswith('x'):  # Hex-encoded value
+            return VALUE_TYPES[tag[:-1]](hexValue=value)
+        if tag == '5':
+            return api.v2c.Null('')
+        if tag in ('2', '65', '66', '67', '70'):
+            return VALUE_TYPES[tag](int(value))
+        return VALUE_TYPES[tag](value)
+
+    def get(self, oid: Tuple[int, ...]):
+        return self.values.get(oid)
+
+    def next(self, oid: Tuple[int, ...],
+             skip_counter64: bool = False) -> Optional[Tuple[Tuple[int, ...], object]]:
+        """The first record after oid in lexicographic order."""
+        index = bisect.bisect_right(self.oids, oid)
+        while index < len(self.oids):
+            found = self.oids[index]
+            value = self.values[found]
+            # SNMPv1 cannot encode Counter64, so v1 agents skip those objects
+            if not (skip_counter64 and isinstance(value, api.v2c.Counter64)):
+                return found, value
+            index += 1
+        return None
+
+class SnmpSimulator:
+    def __init__(self, data_dir: str, host: str = '127.0.0.1', port: int = 0):
+        """Load every <community>.snmprec file in data_dir and bind the UDP socket."""
+        self.communities = {
+            path.stem: SnmpRecords(path) for path in Path(data_dir).glob('*.snmprec')
+        }
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.address = self.sock.getsockname()
+        self.requests = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'SnmpSimulator':
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve, name='snmp-simulator', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve(self):
+        """Answer requests until stop() is called."""
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self.sock], [], [], 0.1)
+            if not readable:
+                continue
+            data, peer = self.sock.recvfrom(65535)
+            try:
+                response = self.handle(data)
+            except Exception as e:
+                logger.error(f"Error handling SNMP request from {peer}: {e}")
+                continue
+            if response is not None:
+                self.sock.sendto(response, peer)
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sock.close()
+
+    def handle(self, data: bytes) -> Optional[bytes]:
+        """Build the encoded response to one request; None drops it."""
+        version = int(api.decodeMessageVersion(data))
+        proto = api.protoModules[version]
+        request, _ = decoder.decode(data, asn1Spec=proto.Message())
+        records = self.communities.get(str(proto.apiMessage.getCommunity(request)))
+        if records is None:
+            return None  # Unknown community; real agents stay silent too
+        self.requests += 1
+
+        pdu = proto.apiMessage.getPDU(request)
+        response = proto.apiMessage.getResponse(request)
+        response_pdu = proto.apiMessage.getPDU(response)
+        oids = [tuple(oid) for oid, _ in proto.apiPDU.getVarBinds(pdu)]
+
+        if pdu.isSameTypeWith(proto.GetRequestPDU()):
+            var_binds = [(oid, records.get(oid)) for oid in oids]
+        elif pdu.isSameTypeWith(proto.GetNextRequestPDU()):
+            var_binds = [self._next(records, oid, version == api.protoVersion1) for oid in oids]
+        elif version == api.protoVersion2c and pdu.isSameTypeWith(proto.GetBulkRequestPDU()):
+            var_binds = self._bulk(records, oids,
+                                   int(proto.apiBulkPDU.getNonRepeaters(pdu)),
+                                   int(proto.apiBulkPDU.getMaxRepetitions(pdu)))
+        else:
+            proto.apiPDU.setErrorStatus(response_pdu, 5)  # genErr
+            return encoder.encode(response)
+
+        for index, (oid, value) in enumerate(var_binds):
+            if value is not None:
+                continue
+            if version == api.protoVersion1:
+                proto.apiPDU.setErrorStatus(response_pdu, 2)  # noSuchName
+                proto.apiPDU.setErrorIndex(response_pdu, index + 1)
+                var_binds = [(o, v if v is not None else api.v1.Null('')) for o, v in var_binds]
+                break
+            getting = pdu.isSameTypeWith(proto.GetRequestPDU())
+            var_binds[index] = (oid, api.v2c.NoSuchInstance('') if getting
+                                else api.v2c.EndOfMibView(''))
+
+        proto.apiPDU.setVarBinds(response_pdu, var_binds)
+        return encoder.encode(response)
+
+    def _next(self, records: SnmpRecords, oid, skip_counter64: bool = False):
+        found = records.next(oid, skip_counter64)
+        return found if found is not None else (oid, None)
+
+    def _bulk(self, records: SnmpRecords, oids, non_repeaters: int, max_repetitions: int):
+        var_binds = [self._next(records, oid) for oid in oids[:non_repeaters]]
+        current = list(oids[non_repeaters:])
+        for _ in range(max_repetitions if current else 0):
+            row = [self._next(records, oid) for oid in current]
+            var_binds.extend(row)
+            current = [oid for oid, _ in row]
+            if all(value is None for _, value in row):
+                break
+        return var_binds
+
+def main():
+    parser = argparse.ArgumentParser(description='SNMP simulator for offline testing')
+    parser.add_argument('--data-dir', default=str(Path(__file__).parent / 'data'),
+                        help='Directory of <community>.snmprec files')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=1161, help='UDP port to listen on')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    simulator = SnmpSimulator(args.data_dir, args.host, args.port)
+    logger.info(f"Serving communities {sorted(simulator.communities)} on "
+                f"{simulator.address[0]}:{simulator.address[1]}")
+    try:
+        simulator.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.sock.close()
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 
 import os
 import sys
+import copy
 import json
 import time
 import logging
@@ -10,14 +11,35 @@ import requests
 from pathlib import Path
 from typing import List, Dict, Any
 from datetime import datetime
+import tempfile
+import threading
+import email
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import unittest
+import asyncio
+import numpy as np
 from unittest.mock import MagicMock, patch
 
 # Import local modules
-from modules.device_manager import DeviceManager
-from modules.metrics_manager import MetricsManager
-from modules.alert_manager import AlertManager
+from modules.device_manager import Device, DeviceManager, DeviceType
+from modules.metrics_manager import MetricsManager, Metric, MetricType
+from modules.async_metrics_manager import AsyncMetricsManager
+from modules.alert_manager import Alert, AlertManager, AlertSeverity, AlertStatus
+from modules.alert_archive import AlertArchive
+from modules.webhook_dispatcher import WebhookDispatcher
+from modules.alert_index import ActiveAlertIndex
 from modules.topology_manager import TopologyManager
+from modules.discovery_scanner import DiscoveryScanner
+from modules.dns_cache import ReverseDnsCache
+from modules.icmp_prober import BatchIcmpProber, LoopbackIcmpBackend, ProbeResult
+from modules.series_compression import CompressedSeries
+from modules.counter_cache import CounterStateCache
+from modules.polling_engine import PollingEngine
+from modules.event_window import EventWindowCounters
+from modules.snmp_collector import SnmpSample
+from modules.threshold_registry import ThresholdRegistry
+from simulator.snmp_simulator import SnmpSimulator
 
 logging.basicConfig(
     level=logging.INFO,
@@ -40,6 +62,15 @@ class NetworkMonitorTests(unittest.TestCase):
 
     def setUp(self):
         """Set up each test."""
+        # Keep everything the managers persist out of the source tree
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        self.data_dir = Path(data_dir.name)
+        self.config = copy.deepcopy(self.config)
+        self.config['metrics']['storage']['data_dir'] = str(self.data_dir / 'metrics')
+        self.config['alerting']['history']['archive_dir'] = str(self.data_dir / 'alerts')
+        self.config['alerting']['template_cache_dir'] = str(self.data_dir / 'templates')
+
         self.device_manager = DeviceManager(self.config['devices'])
         self.metrics_manager = MetricsManager(self.config['metrics'])
         self.alert_manager = AlertManager(self.config['alerting'])
@@ -84,6 +115,130 @@ class NetworkMonitorTests(unittest.TestCase):
             self.assertGreater(len(devices), 0)
             self.assertEqual(devices[0].ip, mock_device['ip'])
 
+    def test_discovery_scanner(self):
+        """Test that the scanner reports only hosts with an open port, once each."""
+        import errno
+        import socket
+        real_socket = socket.socket
+        calls = []
+
+        def exhausted_socket(*args):
+            calls.append(args)
+            if len(calls) <= 2:
+                raise OSError(errno.EMFILE, 'Too many open files')
+            return real_socket(*args)
+
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(16)
+        open_port = listener.getsockname()[1]
+        try:
+            scanner = DiscoveryScanner({'ports': [1, open_port], 'rate': 10000, 'timeout': 0.5})
+            results = list(scanner.scan(['127.0.0.1', '127.0.0.2']))
+            self.assertEqual(results, [('127.0.0.1', open_port)])
+            self.assertEqual(scanner.stats['refused'], 3)
+
+            # Running out of descriptors skips that target instead of aborting the sweep
+            scanner = DiscoveryScanner({'ports': [1, open_port], 'rate': 10000, 'timeout': 0.5})
+            with patch('modules.discovery_scanner.socket.socket', side_effect=exhausted_socket):
+                results = list(scanner.scan(['127.0.0.3', '127.0.0.1']))
+            self.assertEqual(results, [('127.0.0.1', open_port)])
+            self.assertEqual(scanner.stats['errors'], 2)
+        finally:
+            listener.close()
+
+    def test_background_discovery(self):
+        """Test that discovery publishes new devices without blocking get_devices."""
+        import socket
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(16)
+        config = {
+            'enable_discovery': True,
+            'discovery_interval': 0.2,
+            'discovery_shards': 2,
+            'discovery_networks': ['127.0.0.0/30'],
+            'discovery_scan': {'ports': [listener.getsockname()[1]], 'timeout': 0.2},
+            'static_devices': [{'ip': '192.168.1.1', 'type': 'router'}]
+        }
+        manager = DeviceManager(config, ReverseDnsCache({'backend': 'system'}))
+        try:
+            snapshot = manager.get_devices()
+            self.assertEqual([d.ip for d in snapshot], ['192.168.1.1'])
+
+            deadline = time.time() + 5
+            while manager.get_device('127.0.0.1') is None and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertIsNotNone(manager.get_device('127.0.0.1'))
+            self.assertEqual(len(snapshot), 1)  # Earlier snapshots are never mutated
+
+            # Live hosts are rechecked on later ticks and marked down when gone
+            live = manager.get_device('127.0.0.1')
+            listener.close()
+            deadline = time.time() + 5
+            while manager.get_device('127.0.0.1').status != 'down' and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(manager.get_device('127.0.0.1').status, 'down')
+            self.assertEqual(live.status, 'up')  # Published devices are replaced, not mutated
+        finally:
+            manager.close()
+            listener.close()
+
+    def test_device_recheck_keeps_concurrent_updates(self):
+        """Test that a liveness recheck builds on updates published while it probed."""
+        manager = DeviceManager({'static_devices': []})
+        manager._publish({
+            ip: Device(ip=ip, hostname=ip, device_type=DeviceType.SWITCH, vendor='cisco',
+                       status='up', last_seen=1.0)
+            for ip in ('10.9.9.8', '10.9.9.9')
+        })
+        manager._live_ports = {'10.9.9.9': 22, '10.9.9.8': 80}
+
+        def scan(ips, ports=None):
+            # Another thread updates a device probed earlier in the same recheck
+            if ports == [80]:
+                manager.update_device_status('10.9.9.9', 'up')
+            return iter(())
+
+        with patch.object(manager.scanner, 'scan', side_effect=scan):
+            manager._recheck_live_devices()
+        for ip in ('10.9.9.8', '10.9.9.9'):
+            self.assertEqual(manager.get_device(ip).status, 'down')
+        self.assertEqual(manager.get_device('10.9.9.8').last_seen, 1.0)
+        self.assertGreater(manager.get_device('10.9.9.9').last_seen, 1.0)
+        manager.close()
+
+    def test_reverse_dns_cache(self):
+        """Test that repeated lookups, including failed ones, are served from cache."""
+        import socket
+        cache = ReverseDnsCache({'backend': 'system', 'negative_ttl': 60})
+
+        def gethostbyaddr(ip):
+            if ip == '10.0.0.1':
+                return ('router.example.com', [], [ip])
+            raise socket.herror(1, 'Unknown host')
+
+        with patch('socket.gethostbyaddr', side_effect=gethostbyaddr) as mock_lookup:
+            first = cache.resolve_many(['10.0.0.1', '10.0.0.2', '10.0.0.0/24'])
+            second = cache.resolve_many(['10.0.0.1', '10.0.0.2'])
+
+        expected = {'10.0.0.1': 'router.example.com', '10.0.0.2': '10.0.0.2'}
+        self.assertEqual(first, {**expected, '10.0.0.0/24': '10.0.0.0/24'})
+        self.assertEqual(second, expected)
+        self.assertEqual(mock_lookup.call_count, 2)
+        self.assertEqual(cache.stats['hits'], 1)
+        self.assertEqual(cache.stats['negative_hits'], 1)
+        self.assertEqual(cache.cached('10.0.0.1'), 'router.example.com')
+
+        # A hung system lookup is abandoned at the timeout, not waited for
+        slow = ReverseDnsCache({'backend': 'system', 'timeout': 0.2})
+        release = threading.Event()
+        with patch('socket.gethostbyaddr', side_effect=lambda ip: release.wait(5)):
+            started = time.time()
+            self.assertEqual(slow.resolve_many(['10.0.0.3']), {'10.0.0.3': '10.0.0.3'})
+            self.assertLess(time.time() - started, 2)
+            release.set()
+
     def test_metric_collection(self):
         """Test metric collection functionality."""
         # Mock device and metrics
@@ -95,6 +250,105 @@ class NetworkMonitorTests(unittest.TestCase):
         self.assertIsNotNone(metrics)
         self.assertIsInstance(metrics, list)
 
+    def test_snmp_bulk_collection(self):
+        """Test that SNMP data is collected in a few GETBULK round trips."""
+        simulator = SnmpSimulator(str(self.root_dir / 'simulator' / 'data')).start()
+        try:
+            config = {**self.config['metrics'],
+                      'snmp': {'port': simulator.address[1], 'community': 'switch',
+                               'max_repetitions': 5, 'timeout': 1, 'retries': 0}}
+            metrics_manager = MetricsManager(config)
+            device = Device(ip='127.0.0.1', hostname='sim-switch',
+                            device_type=DeviceType.SWITCH, vendor='cisco')
+
+            metrics_manager.collect_snmp([device])
+            sample = metrics_manager.snmp_sample(device)
+            self.assertIsNone(sample.error)
+            self.assertEqual(sample.requests, 3)  # 12 interfaces at 5 rows per request
+            self.assertEqual(len(sample.columns['if_hc_in_octets']), 12)
+            self.assertEqual(sample.columns['if_name']['12'], 'Gi1/0/12')
+            self.assertEqual(metrics_manager._get_temperature(device), 44.0)
+            self.assertEqual(metrics_manager._get_fan_status(device), 'degraded')
+            self.assertEqual(metrics_manager._get_poe_usage(device), 40.0)
+            self.assertEqual(simulator.requests, 3)  # Helpers reuse the cycle's sample
+        finally:
+            simulator.stop()
+
+    def test_counter_deltas(self):
+        """Test per-interface rates across 32-bit wraps, 64-bit resets and reboots."""
+        def sample(timestamp, uptime, hc_in, in_32, in_errors):
+            return SnmpSample(ip='10.0.0.1', timestamp=timestamp, scalars={'sys_uptime': uptime},
+                              columns={'if_name': {'1': 'Gi1/0/1', '2': 'Gi1/0/2'},
+                                       'if_hc_in_octets': {'1': hc_in}, 'if_in_octets': {'2': in_32},
+                                       'if_high_speed': {'1': 1000}, 'if_speed': {'2': 100000000},
+                                       'if_in_errors': {'1': in_errors, '2': 0}})
+
+        cache = CounterStateCache()
+        self.assertIsNone(cache.update('10.0.0.1', sample(1000, 100000, 0, 2**32 - 1000, 7)))
+
+        # 10s of agent uptime: 1.25 GB in on Gi1/0/1 and a 32-bit wrap on Gi1/0/2
+        rates = cache.update('10.0.0.1', sample(1011, 101000, 1250000000, 249000, 10))
+        self.assertEqual(rates.names, ['Gi1/0/1', 'Gi1/0/2'])
+        self.assertEqual(rates.elapsed, 10.0)
+        self.assertAlmostEqual(rates.in_bps[0], 1e9)
+        self.assertAlmostEqual(rates.utilization[0], 100.0)
+        self.assertAlmostEqual(rates.in_bps[1], 250000 * 8 / 10)
+        self.assertEqual(rates.in_errors[0], 3)
+        self.assertEqual(cache.stats['wraps'], 1)
+
+        # A 64-bit counter going backwards is a reset, not a wrap
+        rates = cache.update('10.0.0.1', sample(1021, 102000, 5, 249000, 10))
+        self.assertTrue(np.isnan(rates.in_bps[0]))
+        self.assertEqual(cache.stats['discontinuities'], 1)
+
+        # sysUpTime going backwards means the device rebooted
+        self.assertIsNone(cache.update('10.0.0.1', sample(1031, 500, 10, 10, 0)))
+        self.assertEqual(cache.stats['reboots'], 1)
+
+        # ...unless the 32-bit TimeTicks wrapped in step with the wall clock
+        cache.update('10.0.0.1', sample(2000, 2**32 - 400, 0, 0, 0))
+        rates = cache.update('10.0.0.1', sample(2010, 600, 1250000000, 0, 0))
+        self.assertEqual(rates.elapsed, 10.0)
+        self.assertAlmostEqual(rates.in_bps[0], 1e9)
+        self.assertEqual((cache.stats['reboots'], cache.stats['uptime_wraps']), (1, 1))
+
+    def test_interface_series(self):
+        """Test per-interface metric fan-out onto interned series ids."""
+        def sample(timestamp, uptime, octets):
+            return SnmpSample(ip='10.0.0.2', timestamp=timestamp, scalars={'sys_uptime': uptime},
+                              columns={'if_name': {str(i): f'Gi1/0/{i}' for i in range(1, 49)},
+                                       'if_hc_in_octets': {str(i): octets * i for i in range(1, 49)},
+                                       'if_hc_out_octets': {str(i): 0 for i in range(1, 49)},
+                                       'if_high_speed': {str(i): 1000 for i in range(1, 49)}})
+
+        metrics_manager = MetricsManager({**self.config['metrics'], 'storage': {'backend': 'memory'}})
+        device = Device(ip='10.0.0.2', hostname='edge-switch', device_type=DeviceType.SWITCH,
+                        vendor='cisco')
+        metrics_manager._record_snmp_samples({'10.0.0.2': sample(1000, 100000, 0)})
+        metrics_manager._record_snmp_samples({'10.0.0.2': sample(1010, 101000, 125000000)})
+        rates = metrics_manager._interface_rates['10.0.0.2']
+
+        batch = metrics_manager.new_batch(device)
+        metrics_manager._build_interface_metrics(batch, rates)
+        self.assertEqual(len(batch), 48 * 4)
+        self.assertEqual(len(set(batch.series_ids)), 48 * 4)
+        metrics_manager._store_metrics(batch)
+        self.assertEqual(len(metrics_manager.series), 48 * 4)
+        self.assertEqual(metrics_manager.series.key(batch[0].series_id),
+                         ('10.0.0.2', 'bandwidth_utilization', 'Gi1/0/1'))
+
+        history = metrics_manager.get_metric_history(
+            '10.0.0.2', 'bandwidth_utilization', 0, time.time() + 1, interface='Gi1/0/8'
+        )
+        self.assertEqual([m.value for m in history], [80.0])  # 8 * 100 Mbps of 1 Gbps
+        self.assertEqual(metrics_manager.get_metric_history(
+            '10.0.0.2', 'bandwidth_utilization', 0, time.time() + 1), [])
+
+        # Breaches of the configured 70% warning on different interfaces are separate alerts
+        alerts = AlertManager(self.config['alerting']).process_metrics(device, batch)
+        self.assertEqual({a.interface for a in alerts if a.metric_name == 'bandwidth_utilization'},
+                         {f'Gi1/0/{i}' for i in range(7, 49)})
+
     def test_alert_generation(self):
         """Test alert generation and notification."""
         # Mock metric that should trigger an alert
@@ -148,6 +402,201 @@ class NetworkMonitorTests(unittest.TestCase):
         self.alert_manager.send_notifications([alert])
         mock_post.assert_called()
 
+    def test_email_digest_delivery(self):
+        """Test digests against a local SMTP server: one connection, one HTML document."""
+        connections = []
+        received = []
+
+        class SmtpStub(socketserver.StreamRequestHandler):
+            def handle(self):
+                connections.append(self.client_address)
+                self.wfile.write(b'220 localhost ESMTP\r\n')
+                for line in iter(self.rfile.readline, b''):
+                    command = line[:4].upper()
+                    if command == b'DATA':
+                        self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                        data = []
+                        for body_line in iter(self.rfile.readline, b''):
+                            if body_line == b'.\r\n':
+                                break
+                            data.append(body_line[1:] if body_line.startswith(b'..') else body_line)
+                        received.append(email.message_from_bytes(b''.join(data)))
+                    elif command == b'QUIT':
+                        self.wfile.write(b'221 Bye\r\n')
+                        return
+                    self.wfile.write(b'250 OK\r\n')
+
+        server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SmtpStub)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        self.alert_manager.notification_config['smtp'].update(
+            server='127.0.0.1', port=server.server_address[1], use_tls=False, username=''
+        )
+        alerts = [
+            Alert(id=f"a{i}", severity=severity, status=AlertStatus.NEW,
+                  device_ip='192.168.1.1', device_name='router1', metric_name=f"metric_{i}",
+                  metric_value=250.0, threshold=200.0, timestamp=time.time(), description='',
+                  affected_services=list(self.alert_manager.business_services.values()),
+                  resolution_steps=['Check uplink'], escalation_path=['Network Operations'])
+            for i, severity in enumerate([AlertSeverity.CRITICAL] * 3 + [AlertSeverity.INFO])
+        ]
+        for alert in alerts:
+            self.alert_manager._send_email_notification(alert)
+        self.alert_manager.close()
+
+        self.assertEqual(len(connections), 1)
+        self.assertEqual(self.alert_manager._smtp_pool.stats['handshakes'], 1)
+        self.assertEqual(self.alert_manager._email_digest.stats['digests_sent'], 1)
+        messages = {message['Subject']: message for message in received}
+        self.assertEqual(sorted(messages), ['Network Alert Digest: 3 alerts (3 critical)',
+                                            'Network Alert: INFO - metric_3'])
+
+        # The digest is one well-formed HTML document covering every alert
+        parts = [part for part in messages['Network Alert Digest: 3 alerts (3 critical)'].walk()
+                 if part.get_content_type() == 'text/html']
+        self.assertEqual(len(parts), 1)
+        html = parts[0].get_payload(decode=True).decode('utf-8')
+        self.assertEqual(html.count('<!DOCTYPE html>'), 1)
+        self.assertEqual(html.count('<html>'), 1)
+        self.assertEqual(html.count('</html>'), 1)
+        self.assertTrue(html.rstrip().endswith('</html>'))
+        for alert in alerts[:3]:
+            self.assertIn(f"Alert ID: {alert.id}", html)
+        self.assertNotIn('Alert ID: a3', html)
+
+    def test_webhook_dispatcher(self):
+        """Test coalescing and 429 Retry-After handling against a local webhook stub."""
+        received = []
+
+        class WebhookStub(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                received.append(body['text'])
+                if len(received) == 1:
+                    self.send_response(429)
+                    self.send_header('Retry-After', '0')
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookStub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            dispatcher = WebhookDispatcher(
+                f"http://127.0.0.1:{server.server_port}/hook",
+                {'workers': 1, 'batch_wait': 0.5, 'backoff': 0.01}
+            )
+            for i in range(3):
+                self.assertTrue(dispatcher.submit(f"alert {i}"))
+            dispatcher.flush()
+            dispatcher.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(received[-1], "alert 0\n\nalert 1\n\nalert 2")
+        self.assertEqual(dispatcher.stats['rate_limited'], 1)
+        self.assertEqual(dispatcher.stats['messages_sent'], 3)
+
+    def test_webhook_dispatcher_close_timeout(self):
+        """Test that close gives up on a failing webhook and a full queue in bounded time."""
+        class FailingStub(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FailingStub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            dispatcher = WebhookDispatcher(
+                f"http://127.0.0.1:{server.server_port}/hook",
+                {'workers': 1, 'queue_size': 2, 'batch_wait': 0, 'max_batch': 1,
+                 'backoff': 30, 'max_backoff': 30, 'timeout': 2}
+            )
+            dispatcher.submit("alert 0")
+            time.sleep(0.2)  # Worker is now backing off on the first message
+            dispatcher.submit("alert 1")
+            dispatcher.submit("alert 2")
+
+            started = time.time()
+            dispatcher.close(timeout=0.3)
+            self.assertLess(time.time() - started, 3)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertFalse(any(thread.is_alive() for thread in dispatcher._threads))
+        self.assertEqual(dispatcher.stats['failures'], 1)
+        self.assertEqual(dispatcher.stats['dropped'], 2)
+        self.assertFalse(dispatcher.submit("alert 3"))
+
+    def test_template_rendering(self):
+        """Test notification templates render with the datetime filter and cached fragments."""
+        templates = self.alert_manager.templates
+        alert = Alert(id='a1', severity=AlertSeverity.CRITICAL, status=AlertStatus.NEW,
+                      device_ip='192.168.1.1', device_name='router1', metric_name='latency',
+                      metric_value=250.0, threshold=200.0, timestamp=time.time(),
+                      description='Latency above threshold',
+                      affected_services=list(self.alert_manager.business_services.values()),
+                      resolution_steps=['Check uplink'], escalation_path=['Network Operations'])
+
+        first = templates['email_critical'].render(alert=alert, business_services={})
+        second = templates['email_critical'].render(alert=alert, business_services={})
+        self.assertEqual(first, second)
+        self.assertIn('Core Network', first)
+        self.assertIn(datetime.fromtimestamp(alert.timestamp).strftime('%Y-%m-%d'), first)
+        self.assertGreater(templates.stats['fragment_hits'], 0)
+        self.assertTrue(any((self.data_dir / 'templates').iterdir()))
+
+    def test_template_golden_output(self):
+        """Test that templates render exactly like the pre-fragment inline templates."""
+        from datetime import timezone
+        from modules.alert_manager import BusinessService
+
+        # Baselines in test_data/golden were rendered from the inline-loop templates
+        golden_dir = self.root_dir / 'test_data' / 'golden'
+        templates = self.alert_manager.templates
+        templates.env.filters['datetime'] = lambda ts, fmt='%Y-%m-%d %H:%M:%S': (
+            datetime.fromtimestamp(ts, timezone.utc).strftime(fmt)
+        )
+        services = [
+            BusinessService(name='Core Network', description='Core switching & routing',
+                            priority=1, dependencies=['192.168.1.1'],
+                            contacts=['noc@company.com']),
+            BusinessService(name='VoIP', description='Voice <services>', priority=2,
+                            dependencies=['Core Network'], contacts=['voice@company.com']),
+        ]
+        alert = Alert(id='a1', severity=AlertSeverity.CRITICAL, status=AlertStatus.NEW,
+                      device_ip='192.168.1.1', device_name='router1', metric_name='latency',
+                      metric_value=250.0, threshold=200.0, timestamp=1700000000.0,
+                      description='Latency above threshold', affected_services=services,
+                      resolution_steps=['Check uplink', 'Fail over'],
+                      escalation_path=['Network Operations', 'On-call Engineer'],
+                      previous_occurrences=[1699990000.0, 1699995000.0])
+
+        for channel, extension in (('email', 'html'), ('slack', 'json')):
+            for severity in ('critical', 'warning', 'info'):
+                name = f"{channel}_{severity}"
+                expected = (golden_dir / f"{name}.{extension}").read_text(encoding='utf-8')
+                for _ in range(2):  # Second pass is served from the fragment cache
+                    self.assertEqual(
+                        templates[name].render(alert=alert, business_services={}),
+                        expected,
+                        name
+                    )
+
     def test_topology_mapping(self):
         """Test topology mapping functionality."""
         topology = self.topology_manager.update_topology()
@@ -166,6 +615,511 @@ class NetworkMonitorTests(unittest.TestCase):
         report_file = self.root_dir / 'data' / 'reports' / f'daily_report_{report_date}.html'
         self.assertTrue(report_file.exists())
 
+    def test_batch_icmp_prober(self):
+        """Test batched ICMP probing against the loopback backend."""
+        backend = LoopbackIcmpBackend(
+            reachable={'192.168.1.1': 5, '192.168.1.2': 10},
+            dropped={('192.168.1.1', 0)}
+        )
+        prober = BatchIcmpProber(backend=backend, timeout=0.2, count=4)
+        results = prober.probe(['192.168.1.1', '192.168.1.2', '192.168.1.3'])
+
+        self.assertEqual(results['192.168.1.1'].loss, 25.0)
+        self.assertEqual(results['192.168.1.2'].loss, 0.0)
+        self.assertEqual(results['192.168.1.3'].loss, 100.0)
+        self.assertGreaterEqual(results['192.168.1.2'].min_rtt, 10)
+
+    def test_probe_statistics(self):
+        """Test jitter in sequence order and the numeric RTT distribution metrics."""
+        probe = ProbeResult(ip='10.0.0.1', sent=5)
+        # Replies arrive out of order and probe 3 is lost
+        for sequence, rtt in ((2, 30.0), (0, 10.0), (1, 14.0), (4, 50.0)):
+            probe.record(sequence, rtt)
+        self.assertEqual(probe.rtts, [10.0, 14.0, 30.0, 50.0])
+        self.assertEqual(probe.loss, 20.0)
+        self.assertAlmostEqual(probe.jitter, 10.0)      # |14-10| and |30-14|; 3 was lost
+        self.assertAlmostEqual(probe.p50_rtt, 22.0)
+        self.assertAlmostEqual(probe.p95_rtt, 47.0)
+        self.assertAlmostEqual(probe.stddev_rtt, 15.7480, places=4)
+
+        metrics_manager = MetricsManager({**self.config['metrics'], 'storage': {'backend': 'memory'}})
+        device = Device(ip='10.0.0.1', hostname='sw1', device_type=DeviceType.SWITCH,
+                        vendor='cisco')
+        batch = metrics_manager.new_batch(device)
+        metrics_manager._build_network_performance_metrics(batch, probe)
+        values = {metric.name: metric.value for metric in batch}
+        self.assertAlmostEqual(values['latency_p50'], 22.0)
+        self.assertAlmostEqual(values['latency_p95'], 47.0)
+        self.assertAlmostEqual(values['latency_stddev'], 15.7480, places=4)
+        self.assertAlmostEqual(values['jitter'], 10.0)
+
+    def test_async_probes_share_prober(self):
+        """Test that async collection probes every device in one shared burst."""
+        backend = LoopbackIcmpBackend(reachable={'10.0.0.1': 5, '10.0.0.2': 5})
+        backend.send = MagicMock(side_effect=backend.send)
+        metrics_manager = AsyncMetricsManager({**self.config['metrics'],
+                                               'storage': {'backend': 'memory'}})
+        metrics_manager.icmp_prober = BatchIcmpProber(backend=backend, timeout=0.2, count=3)
+        devices = [Device(ip=f'10.0.0.{i}', hostname=f'sw{i}', device_type=DeviceType.SWITCH,
+                          vendor='cisco') for i in (1, 2, 3)]
+
+        # SNMP collection and history writes never run on the event loop's thread
+        snmp_threads = []
+        store_threads = []
+        store_metrics = metrics_manager._store_metrics
+        with patch.object(metrics_manager, 'collect_snmp',
+                          side_effect=lambda *args: snmp_threads.append(threading.current_thread())), \
+             patch.object(metrics_manager, '_store_metrics',
+                          side_effect=lambda batch: (store_threads.append(threading.current_thread()),
+                                                     store_metrics(batch))):
+            batches = asyncio.run(metrics_manager.collect_metrics_many(devices))
+        self.assertEqual(backend.send.call_count, 9)
+        self.assertTrue(snmp_threads)
+        self.assertNotIn(threading.current_thread(), snmp_threads)
+        self.assertEqual(len(store_threads), 3)
+        self.assertNotIn(threading.current_thread(), store_threads)
+        loss = {ip: next(m.value for m in batch if m.name == 'packet_loss')
+                for ip, batch in batches.items()}
+        self.assertEqual(loss, {'10.0.0.1': 0.0, '10.0.0.2': 0.0, '10.0.0.3': 100.0})
+
+    def test_metric_history_storage(self):
+        """Test storing and range-querying metric history on every backend."""
+        base = time.time() - 3600
+        metrics = [
+            Metric(name='latency', value=float(i), type=MetricType.NETWORK_PERFORMANCE,
+                   timestamp=base + i * 60, device_ip='192.168.1.1', unit='ms')
+            for i in range(60)
+        ]
+
+        for backend in ['memory', 'compressed', 'segment']:
+            with tempfile.TemporaryDirectory() as data_dir:
+                config = dict(self.config['metrics'])
+                config['storage'] = {'backend': backend, 'data_dir': data_dir}
+                metrics_manager = MetricsManager(config)
+                metrics_manager._store_metrics(metrics)
+
+                history = metrics_manager.get_metric_history(
+                    '192.168.1.1', 'latency', base + 600, base + 1200
+                )
+                self.assertEqual([m.value for m in history], [float(i) for i in range(10, 21)])
+                self.assertEqual(history[0].unit, 'ms')
+
+                # Idle series expire once the periodic retention pass runs
+                metrics_manager.apply_retention(now=base + 32 * 86400)
+                self.assertEqual(metrics_manager.get_metric_history(
+                    '192.168.1.1', 'latency', base, base + 3600
+                ), [])
+                metrics_manager.storage.close()
+
+    def test_segment_storage_survives_restart(self):
+        """Test that persisted metrics are readable after reopening the store."""
+        with tempfile.TemporaryDirectory() as data_dir:
+            config = dict(self.config['metrics'])
+            config['storage'] = {'backend': 'segment', 'data_dir': data_dir}
+            metric = Metric(name='fan_status', value='normal', type=MetricType.PHYSICAL,
+                            timestamp=time.time(), device_ip='192.168.1.1', unit='status')
+
+            first = MetricsManager(config)
+            first._store_metrics([metric])
+            first.storage.close()
+
+            second = MetricsManager(config)
+            history = second.get_metric_history(
+                '192.168.1.1', 'fan_status', metric.timestamp - 1, metric.timestamp + 1
+            )
+            self.assertEqual([m.value for m in history], ['normal'])
+            second.storage.close()
+
+    def test_series_compression(self):
+        """Test compressed series round-trip and ratio for slow-changing data."""
+        series = CompressedSeries()
+        samples = [(1700000000 + i * 300, 40.0 + (i // 50) * 0.5) for i in range(1000)]
+        for timestamp, value in samples:
+            series.append(timestamp, value)
+
+        self.assertEqual(list(series), [(float(t), v) for t, v in samples])
+        self.assertGreater(series.compression_ratio, 10)
+
+        status = CompressedSeries()
+        for i in range(100):
+            status.append(1700000000 + i * 300, 'normal')
+        self.assertEqual({value for _, value in status}, {'normal'})
+
+        # Collector timestamps carry sub-millisecond digits; ranges bounded by
+        # a sample's own timestamp must still include it
+        fractional = CompressedSeries()
+        timestamps = [1700000000.12345 + i * 300.000271 for i in range(10)]
+        for i, timestamp in enumerate(timestamps):
+            fractional.append(timestamp, float(i))
+        self.assertEqual([v for _, v in fractional.range(timestamps[0], timestamps[0] + 1)], [0.0])
+        self.assertEqual([v for _, v in fractional.range(timestamps[3], timestamps[5])],
+                         [3.0, 4.0, 5.0])
+        for (stored, _), original in zip(fractional, timestamps):
+            self.assertAlmostEqual(stored, original, delta=0.0005)
+
+    def test_metric_rollups(self):
+        """Test that long-range queries are served from coarser rollup tiers."""
+        now = time.time()
+        metrics = [
+            Metric(name='temperature', value=float(i % 10), type=MetricType.PHYSICAL,
+                   timestamp=now - 7 * 86400 + i * 300, device_ip='192.168.1.1',
+                   unit='celsius')
+            for i in range(7 * 288)
+        ]
+        for metric in metrics:
+            self.metrics_manager.rollups.add(metric)
+
+        points = self.metrics_manager.get_metric_rollup(
+            '192.168.1.1', 'temperature', now - 7 * 86400, now
+        )
+        self.assertLessEqual(len(points), self.metrics_manager.rollups.max_points)
+        self.assertEqual(sum(p.count for p in points), len(metrics))
+        self.assertEqual(max(p.max for p in points), 9.0)
+
+        # Tiers are rebuilt from the segment store after a restart
+        config = dict(self.config['metrics'])
+        config['storage'] = {'backend': 'segment', 'data_dir': str(self.data_dir / 'rollups')}
+        first = MetricsManager(config)
+        first._store_metrics(metrics)
+        first.storage.close()
+
+        second = MetricsManager(config)
+        for resolution in (3600, 86400):
+            rebuilt = second.rollups.query('192.168.1.1', 'temperature', now - 7 * 86400,
+                                           now, now, resolution=resolution)[1]
+            original = self.metrics_manager.rollups.query('192.168.1.1', 'temperature',
+                                                          now - 7 * 86400, now, now,
+                                                          resolution=resolution)[1]
+            self.assertEqual(rebuilt, original)
+        second.storage.close()
+
+    def test_batch_threshold_evaluation(self):
+        """Test that only breaching rows become alerts with the right severity."""
+        device = MagicMock(ip='192.168.1.1', hostname='router1')
+        metrics = [
+            Metric(name=name, value=value, type=MetricType.NETWORK_PERFORMANCE,
+                   timestamp=time.time(), device_ip=device.ip, unit='ms',
+                   threshold_warning=100, threshold_critical=200)
+            for name, value in (('latency', 10.0), ('jitter', 150.0), ('response_time', 250.0))
+        ]
+        metrics.append(Metric(name='dhcp_status', value='failed', type=MetricType.SERVICE,
+                              timestamp=time.time(), device_ip=device.ip, unit='status'))
+
+        alerts = self.alert_manager.process_metrics_batch([(device, metrics)])
+        self.assertEqual(
+            {alert.metric_value: alert.severity for alert in alerts},
+            {150.0: AlertSeverity.WARNING, 250.0: AlertSeverity.CRITICAL}
+        )
+
+    def test_metric_batch(self):
+        """Test that a columnar batch stores and alerts like the equivalent Metric list."""
+        device = Device(ip='192.168.1.1', hostname='router1', device_type=DeviceType.ROUTER,
+                        vendor='cisco')
+        batch = self.metrics_manager.new_batch(device)
+        ids = self.metrics_manager.descriptor_ids
+        batch.add(ids['latency'], 150.0, description='10/10 replies')
+        batch.add(ids['temperature'], 90.0)
+        batch.add(ids['fan_status'], 'degraded')
+        self.assertEqual([m.value for m in batch], [150.0, 90.0, 'degraded'])
+        self.assertEqual(batch[0].unit, 'ms')
+        self.assertEqual(batch[0].description, '10/10 replies')
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            config = {**self.config['metrics'],
+                      'storage': {'backend': 'segment', 'data_dir': data_dir}}
+            metrics_manager = MetricsManager(config)
+            metrics_manager._store_metrics(batch)
+            history = metrics_manager.get_metric_history(
+                device.ip, 'fan_status', batch.timestamp - 1, batch.timestamp + 1
+            )
+            self.assertEqual([m.value for m in history], ['degraded'])
+            metrics_manager.storage.close()
+
+        batch_alerts = AlertManager(self.config['alerting']).process_metrics(device, batch)
+        list_alerts = AlertManager(self.config['alerting']).process_metrics(device, list(batch))
+        expected = {'latency': AlertSeverity.WARNING, 'temperature': AlertSeverity.CRITICAL}
+        self.assertEqual({a.metric_name: a.severity for a in batch_alerts}, expected)
+        self.assertEqual({a.metric_name: a.severity for a in list_alerts}, expected)
+
+    def test_threshold_overrides(self):
+        """Test that configured thresholds and their overrides replace per-metric ones."""
+        registry = ThresholdRegistry({
+            'network_performance': {'latency': {'warning': 100, 'critical': 200}},
+            'physical': {'fan_status': {'warning': 'degraded', 'critical': 'failed'}},
+            'overrides': {
+                'device_type': {'firewall': {'latency': {'warning': 50}}},
+                'location': {'Branch': {'latency': {'critical': 120}}},
+                'device': {'10.0.0.4': {'latency': {'warning': 300, 'critical': 400}}}
+            }
+        })
+        devices = [
+            Device(ip='10.0.0.1', hostname='r1', device_type=DeviceType.ROUTER, vendor='cisco'),
+            Device(ip='10.0.0.2', hostname='fw1', device_type=DeviceType.FIREWALL, vendor='cisco'),
+            Device(ip='10.0.0.3', hostname='r2', device_type=DeviceType.ROUTER, vendor='cisco',
+                   location='Branch'),
+            Device(ip='10.0.0.4', hostname='fw2', device_type=DeviceType.FIREWALL, vendor='cisco',
+                   location='Branch'),
+        ]
+        self.assertIs(registry.profile(devices[0]), registry.default_profile)
+
+        def metrics(device):
+            return [Metric(name='latency', value=150.0, type=MetricType.NETWORK_PERFORMANCE,
+                           timestamp=time.time(), device_ip=device.ip, unit='ms',
+                           threshold_warning=1000, threshold_critical=2000),
+                    Metric(name='fan_status', value='failed', type=MetricType.PHYSICAL,
+                           timestamp=time.time(), device_ip=device.ip, unit='status')]
+
+        alert_manager = AlertManager(self.config['alerting'], thresholds=registry)
+        alerts = alert_manager.process_metrics_batch([(d, metrics(d)) for d in devices])
+        self.assertEqual(
+            {(a.device_ip, a.metric_name): a.severity for a in alerts},
+            {('10.0.0.1', 'latency'): AlertSeverity.WARNING,
+             ('10.0.0.2', 'latency'): AlertSeverity.WARNING,
+             ('10.0.0.3', 'latency'): AlertSeverity.CRITICAL,
+             **{(d.ip, 'fan_status'): AlertSeverity.CRITICAL for d in devices}}
+        )
+
+    def test_security_event_windows(self):
+        """Test that security counters alert on their sliding-window totals."""
+        counters = EventWindowCounters({'auth_failures': 300}, buckets=10)
+        for t in (0, 100, 200):
+            counters.record('10.0.0.1', 'auth_failures', 3, t)
+        self.assertEqual(counters.count('10.0.0.1', 'auth_failures', 250), 9)
+        self.assertEqual(counters.count('10.0.0.1', 'auth_failures', 330), 6)
+        self.assertEqual(counters.count('10.0.0.1', 'auth_failures', 1000), 0)
+        counters.record('10.0.0.1', 'temperature', 3, 0)
+        self.assertEqual(len(counters), 1)
+
+        # A windowed threshold for a metric that is never collected is ignored
+        config = copy.deepcopy(self.config['metrics'])
+        config['storage'] = {'backend': 'memory'}
+        config['thresholds']['security'] = {'syslog_floods': {'warning': 1, 'window': 60},
+                                             **config['thresholds']['security']}
+        metrics_manager = MetricsManager(config)
+        device = Device(ip='10.0.0.1', hostname='fw1', device_type=DeviceType.FIREWALL,
+                        vendor='cisco')
+        metrics_manager.security_windows.record(device.ip, 'syslog_floods', 5, time.time())
+        batch = metrics_manager.new_batch(device)
+        with patch.object(metrics_manager, '_get_auth_failures', return_value=4):
+            metrics_manager._collect_security_metrics(device, batch)
+            self.assertEqual(metrics_manager.check_security(device), [])
+            metrics_manager._collect_security_metrics(device, batch)
+        events = metrics_manager.check_security(device)
+        self.assertEqual([(e.metric.name, e.metric.value, e.severity) for e in events],
+                         [('auth_failures', 8, 1)])
+
+        # Per-sample thresholds no longer apply to windowed counters
+        alert_manager = AlertManager(self.config['alerting'],
+                                     thresholds=metrics_manager.thresholds)
+        self.assertEqual(alert_manager.process_metrics_batch([(device, batch)]), [])
+        alerts = alert_manager.process_security_events(events)
+        self.assertEqual([(a.metric_name, a.severity, a.threshold) for a in alerts],
+                         [('auth_failures', AlertSeverity.WARNING, 5.0)])
+        self.assertEqual(alert_manager.process_security_events(events), [])
+
+    def test_polling_engine_deadlines(self):
+        """Test that devices get a deadline and a hung poll is skipped, not stacked."""
+        devices = [Device(ip=f'10.0.0.{i}', hostname=f'sw{i}', device_type=DeviceType.SWITCH,
+                          vendor='cisco') for i in (1, 2)]
+        release = threading.Event()
+        deadlines = {}
+
+        def collect(device, deadline):
+            deadlines[device.ip] = deadline
+            if device.ip == '10.0.0.2':
+                release.wait(5)
+            return []
+
+        metrics_manager = MagicMock()
+        metrics_manager.collect_metric_batch.side_effect = collect
+        metrics_manager.check_security.return_value = []
+        alert_manager = MagicMock()
+        alert_manager.process_metrics_batch.return_value = []
+        alert_manager.process_security_events.return_value = []
+        engine = PollingEngine({'device_timeout': 30}, metrics_manager, alert_manager)
+        try:
+            started = time.time()
+            stats = engine.run_cycle(devices, cycle_timeout=0.5)
+            self.assertEqual((stats.devices_polled, stats.devices_timed_out), (1, 1))
+            self.assertLessEqual(deadlines['10.0.0.1'], started + 0.6)
+            # The fast device was evaluated without waiting on the hung one
+            alert_manager.process_metrics_batch.assert_called_once_with([(devices[0], [])])
+
+            stats = engine.run_cycle(devices, cycle_timeout=0.5)
+            self.assertEqual((stats.devices_polled, stats.devices_skipped), (1, 1))
+
+            release.set()
+            time.sleep(0.1)
+            stats = engine.run_cycle(devices, cycle_timeout=0.5)
+            self.assertEqual((stats.devices_polled, stats.devices_skipped), (2, 0))
+        finally:
+            release.set()
+            engine.shutdown()
+
+    def test_alert_deduplication(self):
+        """Test that repeat breaches within the window update the open alert."""
+        device = MagicMock(ip='192.168.1.1', hostname='router1')
+
+        def breach(value):
+            return [(device, [Metric(name='latency', value=value,
+                                     type=MetricType.NETWORK_PERFORMANCE,
+                                     timestamp=time.time(), device_ip=device.ip, unit='ms',
+                                     threshold_warning=100, threshold_critical=200)])]
+
+        first = self.alert_manager.process_metrics_batch(breach(150.0))
+        self.assertEqual(len(first), 1)
+        self.assertEqual(self.alert_manager.process_metrics_batch(breach(160.0)), [])
+        self.assertEqual(first[0].occurrence_count, 2)
+        self.assertEqual(len(first[0].previous_occurrences), 1)
+
+        # Only the most recent occurrence times are kept
+        self.alert_manager.deduplicator.max_occurrences = 3
+        for value in (161.0, 162.0, 163.0, 164.0):
+            self.alert_manager.process_metrics_batch(breach(value))
+        self.assertEqual(first[0].occurrence_count, 6)
+        self.assertEqual(len(first[0].previous_occurrences), 3)
+
+        # Escalation to critical is surfaced again on the same alert
+        escalated = self.alert_manager.process_metrics_batch(breach(250.0))
+        self.assertEqual(escalated, first)
+        self.assertEqual(first[0].severity, AlertSeverity.CRITICAL)
+        self.assertEqual(len(self.alert_manager.get_active_alerts()), 1)
+
+    def test_alert_deduplication_across_cycles(self):
+        """Test that a breach seen on consecutive polling cycles stays on one alert."""
+        device = MagicMock(ip='192.168.1.1', hostname='router1')
+        interval = self.config['general']['polling_interval']
+        base = time.time()
+
+        def breach(now):
+            with patch('modules.alert_manager.time.time', return_value=now):
+                return self.alert_manager.process_metrics_batch([(device, [Metric(
+                    name='latency', value=150.0, type=MetricType.NETWORK_PERFORMANCE,
+                    timestamp=now, device_ip=device.ip, unit='ms',
+                    threshold_warning=100, threshold_critical=200
+                )])])
+
+        first = breach(base)
+        self.assertEqual(len(first), 1)
+        # Cycles land at, or a little past, one polling interval apart
+        self.assertEqual(breach(base + interval + 2), [])
+        self.assertEqual(breach(base + 2 * interval + 5), [])
+        self.assertEqual(first[0].occurrence_count, 3)
+
+        # Once resolved, the next breach raises a new alert
+        self.alert_manager.resolve_alert(first[0].id, 'fixed')
+        self.assertEqual(self.alert_manager.deduplicator._open, {})
+        second = breach(base + 3 * interval)
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(second[0].id, first[0].id)
+
+    def test_alert_history_archive(self):
+        """Test that alert history stays bounded in memory and is served from disk."""
+        base = time.time() - 3600
+        alerts = [
+            Alert(id=f"a{i}", severity=AlertSeverity.WARNING, status=AlertStatus.NEW,
+                  device_ip='192.168.1.1', device_name='router1', metric_name='latency',
+                  metric_value=150.0, threshold=100.0, timestamp=base + i * 60,
+                  description='')
+            for i in range(20)
+        ]
+        with tempfile.TemporaryDirectory() as archive_dir:
+            config = {'max_alerts': 5, 'archive_dir': archive_dir, 'index_interval': 4}
+            archive = AlertArchive(config, Alert.to_record, Alert.from_record)
+            for alert in alerts:
+                archive.append(alert)
+            self.assertEqual(len(archive), 5)
+            self.assertEqual([a.id for a in archive.query(base + 600, base + 1020)],
+                             [f"a{i}" for i in range(10, 18)])
+
+            # Changes made after an alert was archived are read back from disk
+            alerts[2].status = AlertStatus.RESOLVED
+            alerts[2].occurrence_count = 3
+            archive.update(alerts[2])
+            archive.close()
+
+            reopened = AlertArchive(config, Alert.to_record, Alert.from_record)
+            history = reopened.query(base, base + 3600)
+            self.assertEqual([a.id for a in history], [a.id for a in alerts])
+            self.assertEqual(history[0].severity, AlertSeverity.WARNING)
+            self.assertEqual([a.status for a in history[1:4]],
+                             [AlertStatus.NEW, AlertStatus.RESOLVED, AlertStatus.NEW])
+            self.assertEqual(history[2].occurrence_count, 3)
+
+            # A long incident's repeat updates are compacted to its latest state
+            reopened.compact_min_updates = 8
+            for count in range(4, 40):
+                alerts[3].occurrence_count = count
+                reopened.update(alerts[3])
+            updates_path = next(Path(archive_dir).glob('updates_*.jsonl'))
+            self.assertLess(len(updates_path.read_bytes().splitlines()), 8)
+            history = reopened.query(base, base + 3600)
+            self.assertEqual([a.occurrence_count for a in history[2:4]], [3, 39])
+            self.assertEqual(history[2].status, AlertStatus.RESOLVED)
+            reopened.close()
+
+        # Resolving through the AlertManager archives the new status
+        device = MagicMock(ip='192.168.1.1', hostname='router1')
+        metric = Metric(name='latency', value=150.0, type=MetricType.NETWORK_PERFORMANCE,
+                        timestamp=time.time(), device_ip=device.ip, unit='ms',
+                        threshold_warning=100, threshold_critical=200)
+        alert = self.alert_manager.process_metrics_batch([(device, [metric])])[0]
+        self.alert_manager.resolve_alert(alert.id, 'link replaced')
+        self.alert_manager.close()
+        self.assertEqual(self.alert_manager.alert_history._update_writers, {})
+        reopened = AlertArchive(self.config['alerting']['history'], Alert.to_record,
+                                Alert.from_record)
+        self.assertEqual([a.status for a in reopened.query(alert.timestamp, alert.timestamp)],
+                         [AlertStatus.RESOLVED])
+        reopened.close()
+
+    def test_service_index(self):
+        """Test IP, CIDR and transitive service lookups and incremental reload."""
+        services = [
+            {'name': 'Core Network', 'description': '', 'priority': 1,
+             'dependencies': ['192.168.1.1', '10.20.0.0/16']},
+            {'name': 'Internet Access', 'description': '', 'priority': 1,
+             'dependencies': ['192.168.1.254']},
+            {'name': 'VoIP', 'description': '', 'priority': 2,
+             'dependencies': ['Core Network']},
+        ]
+        self.alert_manager.reload_business_services(services)
+        lookup = self.alert_manager.service_index.lookup
+
+        self.assertEqual([s.name for s in lookup('192.168.1.1')], ['Core Network', 'VoIP'])
+        self.assertEqual([s.name for s in lookup('10.20.3.4')], ['Core Network', 'VoIP'])
+        self.assertEqual(lookup('10.21.0.1'), [])
+
+        services[1]['dependencies'] = ['192.168.1.1']
+        self.alert_manager.reload_business_services(services)
+        self.assertEqual([s.name for s in lookup('192.168.1.1')],
+                         ['Core Network', 'Internet Access', 'VoIP'])
+        self.assertEqual(lookup('192.168.1.254'), [])
+
+        # The per-IP lookup cache is a bounded LRU
+        self.alert_manager.service_index.cache_size = 2
+        for ip in ('10.20.0.1', '10.20.0.2', '192.168.1.1', '10.20.0.3'):
+            lookup(ip)
+        self.assertEqual(list(self.alert_manager.service_index._cache),
+                         ['192.168.1.1', '10.20.0.3'])
+
+    def test_alert_correlation_index(self):
+        """Test keyed correlation lookups and correlation window expiry."""
+        index = ActiveAlertIndex(correlation_window=60)
+        now = time.time()
+        first = MagicMock(id='a1', device_ip='192.168.1.1', metric_name='latency',
+                          timestamp=now, correlation_id=None)
+        index[first.id] = first
+
+        self.assertEqual(index.correlate('192.168.1.1', 'latency', now + 30), 'a1')
+        self.assertIsNone(index.correlate('192.168.1.1', 'jitter', now + 30))
+        self.assertIsNone(index.correlate('192.168.1.1', 'latency', now + 61))
+        self.assertEqual(index.get_by_key('192.168.1.1', 'latency'), [first])
+
+        del index['a1']
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.get_by_key('192.168.1.1', 'latency'), [])
+
 def run_integration_tests():
     """Run basic integration tests."""
     logger.info("Running integration tests...")